@@ -48,7 +48,8 @@ with DAG(
         http_conn_id='api_connection',
         endpoint='/training/',
         method='POST',
-        data=json.dumps({"force": True}),
+        # Mise à jour incrémentale : ~20k nouvelles notes par nuit
+        data=json.dumps({"force": True, "incremental": True}),
         headers={"Content-Type": "application/json"},
         response_check=lambda response: response.status_code == 200,
         log_response=True
@@ -28,6 +28,7 @@ dvc remote modify myremote secret_access_key "${AWS_SECRET_ACCESS_KEY}"
 
 echo "DVC configuré."
 
-# Lancer l'API
-exec uvicorn api.app:app --host 0.0.0.0 --port 8000
+# Lancer l'API (API_WORKERS workers partageant le segment mémoire du modèle ;
+# l'état mis à jour par generate-ratings et /training/status reste par worker)
+exec uvicorn api.app:app --host 0.0.0.0 --port 8000 --workers "${API_WORKERS:-1}"
 
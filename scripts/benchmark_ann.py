@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la recherche approximative (IVF) contre le scoring exhaustif
+Mesure recall@N et latence par requête pour plusieurs valeurs de nprobe
+"""
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.scoring import FactorScorer
+from pipeline.ann_index import IVFIndex, build_ivf_index
+from pipeline.model_store import load_model_artifact
+
+
+def synthetic_scorer(n_users, n_items, n_factors, seed=42):
+    """Facteurs synthétiques structurés en groupes (proche d'un SVD entraîné)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=0.3, size=(50, n_factors))
+    qi = centers[rng.integers(0, 50, n_items)] + rng.normal(scale=0.1, size=(n_items, n_factors))
+    pu = rng.normal(scale=0.3, size=(n_users, n_factors))
+    return FactorScorer(
+        pu=pu.astype(np.float32),
+        qi=qi.astype(np.float32),
+        bu=rng.normal(scale=0.2, size=n_users).astype(np.float32),
+        bi=rng.normal(scale=0.3, size=n_items).astype(np.float32),
+        global_mean=3.5,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--version-dir", help="Dossier d'un modèle exporté (sinon données synthétiques)")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--items", type=int, default=27000)
+    parser.add_argument("--factors", type=int, default=100)
+    parser.add_argument("--nlist", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-n", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.version_dir:
+        scorer = load_model_artifact(args.version_dir, mmap=False).scorer
+    else:
+        scorer = synthetic_scorer(args.users, args.items, args.factors)
+
+    start = time.perf_counter()
+    index_arrays = build_ivf_index(scorer.qi, scorer.bi, nlist=args.nlist)
+    print(f"Index IVF : {scorer.n_items} items, nlist={args.nlist}, "
+          f"construit en {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(0)
+    users = rng.choice(scorer.n_users, size=min(args.queries, scorer.n_users), replace=False)
+
+    start = time.perf_counter()
+    exact = [set(scorer.top_n(int(u), N=args.top_n)[0].tolist()) for u in users]
+    exact_ms = (time.perf_counter() - start) / len(users) * 1000
+    print(f"{'mode':<14}{'recall@' + str(args.top_n):>12}{'ms/requête':>14}{'candidats':>12}")
+    print(f"{'exact':<14}{1.0:>12.3f}{exact_ms:>14.3f}{scorer.n_items:>12}")
+
+    for nprobe in (1, 2, 4, 8, 16, 32):
+        if nprobe > args.nlist:
+            break
+        index = IVFIndex.from_arrays(index_arrays, nprobe=nprobe)
+        hits = 0
+        n_candidates = 0
+        start = time.perf_counter()
+        for u, truth in zip(users, exact):
+            candidates, item_scores = index.search(scorer.pu[int(u)])
+            items, _ = scorer.top_n_among(int(u), candidates, N=args.top_n, item_scores=item_scores)
+            hits += len(truth & set(items.tolist()))
+            n_candidates += candidates.shape[0]
+        elapsed_ms = (time.perf_counter() - start) / len(users) * 1000
+        recall = hits / (len(users) * args.top_n)
+        print(f"{'ivf/' + str(nprobe):<14}{recall:>12.3f}{elapsed_ms:>14.3f}{n_candidates // len(users):>12}")
+
+
+if __name__ == "__main__":
+    main()
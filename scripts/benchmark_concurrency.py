@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrence de l'API de prédiction
+Lance N clients parallèles sur POST /predict/ et sonde /health en même temps,
+puis affiche les percentiles de latence (à lancer avant/après un changement)
+"""
+import os
+import time
+import asyncio
+import argparse
+import numpy as np
+import httpx
+
+API_URL = os.getenv("API_URL", "http://localhost:8080")
+
+
+async def predict_client(client, user_ids, n_requests, top_n, latencies, errors):
+    for i in range(n_requests):
+        user_id = int(user_ids[i % len(user_ids)])
+        start = time.perf_counter()
+        try:
+            response = await client.post("/predict/", json={"user_id": user_id, "top_n": top_n})
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def health_probe(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get("/health")
+        except httpx.HTTPError:
+            pass
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+
+def summary(name, latencies):
+    values = np.array(latencies) * 1000
+    if values.size == 0:
+        return f"{name:<10} aucune mesure"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"{name:<10} n={values.size:<6} p50={p50:8.1f} ms  p95={p95:8.1f} ms  p99={p99:8.1f} ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="Requêtes par client")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--max-user-id", type=int, default=138000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    user_ids = rng.integers(1, args.max_user_id, size=1000)
+    predict_latencies, health_latencies, errors = [], [], []
+    stop = asyncio.Event()
+
+    limits = httpx.Limits(max_connections=args.clients + 5)
+    async with httpx.AsyncClient(base_url=API_URL, timeout=120, limits=limits) as client:
+        probe = asyncio.create_task(health_probe(client, stop, health_latencies))
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            predict_client(client, user_ids, args.requests, args.top_n, predict_latencies, errors)
+            for _ in range(args.clients)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+
+    total = args.clients * args.requests
+    print(f"{args.clients} clients x {args.requests} requêtes sur {API_URL}")
+    print(summary("/predict/", predict_latencies))
+    print(summary("/health", health_latencies))
+    print(f"Débit : {total / elapsed:.1f} requêtes/s, erreurs : {len(errors)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
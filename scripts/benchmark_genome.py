@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark du moteur par contenu (genome) : empreinte mémoire float16 vs
+float32, temps de chargement mmap, requêtes de similarité par seconde
+Utilise une matrice synthétique de la taille du genome MovieLens 20M
+"""
+import sys
+import os
+import time
+import tempfile
+import argparse
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.content_model import build_genome_vectors, export_genome, load_current_genome
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=10381)
+    parser.add_argument("--tags", type=int, default=1128)
+    parser.add_argument("--users", type=int, default=138000)
+    parser.add_argument("--ratings-per-user", type=int, default=144)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--neighbors", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    movie_ids = np.arange(1, args.movies + 1)
+    relevance = rng.beta(0.5, 3.0, size=(args.movies, args.tags)).astype(np.float32)
+    start = time.perf_counter()
+    arrays = build_genome_vectors(
+        np.repeat(movie_ids, args.tags), np.tile(np.arange(1, args.tags + 1), args.movies), relevance.ravel()
+    )
+    print(f"Construction ({args.movies * args.tags / 1e6:.1f}M lignes) : {time.perf_counter() - start:.2f}s")
+    print(f"Matrice float32 : {relevance.nbytes / 2**20:.1f} Mo, float16 : {arrays['vectors'].nbytes / 2**20:.1f} Mo")
+    del relevance
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        start = time.perf_counter()
+        export_genome(export_dir, arrays, neighbors=args.neighbors)
+        print(f"Export (+ {args.neighbors} voisins par film) : {time.perf_counter() - start:.2f}s")
+        del arrays
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        genome = load_current_genome(export_dir)
+        print(f"Chargement mmap : {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        queries = rng.choice(genome.movie_ids, size=args.queries)
+        # Voisins précalculés (N <= K), puis produit par blocs (N > K)
+        for label, top_n in (("voisins précalculés", args.top_n), ("produit par blocs", args.neighbors + 1)):
+            genome.similar_movies(int(queries[0]), N=top_n)
+            start = time.perf_counter()
+            for movie_id in queries:
+                genome.similar_movies(int(movie_id), N=top_n)
+            elapsed = time.perf_counter() - start
+            print(f"Films similaires, {label} (1 requête)   : {args.queries / elapsed:9.1f} requêtes/s")
+
+            start = time.perf_counter()
+            for i in range(0, args.queries, args.batch):
+                genome.similar_movies_batch(queries[i:i + args.batch], N=top_n)
+            elapsed = time.perf_counter() - start
+            print(f"Films similaires, {label} (blocs de {args.batch}) : {args.queries / elapsed:9.1f} requêtes/s")
+        print(f"RSS après requêtes : +{rss_mb() - rss_before:.1f} Mo")
+
+        # Historiques synthétiques (index CSR du modèle de serving)
+        seen_indptr = np.arange(args.users + 1, dtype=np.int64) * args.ratings_per_user
+        seen_indices = rng.integers(0, args.movies, size=seen_indptr[-1]).astype(np.int32)
+        user_ids = np.arange(1, args.users + 1)
+        start = time.perf_counter()
+        for movie_id in queries[:10]:
+            genome.users_for_movie(int(movie_id), user_ids, movie_ids, seen_indptr, seen_indices, N=100)
+        elapsed = (time.perf_counter() - start) / 10
+        print(f"Audience d'un film ({args.users} utilisateurs, {seen_indices.shape[0] / 1e6:.0f}M notes) : "
+              f"{elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
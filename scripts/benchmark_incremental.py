@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark du ré-entraînement incrémental sur des notes synthétiques
+(facteurs latents + bruit) : un SVD parent entraîné sur les anciennes notes,
+puis pour plusieurs volumes de nouvelles notes (dont de nouveaux
+utilisateurs), durée et RMSE du holdout pour :
+- le modèle parent (nouveaux utilisateurs à la moyenne)
+- la mise à jour incrémentale (fold-in + SGD sur nouvelles notes + rejeu)
+- un SVD Surprise ré-entraîné sur toute la table
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+from surprise import Dataset, Reader, SVD
+from pipeline.model_store import export_surprise_model, load_model_artifact
+from pipeline.incremental_training import (
+    fold_in_new_users, full_retrain_rmse, sgd_epochs, split_incremental, warm_start
+)
+
+
+def synthetic_ratings(n_users, n_items, n_rows, n_factors=8, seed=0):
+    rng = np.random.default_rng(seed)
+    pu, qi = rng.normal(0, 0.5, (n_users, n_factors)), rng.normal(0, 0.5, (n_items, n_factors))
+    bu, bi = rng.normal(0, 0.3, n_users), rng.normal(0, 0.3, n_items)
+    u, i = rng.integers(0, n_users, n_rows), rng.integers(0, n_items, n_rows)
+    ratings = 3.5 + bu[u] + bi[i] + np.einsum("ij,ij->i", pu[u], qi[i]) + rng.normal(0, 0.5, n_rows)
+    df = pd.DataFrame({
+        "user_id": u + 1,
+        "movie_id": i + 1,
+        "rating": np.clip(np.round(ratings * 2) / 2, 0.5, 5.0).astype(np.float32),
+    })
+    return df.drop_duplicates(["user_id", "movie_id"]).reset_index(drop=True)
+
+
+def with_changes(df, n_new, n_new_users):
+    """Les n_new dernières notes (dont celles des n_new_users derniers utilisateurs) après le watermark"""
+    new_users = df["user_id"] > df["user_id"].max() - n_new_users
+    new_user_rows = np.flatnonzero(new_users)[: n_new // 4]
+    old_rows = np.flatnonzero(~new_users)
+    recent = np.concatenate([old_rows[-(n_new - new_user_rows.shape[0]):], new_user_rows])
+    base = old_rows[: -(n_new - new_user_rows.shape[0])]
+    order = np.concatenate([base, recent])
+    columns = {name: df[name].to_numpy()[order] for name in ("user_id", "movie_id", "rating")}
+    columns["timestamp"] = np.concatenate([np.zeros(base.shape[0], np.int64), np.ones(recent.shape[0], np.int64)])
+    return columns, df.iloc[base]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=300_000, help="Nombre de notes générées")
+    parser.add_argument("--changes", type=int, nargs="+", default=[5_000, 20_000, 50_000],
+                        help="Volumes de nouvelles notes comparés")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--lr", type=float, default=0.002)
+    args = parser.parse_args()
+
+    df = synthetic_ratings(n_users=6000, n_items=2000, n_rows=args.rows)
+    reader = Reader(rating_scale=(0.5, 5))
+    for n_new in args.changes:
+        columns, base = with_changes(df, n_new, n_new_users=500)
+        parent_algo = SVD(random_state=0)
+        parent_algo.fit(Dataset.load_from_df(base[["user_id", "movie_id", "rating"]], reader).build_full_trainset())
+        with tempfile.TemporaryDirectory() as export_dir:
+            parent = load_model_artifact(export_surprise_model(parent_algo, export_dir), mmap=False)
+        splits = split_incremental(columns, watermark=0)
+        train, test = splits["train"], splits["test"]
+        rmse = lambda state: state.rmse(test["user_id"], test["movie_id"], test["rating"])
+
+        start = time.perf_counter()
+        state = warm_start(parent, train["user_id"], train["movie_id"])
+        parent_rmse = rmse(state)
+        fold_in_new_users(state, train["user_id"], train["movie_id"], train["rating"], reg=1.0)
+        sgd_epochs(state, train["user_id"], train["movie_id"], train["rating"], n_epochs=args.epochs, lr=args.lr)
+        incremental_seconds = time.perf_counter() - start
+        full_rmse, full_seconds = full_retrain_rmse(columns, test, sample_size=columns["rating"].shape[0])
+
+        print(f"{n_new:>7} nouvelles notes  parent {parent_rmse:.4f}  "
+              f"incrémental {rmse(state):.4f} en {incremental_seconds:5.2f}s ({train['rating'].shape[0]} lignes)  "
+              f"complet {full_rmse:.4f} en {full_seconds:5.2f}s ({columns['rating'].shape[0]} lignes)")
+
+
+if __name__ == "__main__":
+    main()
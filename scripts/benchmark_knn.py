@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark du voisinage item-item creux (ItemKNN) contre les KNN de Surprise
+(matrice de similarités dense) sur des notes synthétiques : RMSE sur un
+holdout de 10 %, durées d'entraînement et de prédiction
+--skip-surprise : ItemKNN seul (volumes pour lesquels la matrice dense ne tient pas)
+"""
+import sys
+import os
+import time
+import argparse
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from pipeline.knn_engine import ItemKNN
+from benchmark_mf import rmse, synthetic_ratings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--k", type=int, nargs="+", default=[40, 100])
+    parser.add_argument("--similarity", default="pearson_baseline")
+    parser.add_argument("--skip-surprise", action="store_true")
+    args = parser.parse_args()
+
+    df = synthetic_ratings(args.users, args.items, args.rows)
+    test_mask = np.random.default_rng(1).random(len(df)) < 0.1
+    train, test = df[~test_mask], df[test_mask]
+    actual = test["rating"].to_numpy()
+
+    for k in args.k:
+        knn = ItemKNN(k=k, similarity=args.similarity)
+        knn.fit(train["user_id"].to_numpy(), train["movie_id"].to_numpy(), train["rating"].to_numpy())
+        start = time.perf_counter()
+        predicted = knn.predict_arrays(test["user_id"].to_numpy(), test["movie_id"].to_numpy())
+        print(f"ItemKNN k={k:<5} {len(train):>9} notes  RMSE {rmse(predicted, actual):.4f}  "
+              f"fit {knn.fit_seconds:6.2f}s  prédiction {time.perf_counter() - start:6.2f}s  "
+              f"{knn.sim_data.shape[0]} similarités")
+
+    if not args.skip_surprise:
+        from surprise import Dataset, Reader, KNNBasic, KNNBaseline
+        trainset = Dataset.load_from_df(train, Reader(rating_scale=(0.5, 5))).build_full_trainset()
+        algorithms = {
+            "KNNBasic": KNNBasic(verbose=False),
+            "KNNBaseline (items)": KNNBaseline(sim_options={"name": "pearson_baseline", "user_based": False},
+                                               verbose=False),
+        }
+        for name, algo in algorithms.items():
+            start = time.perf_counter()
+            algo.fit(trainset)
+            fit_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            predicted = np.array([algo.predict(u, i).est for u, i in zip(test["user_id"].tolist(), test["movie_id"].tolist())])
+            print(f"{name:<19} {len(train):>9} notes  RMSE {rmse(predicted, actual):.4f}  "
+                  f"fit {fit_seconds:6.2f}s  prédiction {time.perf_counter() - start:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark du chargement des ratings d'entraînement : pd.read_sql (une
+ligne Python et un Decimal par note) vs COPY binaire décodé en tableaux typés
+Chaque chargeur tourne dans un processus neuf : débit (lignes/s) et pic de
+RSS pendant le chargement (VmHWM remis à zéro juste avant, Linux)
+--synthetic N : sans base, flux COPY (reçu par messages d'une ligne) et
+tuples du curseur psycopg2 (int, int, Decimal) générés en mémoire
+"""
+import sys
+import os
+import time
+import gc
+import argparse
+import tempfile
+import resource
+import multiprocessing as mp
+from decimal import Decimal
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+
+
+def peak_rss_mb():
+    """Pic de RSS (VmHWM), remis au RSS courant par reset_peak_rss()"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+
+def reset_baseline():
+    """Remet le pic de RSS au niveau courant (Linux) et retourne ce niveau"""
+    gc.collect()
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    return current_rss_mb()
+
+
+def synthetic_columns(n_rows):
+    rng = np.random.default_rng(0)
+    return (
+        rng.integers(1, 300000, size=n_rows),
+        rng.integers(1, 200000, size=n_rows),
+        rng.choice(np.arange(1, 11), size=n_rows) / 2,
+    )
+
+
+def summarize(df, start, baseline):
+    seconds = time.perf_counter() - start
+    return (len(df), seconds, peak_rss_mb() - baseline,
+            df.memory_usage(deep=True).sum() / 2**20, str(df["rating"].dtype))
+
+
+def encode_copy_stream(user_ids, movie_ids, ratings):
+    """Flux tel qu'envoyé par COPY ... TO STDOUT WITH (FORMAT binary)"""
+    from pipeline.data_loader import COPY_SIGNATURE, COPY_TRAILER, RATINGS_COPY_DTYPE
+    rows = np.zeros(len(user_ids), dtype=RATINGS_COPY_DTYPE)
+    rows["n_fields"] = 3
+    for column, values in (("user_id", user_ids), ("movie_id", movie_ids), ("rating", ratings)):
+        rows[f"{column}_len"] = 4
+        rows[column] = values
+    return COPY_SIGNATURE + bytes(8) + rows.tobytes() + COPY_TRAILER
+
+
+def run_read_sql(args):
+    if args.synthetic:
+        columns = [values.tolist() for values in synthetic_columns(args.synthetic)]
+        baseline = reset_baseline()
+        start = time.perf_counter()
+        # Tuples construits par le curseur psycopg2 (DECIMAL(2, 1) → Decimal)
+        rows = [(u, m, Decimal(str(r))) for u, m, r in zip(*columns)]
+        df = pd.DataFrame(rows, columns=["user_id", "movie_id", "rating"])
+        del rows
+    else:
+        from pipeline.data_loader import get_db_engine
+        query = "SELECT user_id, movie_id, rating FROM ratings"
+        if args.limit:
+            query += f" LIMIT {args.limit}"
+        engine = get_db_engine()
+        baseline = reset_baseline()
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            df = pd.read_sql(query, conn)
+    return summarize(df, start, baseline)
+
+
+def run_copy(args):
+    from pipeline.data_loader import RATINGS_SELECT, RatingsCopyParser, copy_ratings
+    if args.synthetic:
+        # Flux écrit sur disque puis relu par morceaux, comme depuis la socket
+        with tempfile.NamedTemporaryFile(suffix=".copy", delete=False) as f:
+            columns = synthetic_columns(args.synthetic)
+            for start in range(0, args.synthetic, 100000):
+                chunk = encode_copy_stream(*(values[start:start + 100000] for values in columns))
+                # En-tête en tête de flux, marqueur de fin en queue uniquement
+                f.write(chunk[:-2] if start == 0 else chunk[19:-2])
+            f.write(chunk[-2:])
+            del columns, chunk
+            path = f.name
+        baseline = reset_baseline()
+        start = time.perf_counter()
+        parser = RatingsCopyParser()
+        with open(path, "rb") as f:
+            parser.write(f.read(19))
+            while True:
+                block = f.read(26 * 4096)
+                if not block:
+                    break
+                # Un message CopyData par ligne, comme psycopg2.copy_expert
+                view = memoryview(block)
+                for offset in range(0, len(block), 26):
+                    parser.write(view[offset:offset + 26])
+        os.unlink(path)
+        df = pd.DataFrame(parser.finish(), copy=False)
+    else:
+        query = RATINGS_SELECT + (f" LIMIT {args.limit}" if args.limit else "")
+        baseline = reset_baseline()
+        start = time.perf_counter()
+        df = copy_ratings(query)
+    return summarize(df, start, baseline)
+
+
+def worker(name, args, queue):
+    queue.put((run_read_sql if name == "read_sql" else run_copy)(args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=0, help="Nombre maximal de lignes lues en base")
+    parser.add_argument("--synthetic", type=int, default=0, help="Nombre de lignes générées (sans base)")
+    args = parser.parse_args()
+
+    context = mp.get_context("spawn")
+    for name in ("read_sql", "copy"):
+        queue = context.Queue()
+        process = context.Process(target=worker, args=(name, args, queue))
+        process.start()
+        n_rows, seconds, rss_mb, frame_mb, rating_dtype = queue.get()
+        process.join()
+        print(f"{name:<10} {n_rows:>10} lignes  {seconds:7.2f}s  {n_rows / seconds:>12,.0f} lignes/s  "
+              f"pic RSS +{rss_mb:7.1f} Mo  DataFrame {frame_mb:7.1f} Mo  rating={rating_dtype}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire multi-workers : copie privée du modèle par worker vs
+segment partagé (/dev/shm) mappé par tous les workers
+Affiche le RSS et le PSS (part proportionnelle des pages partagées) par worker
+"""
+import sys
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.model_store import export_factor_model, load_model_artifact
+from pipeline.shared_model import publish_version
+
+
+def memory_kb():
+    """(RSS, PSS) du processus courant en Ko, lus dans /proc/self/smaps_rollup"""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1])
+    return values["Rss:"], values["Pss:"]
+
+
+def worker(mode, version_dir, shared_dir, barrier, results):
+    if mode == "shared":
+        artifact = load_model_artifact(publish_version(version_dir, shared_dir))
+    else:
+        # Équivalent d'un chargement indépendant (pickle / DataFrame) par worker
+        artifact = load_model_artifact(version_dir, mmap=False)
+    # Toucher toutes les pages : scoring d'utilisateurs + lecture complète des tableaux
+    artifact.top_n_batch([int(u) for u in artifact.user_ids[:64]], [10] * 64)
+    for array in artifact.arrays.values():
+        float(np.asarray(array, dtype=np.float64).sum())
+    barrier.wait()
+    # Tous les workers sont chargés : mesure simultanée
+    results.put(memory_kb())
+    barrier.wait()
+
+
+def run(mode, n_workers, version_dir, shared_dir):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(mode, version_dir, shared_dir, barrier, results))
+        for _ in range(n_workers)
+    ]
+    for p in processes:
+        p.start()
+    measures = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    rss = np.mean([m[0] for m in measures]) / 1024
+    pss = np.mean([m[1] for m in measures]) / 1024
+    return rss, pss, pss * n_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=140000)
+    parser.add_argument("--items", type=int, default=27000)
+    parser.add_argument("--factors", type=int, default=100)
+    parser.add_argument("--seen", type=int, default=5_000_000, help="Notes dans l'index des films vus")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--shared-dir", default="/dev/shm/reco_films_benchmark")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        seen = pd.DataFrame({
+            "user_id": rng.integers(0, args.users, args.seen),
+            "movie_id": rng.integers(0, args.items, args.seen),
+        }).drop_duplicates()
+        version_dir = export_factor_model(
+            tmp_dir,
+            pu=rng.normal(size=(args.users, args.factors)),
+            qi=rng.normal(size=(args.items, args.factors)),
+            bu=rng.normal(size=args.users),
+            bi=rng.normal(size=args.items),
+            global_mean=3.5,
+            user_ids=np.arange(args.users),
+            item_ids=np.arange(args.items),
+            seen_ratings=seen,
+        )
+        size_mb = sum(
+            os.path.getsize(os.path.join(version_dir, f)) for f in os.listdir(version_dir)
+        ) / 1024 ** 2
+        print(f"Modèle : {args.users} utilisateurs, {args.items} films, "
+              f"{args.factors} facteurs, {len(seen)} notes vues ({size_mb:.0f} Mo)")
+        print(f"{'mode':<8} {'workers':>7} {'RSS/worker':>12} {'PSS/worker':>12} {'PSS total':>11}")
+        for n_workers in args.workers:
+            for mode in ("private", "shared"):
+                shutil.rmtree(args.shared_dir, ignore_errors=True)
+                start = time.perf_counter()
+                rss, pss, total = run(mode, n_workers, version_dir, args.shared_dir)
+                print(f"{mode:<8} {n_workers:>7} {rss:>9.0f} Mo {pss:>9.0f} Mo {total:>8.0f} Mo"
+                      f"  ({time.perf_counter() - start:.1f}s)")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        shutil.rmtree(args.shared_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
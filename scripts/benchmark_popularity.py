@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark des films populaires (cold start) : agrégation SQL par requête
+vs classements matérialisés en mémoire
+Nécessite la base PostgreSQL du projet (config.yaml)
+"""
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.catalog import load_catalog
+from api.cold_start import query_popular_movies
+from api.popularity import popularity_board
+
+
+def measure(func, n_requests):
+    latencies = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def summary(name, values):
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"{name:<28} p50={p50:9.3f} ms  p95={p95:9.3f} ms  p99={p99:9.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--genre", default="Comedy")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    popularity_board.load_from_db(load_catalog())
+    print(f"Chargement des classements : {time.perf_counter() - start:.2f}s")
+
+    # Les deux chemins doivent renvoyer les mêmes films
+    for genre in (None, args.genre):
+        sql_ids = [movie_id for _, _, movie_id in query_popular_movies(genre, N=args.top_n)]
+        board_ids = [movie_id for _, _, movie_id in popularity_board.top(args.top_n, genre=genre)]
+        print(f"Top {args.top_n} identiques ({genre or 'global'}) : {sql_ids == board_ids}")
+
+    for genre in (None, args.genre):
+        label = genre or "global"
+        sql = measure(lambda: query_popular_movies(genre, N=args.top_n), args.requests)
+        board = measure(lambda: popularity_board.top(args.top_n, genre=genre), args.requests * 100)
+        print(summary(f"SQL ({label})", sql))
+        print(summary(f"Mémoire ({label})", board))
+        print(f"Accélération p50 : x{np.median(sql) / np.median(board):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
 from api.endpoints import training, predict, data, monitoring
 from api.schemas import HealthResponse
+from api.model_registry import model_registry
+from api.audit import audit_sink
+from api.result_cache import recommendation_cache
+from api.known_users import known_users
+from api.fold_in import fold_in_engine
+from api.ranking import ranking_cache
+from api.popularity import popularity_board, ensure_popularity_table
+from api import executor
 from api.prometheus_metrics import (
     api_requests_total,
     api_request_duration_seconds,
@@ -62,6 +70,35 @@ app.include_router(predict.router)
 app.include_router(data.router)
 app.include_router(monitoring.router)
 
+@app.on_event("startup")
+async def start_model_watcher():
+    """Charge le modèle en arrière-plan et surveille les nouvelles versions"""
+    # Les réponses en cache ne survivent pas à une bascule de version
+    model_registry.on_swap(lambda snapshot: recommendation_cache.clear())
+    model_registry.on_swap(lambda snapshot: fold_in_engine.clear())
+    model_registry.on_swap(lambda snapshot: ranking_cache.clear())
+    # Index des utilisateurs connus reconstruit à chaque chargement de modèle
+    # (thread de chargement, hors du chemin des requêtes)
+    model_registry.on_swap(lambda snapshot: known_users.load_from_db())
+    # Classements de popularité alignés sur le catalogue de la nouvelle version
+    model_registry.on_swap(lambda snapshot: popularity_board.load_from_db(snapshot.catalog))
+    # Table de popularité prête avant le premier generate-ratings, modèle chargé ou non
+    try:
+        ensure_popularity_table()
+    except Exception as e:
+        logger.error(f"Initialisation de movie_popularity impossible : {e}")
+    model_registry.start_watcher()
+    audit_sink.start()
+
+
+@app.on_event("shutdown")
+async def stop_model_watcher():
+    model_registry.stop_watcher()
+    # Dernier flush des prédictions en attente d'audit
+    audit_sink.stop()
+    executor.shutdown()
+
+
 # Endpoint pour les métriques Prometheus
 @app.get("/metrics")
 async def metrics():
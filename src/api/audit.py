@@ -0,0 +1,188 @@
+"""
+Audit asynchrone des prédictions
+- Les requêtes déposent un enregistrement dans une file bornée (sans attente)
+- Un thread worker écrit des segments JSONL/Parquet par intervalle ou par lot
+- Chaque segment est loggé comme un artefact MLflow dans une run unique
+- File pleine : l'enregistrement est abandonné et compté dans Prometheus
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import pandas as pd
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from pipeline.config import load_config
+from api.prometheus_metrics import audit_records_total, audit_queue_size, audit_flushes_total
+
+logger = logging.getLogger(__name__)
+
+
+class MlflowAuditUploader:
+    """Logge les segments d'audit comme artefacts d'une run MLflow unique par processus"""
+
+    def __init__(self, tracking_uri: str, experiment_name: str):
+        self.tracking_uri = tracking_uri
+        self.experiment_name = experiment_name
+        self.client = None
+        self.run_id: Optional[str] = None
+
+    def _ensure_run(self):
+        if self.run_id is not None:
+            return
+        from mlflow.tracking import MlflowClient
+
+        self.client = MlflowClient(tracking_uri=self.tracking_uri)
+        experiment = self.client.get_experiment_by_name(self.experiment_name)
+        experiment_id = (
+            experiment.experiment_id if experiment
+            else self.client.create_experiment(self.experiment_name)
+        )
+        run = self.client.create_run(
+            experiment_id,
+            tags={"mlflow.runName": "Prediction_Audit", "pid": str(os.getpid())}
+        )
+        self.run_id = run.info.run_id
+
+    def __call__(self, path: str, n_records: int):
+        self._ensure_run()
+        self.client.log_artifact(self.run_id, path, artifact_path="audit")
+        self.client.log_metric(self.run_id, "audited_predictions", n_records)
+
+    def close(self):
+        if self.run_id is not None:
+            self.client.set_terminated(self.run_id)
+            self.run_id = None
+
+
+class AuditSink:
+    """File d'audit bornée vidée par lots dans un thread d'arrière-plan"""
+
+    def __init__(
+        self,
+        output_dir: str,
+        file_format: str = "jsonl",
+        max_queue_size: int = 10000,
+        flush_interval: float = 60.0,
+        flush_max_records: int = 5000,
+        uploader: Optional[Callable[[str, int], None]] = None
+    ):
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.flush_interval = flush_interval
+        self.flush_max_records = flush_max_records
+        self.uploader = uploader
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._segment = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "AuditSink":
+        config = config or load_config()
+        audit_config = config["audit"]
+        uploader = None
+        if audit_config.get("log_to_mlflow", True):
+            uploader = MlflowAuditUploader(
+                config["mlflow"]["tracking_uri"], config["mlflow"]["experiment_name"]
+            )
+        return cls(
+            output_dir=audit_config["output_dir"],
+            file_format=audit_config.get("format", "jsonl"),
+            max_queue_size=audit_config.get("max_queue_size", 10000),
+            flush_interval=audit_config.get("flush_interval_seconds", 60),
+            flush_max_records=audit_config.get("flush_max_records", 5000),
+            uploader=uploader
+        )
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Dépose un enregistrement sans bloquer ; False s'il a été abandonné"""
+        record.setdefault("timestamp", datetime.now().isoformat())
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            audit_records_total.labels(status="dropped").inc()
+            return False
+        audit_records_total.labels(status="queued").inc()
+        audit_queue_size.set(self._queue.qsize())
+        return True
+
+    def _drain(self, batch: List[Dict[str, Any]], timeout: float):
+        """Récupère des enregistrements jusqu'au timeout ou à la taille de lot"""
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+            while len(batch) < self.flush_max_records:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        audit_queue_size.set(self._queue.qsize())
+
+    def _write_segment(self, batch: List[Dict[str, Any]]) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._segment += 1
+        name = f"audit-{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._segment:05d}"
+        if self.file_format == "parquet":
+            path = os.path.join(self.output_dir, f"{name}.parquet")
+            pd.DataFrame(batch).to_parquet(path, index=False)
+        else:
+            path = os.path.join(self.output_dir, f"{name}.jsonl")
+            with open(path, "w") as f:
+                for record in batch:
+                    f.write(json.dumps(record) + "\n")
+        return path
+
+    def flush(self, batch: List[Dict[str, Any]]):
+        """Écrit un segment et le logge dans MLflow"""
+        if not batch:
+            return
+        try:
+            path = self._write_segment(batch)
+            if self.uploader is not None:
+                self.uploader(path, len(batch))
+            audit_records_total.labels(status="flushed").inc(len(batch))
+            audit_flushes_total.labels(status="success").inc()
+            logger.info(f"Segment d'audit écrit: {path} ({len(batch)} prédictions)")
+        except Exception as e:
+            audit_flushes_total.labels(status="error").inc()
+            logger.warning(f"Erreur lors de l'écriture du segment d'audit: {e}")
+
+    def _run(self):
+        batch: List[Dict[str, Any]] = []
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            remaining = max(self.flush_interval - (time.monotonic() - last_flush), 0.0)
+            self._drain(batch, timeout=min(remaining, 1.0) or 0.01)
+            if len(batch) >= self.flush_max_records or time.monotonic() - last_flush >= self.flush_interval:
+                self.flush(batch)
+                batch = []
+                last_flush = time.monotonic()
+        # Arrêt : vider tout ce qui reste dans la file
+        while True:
+            self._drain(batch, timeout=0.01)
+            if not batch:
+                break
+            self.flush(batch)
+            batch = []
+
+    def start(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Arrête le worker après un dernier flush"""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+        if isinstance(self.uploader, MlflowAuditUploader):
+            try:
+                self.uploader.close()
+            except Exception as e:
+                logger.warning(f"Erreur lors de la clôture de la run d'audit: {e}")
+
+
+audit_sink = AuditSink.from_config()
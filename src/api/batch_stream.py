@@ -0,0 +1,135 @@
+"""
+Prédictions batch en streaming
+- Réutilise la version du modèle déjà chargée par l'API (aucun rechargement
+  du modèle ni de la table ratings)
+- Scoring vectorisé par blocs d'utilisateurs, mémoire bornée par bloc
+- Chaque bloc est encodé (NDJSON ou Arrow IPC) et envoyé dès qu'il est prêt,
+  pendant que le bloc suivant est scoré
+"""
+import io
+import json
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pipeline.predict_model_pipeline import top_n_user
+from pipeline.model_store import ModelArtifact
+from api.executor import run_blocking, score_artifact_batch
+from api.cold_start import get_popular_movies
+
+logger = logging.getLogger(__name__)
+
+Recommendations = List[Tuple[str, float, int]]
+
+
+def _score_chunk_legacy(snapshot, user_ids: List[int], N: int) -> List[Recommendations]:
+    """Modèle picklé sans export (KNN, baseline) : scoring utilisateur par utilisateur"""
+    return [
+        top_n_user(snapshot.model, snapshot.trainset, snapshot.catalog, user_id=user_id, N=N)
+        for user_id in user_ids
+    ]
+
+
+async def _score_chunk(snapshot, user_ids: List[int], N: int) -> List[Recommendations]:
+    model = snapshot.model
+    if isinstance(model, ModelArtifact):
+        scored = await score_artifact_batch(model, user_ids, [N] * len(user_ids))
+        return [snapshot.catalog.attach(top_n) for top_n in scored]
+    return await run_blocking(_score_chunk_legacy, snapshot, user_ids, N)
+
+
+async def iter_batch_recommendations(
+    snapshot,
+    user_ids: List[int],
+    N: int,
+    chunk_size: int = 256
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Génère les recommandations par blocs de chunk_size utilisateurs.
+    Le bloc suivant est scoré pendant l'encodage et l'envoi du bloc courant.
+    Les utilisateurs absents du modèle reçoivent les films populaires
+    (une seule requête pour tout le batch).
+    """
+    chunks = [user_ids[start:start + chunk_size] for start in range(0, len(user_ids), chunk_size)]
+    if not chunks:
+        return
+    popular: Optional[Recommendations] = None
+    pending = asyncio.ensure_future(_score_chunk(snapshot, chunks[0], N))
+    try:
+        for position, chunk in enumerate(chunks):
+            results = await pending
+            if position + 1 < len(chunks):
+                pending = asyncio.ensure_future(_score_chunk(snapshot, chunks[position + 1], N))
+
+            records = []
+            for user_id, top_n in zip(chunk, results):
+                method = "collaborative_filtering"
+                if not top_n:
+                    if popular is None:
+                        try:
+                            popular = await run_blocking(get_popular_movies, N=N)
+                        except Exception as e:
+                            logger.warning(f"Films populaires indisponibles pour le batch: {e}")
+                            popular = []
+                    top_n, method = popular, "cold_start"
+                records.append({
+                    "user_id": user_id,
+                    "method": method,
+                    "model_version": snapshot.version,
+                    "recommendations": [
+                        {"movie": movie, "score": float(score), "movie_id": movie_id}
+                        for movie, score, movie_id in top_n
+                    ],
+                })
+            yield records
+    finally:
+        # Client déconnecté : le bloc en cours de scoring n'est plus attendu
+        if not pending.done():
+            pending.cancel()
+
+
+def encode_ndjson(records: List[Dict[str, Any]]) -> bytes:
+    """Un objet JSON par utilisateur et par ligne"""
+    return "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+
+class ArrowStreamEncoder:
+    """Encode les blocs en un flux Arrow IPC (un RecordBatch par bloc)"""
+
+    def __init__(self):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("user_id", pa.int64()),
+            ("method", pa.string()),
+            ("model_version", pa.string()),
+            ("movie_ids", pa.list_(pa.int32())),
+            ("titles", pa.list_(pa.string())),
+            ("scores", pa.list_(pa.float32())),
+        ])
+        self._buffer = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._buffer, self.schema)
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def encode(self, records: List[Dict[str, Any]]) -> bytes:
+        recs = [record["recommendations"] for record in records]
+        batch = self.pa.record_batch([
+            self.pa.array([record["user_id"] for record in records], self.pa.int64()),
+            self.pa.array([record["method"] for record in records], self.pa.string()),
+            self.pa.array([record["model_version"] for record in records], self.pa.string()),
+            self.pa.array([[r["movie_id"] for r in rec] for rec in recs], self.pa.list_(self.pa.int32())),
+            self.pa.array([[r["movie"] for r in rec] for rec in recs], self.pa.list_(self.pa.string())),
+            self.pa.array([[r["score"] for r in rec] for rec in recs], self.pa.list_(self.pa.float32())),
+        ], schema=self.schema)
+        self._writer.write_batch(batch)
+        return self._drain()
+
+    def close(self) -> bytes:
+        """Marqueur de fin de flux"""
+        self._writer.close()
+        return self._drain()
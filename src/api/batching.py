@@ -0,0 +1,103 @@
+"""
+Micro-batching des requêtes de prédiction
+- Les requêtes arrivant dans une fenêtre courte (window_ms) ou jusqu'à
+  max_batch_size utilisateurs sont regroupées
+- Chaque lot est scoré en un seul produit matrice-matrice, puis chaque
+  appelant reçoit son propre top N
+- Taille des lots et attente en file exportées dans Prometheus
+"""
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from pipeline.config import load_config
+from api.executor import score_artifact_batch
+from api.prometheus_metrics import predict_batch_size, predict_batch_queue_wait_seconds
+
+logger = logging.getLogger(__name__)
+
+ScoreBatch = Callable[[Any, List[int], List[int]], Awaitable[List[List[Tuple[int, float]]]]]
+
+
+class _Pending:
+    """Requête en attente dans le lot courant"""
+
+    __slots__ = ("model", "user_id", "N", "future", "enqueued_at")
+
+    def __init__(self, model, user_id: int, N: int, future: asyncio.Future):
+        self.model = model
+        self.user_id = user_id
+        self.N = N
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """Regroupe les requêtes concurrentes d'une même boucle d'événements"""
+
+    def __init__(self, score_batch: ScoreBatch = score_artifact_batch,
+                 window_ms: float = 2.0, max_batch_size: int = 64, enabled: bool = True):
+        self.score_batch = score_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.enabled = enabled
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "MicroBatcher":
+        config = config or load_config()
+        batching = config["serving"].get("batching", {})
+        return cls(
+            window_ms=batching.get("window_ms", 2.0),
+            max_batch_size=batching.get("max_batch_size", 64),
+            enabled=batching.get("enabled", False)
+        )
+
+    async def submit(self, model, user_id: int, N: int) -> List[Tuple[int, float]]:
+        """Ajoute un utilisateur au lot courant et attend son top N [(movie_id, score)]"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_Pending(model, user_id, N, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        # Une bascule de modèle pendant la fenêtre peut mêler deux versions
+        groups: Dict[int, List[_Pending]] = {}
+        for pending in batch:
+            groups.setdefault(id(pending.model), []).append(pending)
+        for group in groups.values():
+            asyncio.ensure_future(self._run(group))
+
+    async def _run(self, group: List[_Pending]):
+        now = time.perf_counter()
+        predict_batch_size.observe(len(group))
+        for pending in group:
+            predict_batch_queue_wait_seconds.observe(now - pending.enqueued_at)
+        try:
+            results = await self.score_batch(
+                group[0].model, [p.user_id for p in group], [p.N for p in group]
+            )
+        except Exception as e:
+            logger.error(f"Erreur lors du scoring d'un lot de {len(group)} utilisateurs: {e}")
+            for pending in group:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+        for pending, result in zip(group, results):
+            # La requête a pu être annulée (client déconnecté) pendant le scoring
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+
+micro_batcher = MicroBatcher.from_config()
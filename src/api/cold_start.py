@@ -4,10 +4,12 @@ Module pour gérer le problème du Cold Start
 - Nouveaux films : recommandations basées sur similarité de genres
 """
 import logging
+import numpy as np
 import pandas as pd
 import psycopg2
 from typing import List, Tuple, Optional
 from pipeline.config import load_config
+from api.popularity import popularity_board
 
 logger = logging.getLogger(__name__)
 
@@ -23,19 +25,27 @@ def get_db_connection():
     )
 
 
-def is_new_user(user_id: int) -> bool:
-    """Vérifie si un utilisateur est nouveau (pas de ratings)"""
+def count_user_ratings(user_id: int) -> int:
+    """Nombre de ratings d'un utilisateur (requête exacte)"""
     conn = get_db_connection()
     try:
         query = "SELECT COUNT(*) FROM ratings WHERE user_id = %s"
-        count = pd.read_sql(query, conn, params=(user_id,)).iloc[0, 0]
-        return count == 0
+        return int(pd.read_sql(query, conn, params=(user_id,)).iloc[0, 0])
     finally:
         conn.close()
 
 
+def is_new_user(user_id: int) -> bool:
+    """Vérifie si un utilisateur est nouveau (pas de ratings)"""
+    return count_user_ratings(user_id) == 0
+
+
 def is_new_movie(movie_id: int) -> bool:
     """Vérifie si un film est nouveau (pas de ratings)"""
+    # Compteurs de popularité en mémoire : évite le parcours de ratings par movie_id
+    num_ratings = popularity_board.num_ratings(movie_id)
+    if num_ratings is not None:
+        return num_ratings == 0
     conn = get_db_connection()
     try:
         query = "SELECT COUNT(*) FROM ratings WHERE movie_id = %s"
@@ -45,42 +55,17 @@ def is_new_movie(movie_id: int) -> bool:
         conn.close()
 
 
-def get_popular_movies(N: int = 10) -> List[Tuple[str, float]]:
-    """
-    Retourne les N films les plus populaires (basés sur nombre de ratings et moyenne)
-    Format: [(title, score), ...]
-    """
-    conn = get_db_connection()
-    try:
-        query = """
-        SELECT 
-            m.title,
-            COUNT(r.rating) as num_ratings,
-            AVG(r.rating) as avg_rating,
-            (COUNT(r.rating) * AVG(r.rating)) / (COUNT(r.rating) + 100) as popularity_score
-        FROM movies m
-        LEFT JOIN ratings r ON m.movie_id = r.movie_id
-        GROUP BY m.movie_id, m.title
-        HAVING COUNT(r.rating) >= 10
-        ORDER BY popularity_score DESC, num_ratings DESC
-        LIMIT %s
-        """
-        df = pd.read_sql(query, conn, params=(N,))
-        return [(row['title'], float(row['popularity_score'])) for _, row in df.iterrows()]
-    finally:
-        conn.close()
-
-
-def get_popular_movies_by_genre(genre: Optional[str] = None, N: int = 10) -> List[Tuple[str, float]]:
+def query_popular_movies(genre: Optional[str] = None, N: int = 10) -> List[Tuple[str, float, int]]:
     """
-    Retourne les N films les plus populaires d'un genre spécifique
-    Si genre est None, retourne les films populaires tous genres confondus
+    Agrégation SQL complète (ratings x movies) des films populaires.
+    Repli tant que les classements en mémoire ne sont pas chargés.
     """
     conn = get_db_connection()
     try:
         if genre:
             query = """
             SELECT 
+                m.movie_id,
                 m.title,
                 COUNT(r.rating) as num_ratings,
                 AVG(r.rating) as avg_rating,
@@ -99,6 +84,7 @@ def get_popular_movies_by_genre(genre: Optional[str] = None, N: int = 10) -> Lis
         else:
             query = """
             SELECT 
+                m.movie_id,
                 m.title,
                 COUNT(r.rating) as num_ratings,
                 AVG(r.rating) as avg_rating,
@@ -112,11 +98,34 @@ def get_popular_movies_by_genre(genre: Optional[str] = None, N: int = 10) -> Lis
             """
             df = pd.read_sql(query, conn, params=(N,))
         
-        return [(row['title'], float(row['popularity_score'])) for _, row in df.iterrows()]
+        return [
+            (row['title'], float(row['popularity_score']), int(row['movie_id']))
+            for _, row in df.iterrows()
+        ]
     finally:
         conn.close()
 
 
+def get_popular_movies(N: int = 10) -> List[Tuple[str, float, int]]:
+    """
+    Retourne les N films les plus populaires (basés sur nombre de ratings et moyenne)
+    Format: [(title, score, movie_id), ...]
+    """
+    return get_popular_movies_by_genre(None, N=N)
+
+
+def get_popular_movies_by_genre(genre: Optional[str] = None, N: int = 10) -> List[Tuple[str, float, int]]:
+    """
+    Retourne les N films les plus populaires d'un genre spécifique
+    Si genre est None, retourne les films populaires tous genres confondus
+    Lecture des classements matérialisés en mémoire, SQL en repli
+    """
+    top = popularity_board.top(N, genre=genre)
+    if top is not None:
+        return top
+    return query_popular_movies(genre, N=N)
+
+
 def get_user_preferred_genres(user_id: int, top_k: int = 3) -> List[str]:
     """
     Retourne les genres préférés d'un utilisateur basés sur ses ratings
@@ -144,35 +153,63 @@ def get_user_preferred_genres(user_id: int, top_k: int = 3) -> List[str]:
         conn.close()
 
 
-def get_cold_start_recommendations(user_id: int, N: int = 5) -> List[Tuple[str, float]]:
+def fetch_user_ratings(user_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(movie_ids, notes) d'un utilisateur, en une requête sur la clé primaire"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT movie_id, rating FROM ratings WHERE user_id = %s", (user_id,))
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+    movie_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    ratings = np.array([float(row[1]) for row in rows], dtype=np.float32)
+    return movie_ids, ratings
+
+
+def get_cold_start_recommendations(
+    user_id: int,
+    N: int = 5,
+    has_ratings: Optional[bool] = None
+) -> List[Tuple[str, float, int]]:
     """
     Génère des recommandations pour un nouvel utilisateur (cold start)
     Stratégie:
     1. Si l'utilisateur a quelques ratings, utiliser ses genres préférés
     2. Sinon, utiliser les films les plus populaires
+    has_ratings : déjà connu de l'appelant (index des utilisateurs connus),
+    sinon vérifié en base
+    Avec les classements en mémoire : une seule requête (les notes de
+    l'utilisateur), affinité de genres et popularité calculées en une passe
     """
-    # Vérifier si l'utilisateur a quelques ratings
-    conn = get_db_connection()
-    try:
-        query = "SELECT COUNT(*) FROM ratings WHERE user_id = %s"
-        rating_count = pd.read_sql(query, conn, params=(user_id,)).iloc[0, 0]
-    finally:
-        conn.close()
+    if has_ratings is False:
+        return get_popular_movies(N=N)
+
+    if popularity_board.ready:
+        movie_ids, ratings = fetch_user_ratings(user_id)
+        if movie_ids.size:
+            recommendations = popularity_board.top_for_ratings(movie_ids, ratings, N=N, top_k_genres=3)
+            if recommendations:
+                return recommendations
+        return get_popular_movies(N=N)
+
+    if has_ratings is None:
+        has_ratings = count_user_ratings(user_id) > 0
     
-    if rating_count > 0:
+    if has_ratings:
         # Utilisateur avec quelques ratings : utiliser genres préférés
         preferred_genres = get_user_preferred_genres(user_id, top_k=3)
         if preferred_genres:
             # Prendre des films des genres préférés
-            recommendations = []
+            recommendations = {}
             films_per_genre = max(2, N // len(preferred_genres) + 1)
             for genre in preferred_genres[:3]:
                 genre_movies = get_popular_movies_by_genre(genre, N=films_per_genre)
-                recommendations.extend(genre_movies)
+                # Un film présent dans plusieurs genres n'est recommandé qu'une fois
+                for rec in genre_movies:
+                    recommendations.setdefault(rec[2], rec)
             # Trier par score et prendre les top N
-            recommendations.sort(key=lambda x: x[1], reverse=True)
-            return recommendations[:N]
+            return sorted(recommendations.values(), key=lambda x: x[1], reverse=True)[:N]
     
     # Utilisateur complètement nouveau : films populaires
     return get_popular_movies(N=N)
-
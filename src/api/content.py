@@ -0,0 +1,34 @@
+"""
+Accès de l'API à l'index genome (recommandations par contenu)
+- Version active du dossier genome, chargée en mmap au premier appel
+- Rechargée si le pointeur CURRENT change (nouvel export)
+"""
+import os
+import logging
+import threading
+from typing import Optional
+from pipeline.config import load_config
+from pipeline.content_model import GenomeIndex, load_genome_index
+from pipeline.model_store import read_current
+
+logger = logging.getLogger(__name__)
+
+GENOME_DIR = load_config()["serving"].get("genome_dir", "/app/models/genome")
+
+_index: Optional[GenomeIndex] = None
+_lock = threading.Lock()
+
+
+def get_genome_index() -> Optional[GenomeIndex]:
+    """Index genome actif (None si aucun export)"""
+    global _index
+    version = read_current(GENOME_DIR)
+    if version is None:
+        return None
+    if _index is not None and _index.version == version:
+        return _index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = load_genome_index(os.path.join(GENOME_DIR, version))
+            logger.info(f"Index genome version {version} chargé ({len(_index)} films)")
+    return _index
@@ -10,6 +10,11 @@ from datetime import datetime
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from api.schemas import HealthResponse
+from api.result_cache import recommendation_cache
+from api.known_users import known_users
+from api.fold_in import fold_in_engine
+from api.ranking import ranking_cache
+from api.popularity import popularity_board, ensure_popularity_table
 from pipeline.config import load_config
 from typing import Optional
 
@@ -67,37 +72,64 @@ async def generate_random_ratings_internal(
     conn = None
     try:
         conn = get_db_connection()
+        # Table de synthèse agrégée avant tout incrément (si le démarrage n'a pas pu le faire)
+        ensure_popularity_table(conn)
         cursor = conn.cursor()
 
+        # Insertion et mise à jour des compteurs de popularité dans la même requête
         query = """
-        INSERT INTO ratings (user_id, movie_id, rating, timestamp)
-        SELECT
-            u.user_id,
-            m.movie_id,
-            (FLOOR(RANDOM() * 10) + 1) * 0.5,
-            EXTRACT(EPOCH FROM NOW()) * 1000
-        FROM
-            (SELECT user_id FROM users ORDER BY RANDOM() LIMIT 500) u
-        CROSS JOIN
-            (SELECT movie_id FROM movies ORDER BY RANDOM() LIMIT 500) m
-        LEFT JOIN
-            ratings r ON u.user_id = r.user_id AND m.movie_id = r.movie_id
-        WHERE
-            r.user_id IS NULL
-            AND u.user_id IS NOT NULL
-            AND m.movie_id IS NOT NULL
-        LIMIT %s;
+        WITH inserted AS (
+            INSERT INTO ratings (user_id, movie_id, rating, timestamp)
+            SELECT
+                u.user_id,
+                m.movie_id,
+                (FLOOR(RANDOM() * 10) + 1) * 0.5,
+                EXTRACT(EPOCH FROM NOW()) * 1000
+            FROM
+                (SELECT user_id FROM users ORDER BY RANDOM() LIMIT 500) u
+            CROSS JOIN
+                (SELECT movie_id FROM movies ORDER BY RANDOM() LIMIT 500) m
+            LEFT JOIN
+                ratings r ON u.user_id = r.user_id AND m.movie_id = r.movie_id
+            WHERE
+                r.user_id IS NULL
+                AND u.user_id IS NOT NULL
+                AND m.movie_id IS NOT NULL
+            LIMIT %s
+            RETURNING user_id, movie_id, rating
+        ), popularity AS (
+            INSERT INTO movie_popularity (movie_id, num_ratings, rating_sum)
+            SELECT movie_id, COUNT(*), SUM(rating)
+            FROM inserted
+            GROUP BY movie_id
+            ON CONFLICT (movie_id) DO UPDATE
+            SET num_ratings = movie_popularity.num_ratings + EXCLUDED.num_ratings,
+                rating_sum = movie_popularity.rating_sum + EXCLUDED.rating_sum
+        )
+        SELECT user_id, movie_id, rating FROM inserted;
         """
 
         cursor.execute(query, (count,))
+        rows = cursor.fetchall()
+        user_ids = {row[0] for row in rows}
+        inserted = cursor.rowcount
         conn.commit()
 
-        message = f"Inserted {count} new ratings."
+        # Classements de popularité en mémoire mis à jour sans réagrégation
+        popularity_board.add_ratings([row[1] for row in rows], [float(row[2]) for row in rows])
+        # Les recommandations en cache de ces utilisateurs sont périmées
+        recommendation_cache.invalidate_users(user_ids)
+        fold_in_engine.invalidate_users(user_ids)
+        ranking_cache.invalidate_users(user_ids)
+        # Ces utilisateurs ne relèvent plus du cold start « nouvel utilisateur »
+        known_users.add(user_ids)
+
+        message = f"Inserted {inserted} new ratings."
         logger.info(message)
 
         return JSONResponse(content={
             "status": "success", 
-            "inserted": count,
+            "inserted": inserted,
             "message": message 
         })  
 
@@ -1,70 +1,106 @@
 import logging
 import os
-import pandas as pd
-import joblib
-import psycopg2
-from functools import lru_cache
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from api.schemas import PredictionRequest, PredictionResponse, MovieRecommendation, BatchPredictionRequest, BatchPredictionResponse
+from fastapi.responses import StreamingResponse
+from api.schemas import (
+    PredictionRequest,
+    PredictionResponse,
+    MovieRecommendation,
+    BatchPredictionRequest,
+    PagedPredictionRequest,
+    PagedPredictionResponse,
+    StreamPredictionRequest
+)
 from pipeline.config import load_config
-from surprise import Dataset, Reader
-from pipeline.predict_model_pipeline import top_n_user, predict_model_mlflow
-from api.cold_start import is_new_user, get_cold_start_recommendations
+from pipeline.predict_model_pipeline import top_n_user
+from pipeline.model_store import ModelArtifact
+from api.executor import run_blocking, score_artifact
+from api.batch_stream import iter_batch_recommendations, encode_ndjson, ArrowStreamEncoder
+from api.model_registry import model_registry
+from api.batching import micro_batcher
+from api.audit import audit_sink
+from api.result_cache import recommendation_cache
+from api.fold_in import fold_in_engine
+from api.ranking import (
+    MIN_EXTENSION,
+    ranking_cache,
+    build_ranking,
+    decode_cursor,
+    encode_cursor,
+    resume_offset
+)
+from api.content import get_genome_index
+from api.cold_start import get_cold_start_recommendations, is_new_movie
+from api.known_users import known_users
 from api.monitoring import log_recommendation, compute_recommendation_metrics
-from api.prometheus_metrics import recommendations_total
+from api.prometheus_metrics import recommendations_total, predict_requests_by_method_total
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/predict", tags=["predict"])
 
 
-@lru_cache(maxsize=1)
 def load_model_and_data():
-    logger.info("Chargement du modèle et des données en mémoire...")
-    config = load_config()
-    
-    # Chemins
-    model_path = os.path.join(config["model"]["model_dir"], config["model"]["model_filename"])
-    
-    # Vérifier que le modèle existe
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(
-            f"Le modèle n'existe pas à {model_path}. "
-            "Veuillez d'abord entraîner le modèle via POST /training/"
-        )
-    
-    # Charger le modèle
-    model = joblib.load(model_path)
-    
-    # Charger les données depuis PostgreSQL
-    conn = psycopg2.connect(
-        dbname=config["db"]["dbname"],
-        user=config["db"]["user"],
-        password=config["db"]["password"],
-        host=config["db"]["host"],
-        port=config["db"]["port"]
+    """Retourne (modèle, trainset, catalogue) de la version active du registre"""
+    snapshot = model_registry.current()
+    return snapshot.model, snapshot.trainset, snapshot.catalog
+
+
+async def score_user(snapshot, user_id: int, N: int):
+    """Top N [(titre, score, movie_id)] d'un utilisateur, calculé hors de la boucle d'événements"""
+    model = snapshot.model
+    if isinstance(model, ModelArtifact):
+        if model.to_inner_uid(user_id) is None:
+            return []
+        # Scoring exact en direct : regroupé avec les requêtes concurrentes
+        if micro_batcher.enabled and model.search == "exact" and not model.is_precomputed(N):
+            scored = await micro_batcher.submit(model, user_id, N)
+        else:
+            scored = await score_artifact(model, user_id, N)
+        return snapshot.catalog.attach(scored)
+    return await run_blocking(
+        top_n_user,
+        algo=model,
+        trainset=snapshot.trainset,
+        catalog=snapshot.catalog,
+        user_id=user_id,
+        N=N
     )
-    
-    # Charger les ratings
-    ratings_df = pd.read_sql("SELECT user_id, movie_id, rating FROM ratings", conn)
-    
-    # Charger les films
-    movies_df = pd.read_sql("SELECT movie_id, title FROM movies", conn)
-    
-    # Fermer la connexion
-    conn.close()
-    
-    # Préparer le dataset Surprise
-    predict_sample_size = config["predict"]["predict_sample_size"]
-    if predict_sample_size < len(ratings_df):
-        ratings_sample = ratings_df.sample(n=predict_sample_size, random_state=42)
+
+
+async def compute_recommendations(user_id: int, N: int):
+    """
+    Calcule le top N d'un utilisateur : filtrage collaboratif, fold-in pour les
+    utilisateurs absents du modèle, ou cold start pour les nouveaux utilisateurs.
+    Retourne (top_n, méthode, version du modèle).
+    """
+    # Vérifier si l'utilisateur est nouveau (cold start) : bitmap en mémoire,
+    # requête SQL uniquement tant que l'index n'est pas construit
+    if known_users.ready:
+        new_user = known_users.is_new_user(user_id)
     else:
-        ratings_sample = ratings_df
-    
-    reader = Reader(rating_scale=(0.5, 5))
-    df_surprise = Dataset.load_from_df(ratings_sample[['user_id', 'movie_id', 'rating']], reader)
-    trainset = df_surprise.build_full_trainset()
-    
-    return model, trainset, movies_df
+        new_user = await run_blocking(known_users.is_new_user, user_id)
+    if new_user:
+        logger.info(f"Utilisateur {user_id} est nouveau, utilisation de cold start")
+        top_n = await run_blocking(get_cold_start_recommendations, user_id, N=N, has_ratings=False)
+        return top_n, "cold_start", None
+
+    # Premier chargement éventuel du modèle hors de la boucle
+    await run_blocking(model_registry.current)
+
+    # Réserver la version active du modèle le temps du scoring
+    with model_registry.acquire() as snapshot:
+        top_n = await score_user(snapshot, user_id, N)
+        if top_n:
+            return top_n, "collaborative_filtering", snapshot.version
+        # Utilisateur noté après l'entraînement : vecteur calculé à la volée
+        scored = await run_blocking(fold_in_engine.top_n, snapshot.model, user_id, N)
+    if scored:
+        return snapshot.catalog.attach(scored), "fold_in", snapshot.version
+
+    # Pas de recommandations (utilisateur dans la base mais pas dans le modèle)
+    logger.warning(f"Pas de recommandations pour utilisateur {user_id}, fallback vers cold start")
+    top_n = await run_blocking(get_cold_start_recommendations, user_id, N=N, has_ratings=True)
+    return top_n, "cold_start_fallback", snapshot.version
 
 
 @router.post("/", response_model=PredictionResponse)
@@ -74,83 +110,60 @@ async def get_recommendations(request: PredictionRequest):
     
     Gère automatiquement le cold start pour les nouveaux utilisateurs.
     Retourne les top N films recommandés pour l'utilisateur spécifié.
+    Les appels bloquants (DB, scoring) s'exécutent dans un pool borné ;
+    l'audit MLflow est groupé en arrière-plan. Les réponses sont mises en
+    cache par (user_id, top_n, version du modèle).
     """
     try:
-        # Vérifier si l'utilisateur est nouveau (cold start)
-        if is_new_user(request.user_id):
-            logger.info(f"Utilisateur {request.user_id} est nouveau, utilisation de cold start")
-            top_n = get_cold_start_recommendations(request.user_id, N=request.top_n)
-            method = "cold_start"
+        # Réponse en cache pour la version active du modèle
+        cache_version = model_registry.current_version
+        cached = recommendation_cache.get(request.user_id, request.top_n, cache_version)
+        if cached is not None:
+            top_n, method, model_version = cached
         else:
-            # Charger le modèle et les données
-            model, trainset, movies_df = load_model_and_data()
-            
-            # Obtenir les recommandations avec le modèle
-            top_n = top_n_user(
-                algo=model,
-                trainset=trainset,
-                movies_df=movies_df,
-                user_id=request.user_id,
-                N=request.top_n
-            )
-            method = "collaborative_filtering"
-            
-            # Si pas de recommandations (utilisateur dans trainset mais pas de prédictions)
-            if not top_n:
-                logger.warning(f"Pas de recommandations pour utilisateur {request.user_id}, fallback vers cold start")
-                top_n = get_cold_start_recommendations(request.user_id, N=request.top_n)
-                method = "cold_start_fallback"
+            top_n, method, model_version = await compute_recommendations(request.user_id, request.top_n)
+            # Pas de mise en cache si le modèle a basculé pendant la requête
+            if top_n and model_version in (None, cache_version):
+                recommendation_cache.put(
+                    request.user_id, request.top_n, cache_version, (top_n, method, model_version)
+                )
         
         if not top_n:
             raise HTTPException(
                 status_code=404,
                 detail=f"Impossible de générer des recommandations pour l'utilisateur {request.user_id}."
             )
+        predict_requests_by_method_total.labels(method=method).inc()
         
         # Convertir en format de réponse
         recommendations = [
-            MovieRecommendation(movie=movie, score=score)
-            for movie, score in top_n
+            MovieRecommendation(movie=movie, score=score, movie_id=movie_id)
+            for movie, score, movie_id in top_n
         ]
         
-        top_score = max([score for _, score in top_n], default=None)
+        top_score = max([score for _, score, _ in top_n], default=None)
         
         # Logger la recommandation pour monitoring
         try:
-            log_recommendation(request.user_id, top_n, method=method)
+            await run_blocking(log_recommendation, request.user_id, top_n, method=method)
             # Incrémenter le compteur Prometheus
             recommendations_total.inc(len(recommendations))
         except Exception as e:
             logger.warning(f"Erreur lors du logging de la recommandation: {e}")
         
-        # Sauvegarder automatiquement en CSV + MLflow
-        try:
-            import mlflow
-            import os
-            
-            # Créer le dossier predictions si nécessaire
-            os.makedirs("predictions", exist_ok=True)
-            
-            # Sauvegarder en CSV
-            results_df = pd.DataFrame(top_n, columns=['movie', 'score'])
-            csv_path = f"./predictions/top_{request.top_n}_user_{request.user_id}.csv"
-            results_df.to_csv(csv_path, index=False)
-            
-            # Logger dans MLflow
-            config = load_config()
-            mlflow.set_tracking_uri(config["mlflow"]["tracking_uri"])
-            mlflow.set_experiment(config["mlflow"]["experiment_name"])
-            
-            with mlflow.start_run(run_name=f"Prediction_User_{request.user_id}"):
-                mlflow.log_param("user_id", request.user_id)
-                mlflow.log_param("top_n", request.top_n)
-                mlflow.log_param("method", method)
-                mlflow.log_metric("top_score", top_score if top_score else 0.0)
-                mlflow.log_artifact(csv_path)
-            
-            logger.info(f"Prédictions sauvegardées: {csv_path}")
-        except Exception as e:
-            logger.warning(f"Erreur lors de la sauvegarde MLflow: {e}")
+        # Audit asynchrone (segments groupés + MLflow, hors du chemin de la requête)
+        audit_sink.submit({
+            "user_id": request.user_id,
+            "top_n": request.top_n,
+            "method": method,
+            "model_version": model_version,
+            "cached": cached is not None,
+            "top_score": top_score,
+            "recommendations": [
+                {"movie": movie, "score": float(score), "movie_id": movie_id}
+                for movie, score, movie_id in top_n
+            ],
+        })
         
         return PredictionResponse(
             user_id=request.user_id,
@@ -158,6 +171,8 @@ async def get_recommendations(request: PredictionRequest):
             top_score=top_score
         )
         
+    except HTTPException:
+        raise
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
@@ -170,18 +185,137 @@ async def get_recommendations(request: PredictionRequest):
         )
 
 
+async def get_ranking(snapshot, user_id: int):
+    """Classement complet de l'utilisateur pour la version réservée (en cache ou calculé)"""
+    ranking = ranking_cache.get(user_id, snapshot.version)
+    if ranking is None:
+        ranking = await run_blocking(build_ranking, snapshot.model, snapshot.version, user_id)
+        if ranking is not None:
+            ranking_cache.put(user_id, ranking)
+    if ranking is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Classement indisponible pour l'utilisateur {user_id} (absent du modèle exporté et sans assez de notes)"
+        )
+    return ranking
+
+
+@router.post("/page", response_model=PagedPredictionResponse)
+async def get_recommendation_page(request: PagedPredictionRequest):
+    """
+    Parcours paginé du classement complet d'un utilisateur ("plus de films").
+    
+    Le classement est calculé une fois puis trié par morceaux à mesure que
+    les pages avancent, et gardé peu de temps en cache : une page déjà
+    classée est une tranche. Le curseur opaque renvoyé permet de demander
+    la page suivante ; il est refusé (409) si le modèle a changé entre-temps.
+    """
+    cursor = None
+    if request.cursor:
+        try:
+            cursor = decode_cursor(request.cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        await run_blocking(model_registry.current)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    with model_registry.acquire() as snapshot:
+        if cursor is not None and cursor["v"] != snapshot.version:
+            raise HTTPException(
+                status_code=409,
+                detail="Le modèle a changé depuis la page précédente : reprendre sans curseur"
+            )
+        ranking = await get_ranking(snapshot, request.user_id)
+        model = snapshot.model
+        offset = 0
+        if cursor is not None:
+            try:
+                offset = await run_blocking(resume_offset, ranking, cursor, model)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        items, scores = await run_blocking(ranking.page, offset, request.page_size)
+        movie_ids = model.item_ids[items]
+        page = snapshot.catalog.attach(zip(movie_ids.tolist(), model.scorer.clip(scores).tolist()))
+    
+    next_cursor = None
+    if items.shape[0] and offset + items.shape[0] < ranking.total:
+        next_cursor = encode_cursor(
+            snapshot.version, offset + int(items.shape[0]), float(scores[-1]), int(movie_ids[-1])
+        )
+    predict_requests_by_method_total.labels(method=ranking.method).inc()
+    recommendations_total.inc(len(page))
+    return PagedPredictionResponse(
+        user_id=request.user_id,
+        recommendations=[
+            MovieRecommendation(movie=movie, score=score, movie_id=movie_id)
+            for movie, score, movie_id in page
+        ],
+        offset=offset,
+        total=ranking.total,
+        next_cursor=next_cursor,
+        model_version=snapshot.version
+    )
+
+
+@router.post("/stream")
+async def stream_recommendations(request: StreamPredictionRequest):
+    """
+    Classement d'un utilisateur renvoyé en NDJSON au fil du tri : un premier
+    bloc court part dès qu'il est classé, les blocs suivants doublent de taille.
+    """
+    try:
+        await run_blocking(model_registry.current)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    async def stream():
+        # Version réservée pour le classement et toutes les pages : comptée dans
+        # in_flight (status, drainage) jusqu'à la fin du flux
+        with model_registry.acquire() as snapshot:
+            ranking = await get_ranking(snapshot, request.user_id)
+            model, catalog = snapshot.model, snapshot.catalog
+            limit = min(request.limit, ranking.total)
+            predict_requests_by_method_total.labels(method=ranking.method).inc()
+            # Premier élément : version servie, pour l'en-tête de la réponse
+            yield snapshot.version
+            offset, size = 0, MIN_EXTENSION
+            while offset < limit:
+                items, scores = await run_blocking(ranking.page, offset, min(size, limit - offset))
+                if items.shape[0] == 0:
+                    return
+                scored = catalog.attach(zip(model.item_ids[items].tolist(), model.scorer.clip(scores).tolist()))
+                recommendations_total.inc(len(scored))
+                yield encode_ndjson([
+                    {"rank": offset + rank, "movie": movie, "score": score, "movie_id": movie_id}
+                    for rank, (movie, score, movie_id) in enumerate(scored)
+                ])
+                offset += items.shape[0]
+                size *= 2
+    
+    pages = stream()
+    version = await pages.__anext__()
+    return StreamingResponse(
+        pages,
+        media_type="application/x-ndjson",
+        headers={"X-Model-Version": str(version)}
+    )
+
+
 @router.get("/health")
 async def predict_health():
     """Vérifie que le service de prédiction est opérationnel"""
     try:
-        model, trainset, movies_df = load_model_and_data()
+        await run_blocking(model_registry.current)
         return {
             "status": "healthy",
             "model_loaded": True,
             "model_path": os.path.join(
                 load_config()["model"]["model_dir"],
                 load_config()["model"]["model_filename"]
-            )
+            ),
+            **model_registry.status()
         }
     except FileNotFoundError:
         return {
@@ -197,49 +331,116 @@ async def predict_health():
         }
 
 
-@router.post("/batch", response_model=BatchPredictionResponse)
+@router.post("/batch")
 async def run_batch_predictions(request: BatchPredictionRequest):
     """
     Exécute des prédictions batch pour plusieurs utilisateurs.
     
-    Sauvegarde les résultats en CSV dans le dossier predictions/
-    et log les artefacts dans MLflow.
+    Utilise le modèle déjà chargé par l'API et score les utilisateurs par
+    blocs vectorisés. Les résultats sont renvoyés en streaming au fil des
+    blocs : NDJSON (un utilisateur par ligne) ou flux Arrow IPC.
     """
     try:
-        import mlflow
-        
-        # Exécuter le pipeline de prédiction batch
-        predict_model_mlflow(users_id=request.user_ids, N=request.top_n)
-        
-        # Récupérer le run_id de la dernière exécution
-        client = mlflow.tracking.MlflowClient()
-        experiment = client.get_experiment_by_name(load_config()["mlflow"]["experiment_name"])
-        if experiment:
-            runs = client.search_runs(
-                experiment_ids=[experiment.experiment_id],
-                order_by=["start_time DESC"],
-                max_results=1
-            )
-            run_id = runs[0].info.run_id if runs else None
-        else:
-            run_id = None
-        
-        return BatchPredictionResponse(
-            status="success",
-            message=f"Prédictions batch générées pour {len(request.user_ids)} utilisateurs",
-            users_processed=len(request.user_ids),
-            predictions_dir="./predictions",
-            mlflow_run_id=run_id
-        )
-        
+        await run_blocking(model_registry.current)
     except FileNotFoundError as e:
         raise HTTPException(
             status_code=404,
             detail=f"Modèle non trouvé: {str(e)}. Veuillez d'abord entraîner le modèle."
         )
-    except Exception as e:
-        logger.error(f"Erreur lors de la prédiction batch: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Erreur lors de la génération des prédictions batch: {str(e)}"
+    
+    chunk_size = load_config()["serving"].get("batch_chunk_size", 256)
+    if request.format == "arrow":
+        encoder = ArrowStreamEncoder()
+        encode, media_type = encoder.encode, "application/vnd.apache.arrow.stream"
+    else:
+        encoder = None
+        encode, media_type = encode_ndjson, "application/x-ndjson"
+    
+    async def stream():
+        # Même version du modèle pour tout le batch, même en cas de bascule
+        with model_registry.acquire() as snapshot:
+            n_users = 0
+            try:
+                async for records in iter_batch_recommendations(
+                    snapshot, request.user_ids, request.top_n, chunk_size
+                ):
+                    n_users += len(records)
+                    recommendations_total.inc(sum(len(r["recommendations"]) for r in records))
+                    yield encode(records)
+            except Exception as e:
+                # Les en-têtes sont déjà envoyés : l'erreur est signalée dans le flux
+                logger.error(f"Erreur lors de la prédiction batch: {e}", exc_info=True)
+                if encoder is None:
+                    yield encode_ndjson([{"error": str(e), "users_processed": n_users}])
+                return
+            if encoder is not None:
+                yield encoder.close()
+            audit_sink.submit({
+                "batch": True,
+                "users": n_users,
+                "top_n": request.top_n,
+                "model_version": snapshot.version,
+            })
+    
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"X-Model-Version": str(model_registry.current_version)}
+    )
+
+
+@router.get("/similar/{movie_id}")
+async def get_similar_movies(movie_id: int, top_n: int = 10):
+    """
+    Films les plus proches d'un film selon le genome MovieLens
+    (cosinus entre vecteurs de pertinence des tags).
+    """
+    genome = await run_blocking(get_genome_index)
+    if genome is None:
+        raise HTTPException(status_code=404, detail="Index genome non exporté (python -m pipeline.content_model)")
+    similar = await run_blocking(genome.similar_movies, movie_id, N=min(max(top_n, 1), 100))
+    if not similar:
+        raise HTTPException(status_code=404, detail=f"Pas de genome pour le film {movie_id}")
+    catalog = await run_blocking(model_registry.catalog)
+    return {
+        "movie_id": movie_id,
+        "genome_version": genome.version,
+        "similar": [
+            {"movie": movie, "score": score, "movie_id": similar_id}
+            for movie, score, similar_id in catalog.attach(similar)
+        ],
+    }
+
+
+@router.get("/audience/{movie_id}")
+async def get_movie_audience(movie_id: int, top_n: int = 100):
+    """
+    Utilisateurs susceptibles d'aimer un film, y compris un nouveau film sans
+    notes : similarité genome moyenne avec les films de leur historique.
+    """
+    genome = await run_blocking(get_genome_index)
+    if genome is None:
+        raise HTTPException(status_code=404, detail="Index genome non exporté (python -m pipeline.content_model)")
+    await run_blocking(model_registry.current)
+    with model_registry.acquire() as snapshot:
+        model = snapshot.model
+        if not isinstance(model, ModelArtifact) or not model.has_seen_index:
+            raise HTTPException(status_code=409, detail="Le modèle actif n'a pas d'index des films vus")
+        users = await run_blocking(
+            genome.users_for_movie,
+            movie_id,
+            model.user_ids,
+            model.item_ids,
+            model.arrays["seen_indptr"],
+            model.arrays["seen_indices"],
+            N=min(max(top_n, 1), 1000)
         )
+    if not users:
+        raise HTTPException(status_code=404, detail=f"Pas de genome pour le film {movie_id}")
+    return {
+        "movie_id": movie_id,
+        "new_movie": await run_blocking(is_new_movie, movie_id),
+        "genome_version": genome.version,
+        "model_version": snapshot.version,
+        "users": [{"user_id": user_id, "score": score} for user_id, score in users],
+    }
@@ -6,6 +6,7 @@ from pipeline.train_model_pipeline import train_model_mlflow
 import mlflow
 from pipeline.config import load_config
 from api.prometheus_metrics import training_runs_total
+from api.model_registry import model_registry
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/training", tags=["training"])
@@ -18,15 +19,15 @@ training_status = {
 }
 
 
-def run_training(force=False):
+def run_training(force=False, incremental=False):
     global training_status
     try:
         training_status["is_training"] = True
         training_status["last_error"] = None
         
-        logger.info(f"Demarrage de l'entrainement du modele (force={force})...")
+        logger.info(f"Demarrage de l'entrainement du modele (force={force}, incremental={incremental})...")
         
-        run_id = train_model_mlflow(force=force)
+        run_id = train_model_mlflow(force=force, incremental=incremental)
         
         if run_id:
             training_status["last_run_id"] = run_id
@@ -51,6 +52,9 @@ def run_training(force=False):
         
         training_runs_total.inc()
         
+        # Charger la nouvelle version du modèle sans redémarrer l'API
+        model_registry.reload_async()
+        
         logger.info("Entrainement termine avec succes")
         training_status["is_training"] = False
         
@@ -76,7 +80,7 @@ async def trigger_training(
         )
     
     try:
-        background_tasks.add_task(run_training, force=request.force)
+        background_tasks.add_task(run_training, force=request.force, incremental=request.incremental)
         
         return TrainingResponse(
             status="started",
@@ -131,7 +135,7 @@ async def get_training_status():
             runs = mlflow.search_runs(
                 order_by=["start_time desc"],
                 max_results=1,
-                filter_string="tags.mlflow.runName != 'Prediction_User_%'"
+                filter_string="tags.mlflow.runName != 'Prediction_Audit'"
             )
             
             if not runs.empty:
@@ -0,0 +1,86 @@
+"""
+Exécution des traitements bloquants hors de la boucle d'événements
+- Pool de threads borné pour les appels base de données, MLflow et le scoring
+- Pool de processus optionnel pour le scoring CPU des modèles exportés :
+  chaque worker mappe lui-même le dossier de version (aucun modèle picklé)
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pipeline.config import load_config
+from pipeline.model_store import ModelArtifact, load_model_artifact
+
+logger = logging.getLogger(__name__)
+
+_config = load_config()["serving"].get("executor", {})
+EXECUTOR_KIND = _config.get("kind", "thread")
+MAX_WORKERS = _config.get("max_workers", 8)
+
+_thread_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="predict")
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+# Modèles mappés dans chaque processus worker, par dossier de version
+_worker_artifacts: Dict[str, ModelArtifact] = {}
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+    return _process_pool
+
+
+def _worker_artifact(version_dir: str) -> ModelArtifact:
+    """Modèle d'un processus worker (mappé une fois par version)"""
+    artifact = _worker_artifacts.get(version_dir)
+    if artifact is None:
+        _worker_artifacts.clear()
+        artifact = load_model_artifact(version_dir)
+        _worker_artifacts[version_dir] = artifact
+    return artifact
+
+
+def _score_in_worker(version_dir: str, user_id: int, N: int) -> List[Tuple[int, float]]:
+    """Scoring dans un processus worker"""
+    return _worker_artifact(version_dir).top_n(user_id, N=N)
+
+
+def _score_batch_in_worker(version_dir: str, user_ids: List[int], Ns: List[int]) -> List[List[Tuple[int, float]]]:
+    """Scoring d'un lot d'utilisateurs dans un processus worker"""
+    return _worker_artifact(version_dir).top_n_batch(user_ids, Ns)
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Exécute une fonction bloquante (DB, MLflow, fichiers) dans le pool de threads"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_thread_pool, partial(func, *args, **kwargs))
+
+
+async def score_artifact(artifact: ModelArtifact, user_id: int, N: int) -> List[Tuple[int, float]]:
+    """Top N [(movie_id, score)] d'un modèle exporté, dans le pool configuré"""
+    if EXECUTOR_KIND == "process":
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_process_pool(), _score_in_worker, artifact.version_dir, user_id, N
+        )
+    return await run_blocking(artifact.top_n, user_id, N)
+
+
+async def score_artifact_batch(artifact: ModelArtifact, user_ids: List[int],
+                               Ns: List[int]) -> List[List[Tuple[int, float]]]:
+    """Top N d'un lot d'utilisateurs en un seul produit matrice-matrice"""
+    if EXECUTOR_KIND == "process":
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_process_pool(), _score_batch_in_worker, artifact.version_dir, user_ids, Ns
+        )
+    return await run_blocking(artifact.top_n_batch, user_ids, Ns)
+
+
+def shutdown():
+    """Arrête les pools (appelé à l'arrêt de l'API)"""
+    _thread_pool.shutdown(wait=False)
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False)
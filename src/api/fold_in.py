@@ -0,0 +1,110 @@
+"""
+Fold-in en temps réel des utilisateurs absents du modèle entraîné
+(notes postérieures au dernier entraînement, ou écartés par l'échantillonnage)
+- Leurs notes sont lues en une requête, puis un vecteur utilisateur est
+  résolu par moindres carrés régularisés contre les facteurs items figés
+- Vecteurs gardés dans un cache LRU (invalidé à la bascule de modèle et à
+  l'insertion de nouvelles notes)
+"""
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from pipeline.config import load_config
+from pipeline.model_store import ModelArtifact
+from api.cold_start import fetch_user_ratings
+
+logger = logging.getLogger(__name__)
+
+# (version du modèle, facteurs ou profil creux du voisinage, biais, items internes déjà notés)
+FoldedUser = Tuple[str, Any, float, np.ndarray]
+
+
+class FoldInEngine:
+    """Vecteurs utilisateurs calculés à la volée, avec cache LRU"""
+
+    def __init__(self, max_entries: int = 10000, reg: float = 0.02, min_ratings: int = 3,
+                 enabled: bool = True,
+                 ratings_loader: Callable[[int], Tuple[np.ndarray, np.ndarray]] = fetch_user_ratings):
+        self.ratings_loader = ratings_loader
+        self.max_entries = max_entries
+        self.reg = reg
+        self.min_ratings = min_ratings
+        self.enabled = enabled
+        self._entries: "OrderedDict[int, FoldedUser]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "FoldInEngine":
+        config = config or load_config()
+        fold_in_config = config["serving"].get("fold_in", {})
+        return cls(
+            max_entries=fold_in_config.get("max_entries", 10000),
+            reg=fold_in_config.get("reg", 0.02),
+            min_ratings=fold_in_config.get("min_ratings", 3),
+            enabled=fold_in_config.get("enabled", False)
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, user_id: int, version: str) -> Optional[FoldedUser]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(user_id)
+            return entry
+
+    def _put(self, user_id: int, entry: FoldedUser):
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def fold_in(self, model: ModelArtifact, movie_ids, ratings) -> Optional[FoldedUser]:
+        """Vecteur d'un utilisateur à partir de ses notes (None si trop peu de films connus)"""
+        items = model.to_inner_iids(movie_ids)
+        known = items >= 0
+        if int(known.sum()) < self.min_ratings:
+            return None
+        items = items[known]
+        pu, bu = model.scorer.fold_in(items, np.asarray(ratings)[known], reg=self.reg)
+        return model.version, pu, bu, np.unique(items)
+
+    def user_vector(self, model: ModelArtifact, user_id: int) -> Optional[FoldedUser]:
+        """Vecteur en cache pour cette version du modèle, sinon calculé depuis la base"""
+        entry = self._get(user_id, model.version)
+        if entry is None:
+            movie_ids, ratings = self.ratings_loader(user_id)
+            entry = self.fold_in(model, movie_ids, ratings)
+            if entry is not None:
+                self._put(user_id, entry)
+        return entry
+
+    def top_n(self, model: Any, user_id: int, N: int = 5) -> List[Tuple[int, float]]:
+        """Top N [(movie_id, score)] d'un utilisateur hors modèle ([] si impossible)"""
+        if not self.enabled or not isinstance(model, ModelArtifact):
+            return []
+        entry = self.user_vector(model, user_id)
+        if entry is None:
+            return []
+        _, pu, bu, seen = entry
+        scorer = model.scorer
+        items, scores = scorer.top_n_from_item_scores(scorer.score_vector(pu, bu), N, seen)
+        return [(int(model.item_ids[i]), float(s)) for i, s in zip(items, scores)]
+
+    def invalidate_users(self, user_ids: Iterable[int]):
+        """Vecteurs périmés par de nouvelles notes"""
+        with self._lock:
+            for user_id in set(user_ids):
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fold_in_engine = FoldInEngine.from_config()
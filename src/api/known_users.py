@@ -0,0 +1,87 @@
+"""
+Index en mémoire des utilisateurs ayant au moins une note
+- Bitmap indexé par user_id (1 bit par utilisateur : ~17 Ko pour 138k utilisateurs)
+- Reconstruit depuis la table ratings à chaque chargement de modèle, puis mis
+  à jour à l'insertion de nouvelles notes par les endpoints de données
+  (avec plusieurs workers, les insertions d'un autre worker sont prises en
+  compte au chargement de modèle suivant)
+- Tant que le bitmap n'est pas construit, repli sur la requête SQL exacte
+"""
+import logging
+import threading
+import numpy as np
+from typing import Iterable, Optional
+from api.cold_start import get_db_connection, count_user_ratings
+
+logger = logging.getLogger(__name__)
+
+
+class KnownUserIndex:
+    """Bitmap des user_id ayant au moins une note"""
+
+    def __init__(self):
+        self._bits: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._bits is not None
+
+    @staticmethod
+    def _bitmap(user_ids: np.ndarray, size: int = 0) -> np.ndarray:
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        user_ids = user_ids[user_ids >= 0]
+        n_bytes = max(size, (int(user_ids.max()) >> 3) + 1 if user_ids.size else 0)
+        bits = np.zeros(n_bytes, dtype=np.uint8)
+        np.bitwise_or.at(bits, user_ids >> 3, (1 << (user_ids & 7)).astype(np.uint8))
+        return bits
+
+    def build(self, user_ids: Iterable[int]):
+        """Remplace le bitmap (les lectures concurrentes voient l'ancien ou le nouveau)"""
+        bits = self._bitmap(np.fromiter(user_ids, dtype=np.int64))
+        with self._lock:
+            self._bits = bits
+        logger.info(f"Index des utilisateurs connus construit ({bits.nbytes} octets)")
+
+    def load_from_db(self):
+        """Construit le bitmap depuis les user_id distincts de la table ratings"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT DISTINCT user_id FROM ratings")
+                self.build(row[0] for row in cursor)
+        finally:
+            conn.close()
+
+    def add(self, user_ids: Iterable[int]):
+        """Marque des utilisateurs comme connus (nouvelles notes insérées)"""
+        user_ids = np.fromiter(user_ids, dtype=np.int64)
+        if user_ids.size == 0:
+            return
+        with self._lock:
+            if self._bits is None:
+                return
+            # Nouveau tableau (copie) : les lectures concurrentes restent cohérentes
+            bits = self._bitmap(user_ids, self._bits.shape[0])
+            bits[:self._bits.shape[0]] |= self._bits
+            self._bits = bits
+
+    def contains(self, user_id: int) -> Optional[bool]:
+        """True/False si le bitmap est construit, None sinon"""
+        bits = self._bits
+        if bits is None:
+            return None
+        byte = user_id >> 3
+        if user_id < 0 or byte >= bits.shape[0]:
+            return False
+        return bool(bits[byte] & (1 << (user_id & 7)))
+
+    def is_new_user(self, user_id: int) -> bool:
+        """Utilisateur sans aucune note (requête SQL seulement si le bitmap n'est pas prêt)"""
+        known = self.contains(user_id)
+        if known is None:
+            return count_user_ratings(user_id) == 0
+        return not known
+
+
+known_users = KnownUserIndex()
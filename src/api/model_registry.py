@@ -0,0 +1,271 @@
+"""
+Registre des modèles servis par l'API
+- Détecte une nouvelle version (pointeur du dossier d'export ou registry MLflow)
+- Charge la nouvelle version dans un thread d'arrière-plan
+- Bascule atomiquement : les requêtes en cours gardent l'ancienne version
+  jusqu'à leur fin, les suivantes utilisent la nouvelle
+- Avec plusieurs workers uvicorn, les tableaux du modèle sont publiés une
+  fois dans un segment partagé (/dev/shm) et mappés par chaque worker
+"""
+import os
+import time
+import shutil
+import logging
+import threading
+import joblib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pipeline.config import load_config
+from pipeline.catalog import MovieCatalog, load_catalog
+from pipeline.model_store import load_model_artifact, read_current
+from pipeline.shared_model import publish_version, publish_surprise_pickle
+
+logger = logging.getLogger(__name__)
+
+
+class ModelSnapshot:
+    """Version de modèle chargée en mémoire"""
+
+    def __init__(self, version: str, model: Any, trainset: Any, catalog: MovieCatalog,
+                 source: str, load_seconds: float):
+        self.version = version
+        self.model = model
+        self.trainset = trainset
+        self.catalog = catalog
+        self.source = source
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.now()
+        self.in_flight = 0
+
+
+def _attach_version(config, version_dir: str):
+    """Mappe une version exportée, via le segment partagé entre workers si activé"""
+    shared = config["serving"].get("shared_memory", {})
+    if shared.get("enabled"):
+        version_dir = publish_version(version_dir, shared["dir"], shared.get("keep_versions", 2))
+    return load_model_artifact(version_dir)
+
+
+def _load_pickle(config, model_path: str, version: str):
+    """Pickle Surprise : converti une fois dans le segment partagé s'il a des facteurs"""
+    shared = config["serving"].get("shared_memory", {})
+    if shared.get("enabled"):
+        shared_path = publish_surprise_pickle(
+            model_path, shared["dir"], version, shared.get("keep_versions", 2)
+        )
+        if shared_path is not None:
+            return load_model_artifact(shared_path), None
+    model = joblib.load(model_path)
+    return model, model.trainset
+
+
+def _resolve_directory(config) -> Optional[Tuple[str, Callable[[], Tuple[Any, Any]]]]:
+    """Version active du dossier d'export (ou du pickle à défaut)"""
+    export_dir = config["serving"]["export_dir"]
+    version = read_current(export_dir)
+    if version is not None:
+        version_dir = os.path.join(export_dir, version)
+        return version, lambda: (_attach_version(config, version_dir), None)
+
+    model_path = os.path.join(config["model"]["model_dir"], config["model"]["model_filename"])
+    if os.path.exists(model_path):
+        version = f"pickle-{int(os.path.getmtime(model_path))}"
+        return version, lambda: _load_pickle(config, model_path, version)
+    return None
+
+
+def _resolve_mlflow(config) -> Optional[Tuple[str, Callable[[], Tuple[Any, Any]]]]:
+    """Dernière version du modèle enregistré dans le registry MLflow"""
+    import mlflow
+    from mlflow.tracking import MlflowClient
+
+    mlflow.set_tracking_uri(config["mlflow"]["tracking_uri"])
+    client = MlflowClient()
+    versions = client.get_latest_versions(config["serving"]["registered_model_name"])
+    if not versions:
+        return None
+    latest = max(versions, key=lambda v: int(v.version))
+    run_id = latest.run_id
+    serving_version = client.get_run(run_id).data.params.get("serving_version")
+
+    def load_from_mlflow():
+        export_dir = config["serving"]["export_dir"]
+        os.makedirs(export_dir, exist_ok=True)
+        if serving_version:
+            # Export de serving : téléchargé une fois dans le dossier d'export
+            version_dir = os.path.join(export_dir, serving_version)
+            if not os.path.exists(version_dir):
+                tmp_dir = os.path.join(export_dir, f".{serving_version}.download")
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                path = mlflow.artifacts.download_artifacts(
+                    run_id=run_id, artifact_path="serving", dst_path=tmp_dir
+                )
+                os.rename(path, version_dir)
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            return _attach_version(config, version_dir), None
+        # Modèle sans export (KNN, baseline) : pickle loggé avec la run
+        path = mlflow.artifacts.download_artifacts(
+            run_id=run_id, artifact_path=config["model"]["model_filename"]
+        )
+        return _load_pickle(config, path, f"mlflow-{latest.version}")
+
+    return f"mlflow-{latest.version}", load_from_mlflow
+
+
+class ModelRegistry:
+    """Détient la version active du modèle et la remplace à chaud"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 catalog_loader: Callable[[], MovieCatalog] = load_catalog):
+        self.config = config or load_config()
+        self.catalog_loader = catalog_loader
+        self.poll_interval = self.config["serving"].get("reload_interval_seconds", 30)
+        self.source = self.config["serving"].get("reload_source", "directory")
+        self.last_error: Optional[str] = None
+        self._current: Optional[ModelSnapshot] = None
+        self._catalog: Optional[MovieCatalog] = None
+        self._retired: List[ModelSnapshot] = []
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._swap_listeners: List[Callable[[ModelSnapshot], None]] = []
+
+    def _resolve(self):
+        if self.source == "mlflow":
+            return _resolve_mlflow(self.config)
+        return _resolve_directory(self.config)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Charge la version disponible si elle diffère de la version active.
+        Retourne True si une bascule a eu lieu.
+        """
+        with self._reload_lock:
+            resolved = self._resolve()
+            if resolved is None:
+                raise FileNotFoundError(
+                    "Aucun modèle disponible. "
+                    "Veuillez d'abord entraîner le modèle via POST /training/"
+                )
+            version, loader = resolved
+            current = self._current
+            if not force and current is not None and current.version == version:
+                return False
+
+            logger.info(f"Chargement du modèle version {version}...")
+            start = time.perf_counter()
+            model, trainset = loader()
+            # Catalogue reconstruit à chaque version (nouveaux films importés)
+            catalog = self.catalog_loader()
+            snapshot = ModelSnapshot(
+                version, model, trainset, catalog,
+                source=self.source, load_seconds=time.perf_counter() - start
+            )
+
+            with self._lock:
+                previous = self._current
+                self._current = snapshot
+                self._catalog = catalog
+                if previous is not None and previous.in_flight > 0:
+                    self._retired.append(previous)
+            logger.info(
+                f"Modèle version {version} actif (chargé en {snapshot.load_seconds:.2f}s)"
+                + (f", remplace {previous.version}" if previous is not None else "")
+            )
+            self.last_error = None
+            for listener in self._swap_listeners:
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    logger.warning(f"Erreur d'un abonné à la bascule de modèle: {e}")
+            return True
+
+    def on_swap(self, listener: Callable[[ModelSnapshot], None]):
+        """Enregistre une fonction appelée après chaque bascule de version"""
+        self._swap_listeners.append(listener)
+
+    def _safe_reload(self):
+        try:
+            self.reload()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"Rechargement du modèle impossible: {e}")
+
+    def reload_async(self) -> threading.Thread:
+        """Lance la vérification/chargement dans un thread d'arrière-plan"""
+        thread = threading.Thread(target=self._safe_reload, name="model-reload", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def current_version(self) -> Optional[str]:
+        """Version active sans déclencher de chargement (None si aucune)"""
+        snapshot = self._current
+        return snapshot.version if snapshot is not None else None
+
+    def current(self) -> ModelSnapshot:
+        """Version active (chargée de façon synchrone au premier appel)"""
+        if self._current is None:
+            self.reload()
+        return self._current
+
+    def catalog(self) -> MovieCatalog:
+        """Catalogue de la version active (chargé seul tant qu'aucun modèle n'existe)"""
+        if self._catalog is None:
+            with self._reload_lock:
+                if self._catalog is None:
+                    self._catalog = self.catalog_loader()
+        return self._catalog
+
+    @contextmanager
+    def acquire(self):
+        """
+        Réserve la version active pour la durée d'une requête.
+        Une bascule pendant la requête ne l'affecte pas.
+        """
+        self.current()
+        with self._lock:
+            snapshot = self._current
+            snapshot.in_flight += 1
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                snapshot.in_flight -= 1
+                self._retired = [s for s in self._retired if s.in_flight > 0]
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self._safe_reload()
+
+    def start_watcher(self):
+        """Démarre la surveillance périodique des nouvelles versions"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+        # Chargement initial sans bloquer le démarrage de l'API
+        self.reload_async()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        """État du registre pour les endpoints de santé"""
+        snapshot = self._current
+        return {
+            "source": self.source,
+            "model_version": snapshot.version if snapshot else None,
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot else None,
+            "load_seconds": round(snapshot.load_seconds, 3) if snapshot else None,
+            "search": getattr(snapshot.model, "search", "exact") if snapshot else None,
+            "in_flight": snapshot.in_flight if snapshot else 0,
+            "draining_versions": [s.version for s in self._retired],
+            "last_error": self.last_error,
+        }
+
+
+model_registry = ModelRegistry()
@@ -29,7 +29,7 @@ def get_db_connection():
 
 def log_recommendation(
     user_id: int,
-    recommendations: List[Tuple[str, float]],
+    recommendations: List[Tuple[str, float, int]],
     method: str = "collaborative_filtering"
 ):
     """
@@ -44,8 +44,8 @@ def log_recommendation(
         "method": method,
         "num_recommendations": len(recommendations),
         "recommendations": [
-            {"movie": movie, "score": score}
-            for movie, score in recommendations
+            {"movie": movie, "score": score, "movie_id": movie_id}
+            for movie, score, movie_id in recommendations
         ]
     }
     
@@ -53,19 +53,19 @@ def log_recommendation(
         f.write(json.dumps(log_entry) + '\n')
 
 
-def compute_diversity(recommendations: List[Tuple[str, float]]) -> float:
+def compute_diversity(recommendations: List[Tuple[str, float, int]]) -> float:
     """
     Calcule la diversité des recommandations
     Basé sur le nombre de films uniques recommandés
     Plus simple: ratio films uniques / total
     """
-    unique_movies = len(set([movie for movie, _ in recommendations]))
+    unique_movies = len(set([rec[0] for rec in recommendations]))
     total = len(recommendations)
     return unique_movies / total if total > 0 else 0.0
 
 
 def compute_novelty(
-    recommendations: List[Tuple[str, float]],
+    recommendations: List[Tuple[str, float, int]],
     popular_movies: Optional[List[str]] = None
 ) -> float:
     """
@@ -91,13 +91,13 @@ def compute_novelty(
         finally:
             conn.close()
     
-    recommended_movies = [movie for movie, _ in recommendations]
+    recommended_movies = [rec[0] for rec in recommendations]
     novel_count = sum(1 for movie in recommended_movies if movie not in popular_movies)
     return novel_count / len(recommendations) if recommendations else 0.0
 
 
 def compute_coverage(
-    all_recommendations: List[List[Tuple[str, float]]],
+    all_recommendations: List[List[Tuple[str, float, int]]],
     total_movies: Optional[int] = None
 ) -> float:
     """
@@ -114,13 +114,13 @@ def compute_coverage(
     
     recommended_movies = set()
     for rec_list in all_recommendations:
-        recommended_movies.update([movie for movie, _ in rec_list])
+        recommended_movies.update([rec[0] for rec in rec_list])
     
     return len(recommended_movies) / total_movies if total_movies > 0 else 0.0
 
 
 def compute_recommendation_metrics(
-    recommendations: List[Tuple[str, float]],
+    recommendations: List[Tuple[str, float, int]],
     user_id: Optional[int] = None
 ) -> Dict[str, Any]:
     """
@@ -129,9 +129,9 @@ def compute_recommendation_metrics(
     diversity = compute_diversity(recommendations)
     novelty = compute_novelty(recommendations)
     
-    avg_score = sum([score for _, score in recommendations]) / len(recommendations) if recommendations else 0.0
-    max_score = max([score for _, score in recommendations], default=0.0)
-    min_score = min([score for _, score in recommendations], default=0.0)
+    avg_score = sum([rec[1] for rec in recommendations]) / len(recommendations) if recommendations else 0.0
+    max_score = max([rec[1] for rec in recommendations], default=0.0)
+    min_score = min([rec[1] for rec in recommendations], default=0.0)
     
     return {
         "diversity": round(diversity, 4),
@@ -169,7 +169,7 @@ def get_recommendation_statistics(days: int = 7) -> Dict[str, Any]:
                 entry = json.loads(line)
                 entry_date = datetime.fromisoformat(entry['timestamp'])
                 if entry_date >= cutoff_date:
-                    recs = [(r['movie'], r['score']) for r in entry['recommendations']]
+                    recs = [(r['movie'], r['score'], r.get('movie_id')) for r in entry['recommendations']]
                     metrics = compute_recommendation_metrics(recs)
                     all_diversities.append(metrics['diversity'])
                     all_novelties.append(metrics['novelty'])
@@ -0,0 +1,255 @@
+"""
+Classements de popularité matérialisés (global et par genre)
+- Compteurs (nombre, somme des notes) par film, persistés dans la table
+  movie_popularity et tenus à jour à l'insertion des ratings
+- Score amorti identique à la requête SQL historique :
+  nb * moyenne / (nb + amortissement) = somme / (nb + amortissement)
+- Classements recalculés en mémoire à chaque mise à jour : une réponse
+  cold start est une tranche de tableau
+- Table créée et agrégée depuis ratings au démarrage de l'API
+  (ensure_popularity_table), indépendamment du chargement d'un modèle ;
+  l'agrégation initiale est marquée dans movie_popularity_seed
+"""
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import psycopg2
+import scipy.sparse as sp
+from typing import Any, Dict, List, Optional, Tuple
+from pipeline.config import load_config
+from pipeline.catalog import MovieCatalog
+
+logger = logging.getLogger(__name__)
+
+# Bases créées avant l'ajout de la table de synthèse
+CREATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS movie_popularity (
+    movie_id INTEGER PRIMARY KEY REFERENCES movies(movie_id) ON DELETE CASCADE,
+    num_ratings BIGINT NOT NULL DEFAULT 0,
+    rating_sum DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS movie_popularity_seed (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    seeded_at TIMESTAMP NOT NULL DEFAULT NOW()
+)
+"""
+
+# Agrégation complète, utilisée une fois tant que le marqueur d'initialisation est absent
+# (remplace aussi les compteurs incrémentés avant elle)
+REBUILD_QUERY = """
+INSERT INTO movie_popularity (movie_id, num_ratings, rating_sum)
+SELECT movie_id, COUNT(*), SUM(rating)
+FROM ratings
+GROUP BY movie_id
+ON CONFLICT (movie_id) DO UPDATE
+SET num_ratings = EXCLUDED.num_ratings, rating_sum = EXCLUDED.rating_sum
+"""
+
+
+def get_db_connection():
+    """Établit une connexion à PostgreSQL"""
+    config = load_config()
+    return psycopg2.connect(
+        dbname=config["db"]["dbname"],
+        user=config["db"]["user"],
+        password=config["db"]["password"],
+        host=config["db"]["host"],
+        port=config["db"]["port"]
+    )
+
+
+def ensure_popularity_table(conn=None):
+    """
+    Crée movie_popularity si besoin et l'agrège depuis ratings tant que le
+    marqueur movie_popularity_seed est absent. Le verrou de table bloque les
+    mises à jour incrémentales concurrentes pendant l'agrégation.
+    """
+    own_connection = conn is None
+    conn = conn or get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(CREATE_TABLE_QUERY)
+            conn.commit()
+            cursor.execute("SELECT 1 FROM movie_popularity_seed")
+            if cursor.fetchone() is None:
+                cursor.execute("LOCK TABLE movie_popularity_seed, movie_popularity IN EXCLUSIVE MODE")
+                cursor.execute("SELECT 1 FROM movie_popularity_seed")
+                if cursor.fetchone() is None:
+                    logger.info("Agrégation initiale de movie_popularity depuis ratings...")
+                    cursor.execute(REBUILD_QUERY)
+                    cursor.execute("INSERT INTO movie_popularity_seed DEFAULT VALUES")
+            conn.commit()
+    finally:
+        if own_connection:
+            conn.close()
+
+
+class _Leaderboards:
+    """Classements figés (positions du catalogue triées par popularité)"""
+
+    def __init__(self, catalog: MovieCatalog, scores: np.ndarray, overall: np.ndarray,
+                 by_genre: Dict[str, np.ndarray]):
+        self.catalog = catalog
+        self.scores = scores
+        self.overall = overall
+        self.by_genre = by_genre
+        # Rang de chaque position dans le classement global (-1 : non éligible)
+        self.rank = np.full(len(catalog), -1, dtype=np.int64)
+        self.rank[overall] = np.arange(overall.shape[0])
+        # Genres des films éligibles, lignes normalisées (affinité moyenne)
+        genres = catalog.genre_matrix[overall]
+        n_genres = np.maximum(np.diff(genres.indptr), 1).astype(np.float32)
+        self.candidate_genres = sp.diags(1.0 / n_genres) @ genres
+
+
+class PopularityBoard:
+    """Classements de popularité en mémoire, mis à jour de façon incrémentale"""
+
+    def __init__(self, min_ratings: int = 10, damping: float = 100.0):
+        self.min_ratings = min_ratings
+        self.damping = damping
+        self._counts: Optional[np.ndarray] = None
+        self._sums: Optional[np.ndarray] = None
+        self._boards: Optional[_Leaderboards] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "PopularityBoard":
+        config = config or load_config()
+        popularity_config = config["serving"].get("popularity", {})
+        return cls(
+            min_ratings=popularity_config.get("min_ratings", 10),
+            damping=popularity_config.get("damping", 100)
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self._boards is not None
+
+    def _rebuild(self, catalog: MovieCatalog):
+        counts, sums = self._counts, self._sums
+        scores = sums / (counts + self.damping)
+        eligible = np.flatnonzero(counts >= self.min_ratings)
+        # Même ordre que la requête SQL : score puis nombre de notes décroissants
+        overall = eligible[np.lexsort((-counts[eligible], -scores[eligible]))]
+        masks = catalog.genre_masks[overall]
+        by_genre = {
+            genre: overall[(masks & catalog.genre_mask([genre])) != 0]
+            for genre in catalog.genre_names
+        }
+        self._boards = _Leaderboards(catalog, scores, overall, by_genre)
+
+    def load(self, catalog: MovieCatalog, movie_ids, num_ratings, rating_sums):
+        """Remplace les compteurs (alignés sur les positions du catalogue)"""
+        positions = catalog.positions(movie_ids)
+        keep = positions >= 0
+        counts = np.zeros(len(catalog), dtype=np.int64)
+        sums = np.zeros(len(catalog), dtype=np.float64)
+        counts[positions[keep]] = np.asarray(num_ratings, dtype=np.int64)[keep]
+        sums[positions[keep]] = np.asarray(rating_sums, dtype=np.float64)[keep]
+        with self._lock:
+            self._counts, self._sums = counts, sums
+            self._rebuild(catalog)
+
+    def load_from_db(self, catalog: MovieCatalog):
+        """Charge la table movie_popularity (initialisée depuis ratings si besoin)"""
+        conn = get_db_connection()
+        try:
+            ensure_popularity_table(conn)
+            df = pd.read_sql("SELECT movie_id, num_ratings, rating_sum FROM movie_popularity", conn)
+        finally:
+            conn.close()
+        self.load(catalog, df["movie_id"].to_numpy(), df["num_ratings"].to_numpy(), df["rating_sum"].to_numpy())
+        logger.info(f"Classements de popularité chargés ({len(self._boards.overall)} films éligibles)")
+
+    def add_ratings(self, movie_ids, ratings):
+        """Prend en compte de nouvelles notes (déjà persistées dans movie_popularity)"""
+        with self._lock:
+            boards = self._boards
+            if boards is None or len(movie_ids) == 0:
+                return
+            positions = boards.catalog.positions(movie_ids)
+            keep = positions >= 0
+            # Copies : les lectures en cours gardent les classements précédents
+            counts, sums = self._counts.copy(), self._sums.copy()
+            np.add.at(counts, positions[keep], 1)
+            np.add.at(sums, positions[keep], np.asarray(ratings, dtype=np.float64)[keep])
+            self._counts, self._sums = counts, sums
+            self._rebuild(boards.catalog)
+
+    def num_ratings(self, movie_id: int) -> Optional[int]:
+        """Nombre de notes d'un film (None si les compteurs ne sont pas chargés)"""
+        boards, counts = self._boards, self._counts
+        if boards is None:
+            return None
+        position = int(boards.catalog.positions([movie_id])[0])
+        return int(counts[position]) if position >= 0 else 0
+
+    def top_for_ratings(self, movie_ids, ratings, N: int = 10,
+                        top_k_genres: int = 3) -> Optional[List[Tuple[str, float, int]]]:
+        """
+        Cold start par affinité de genres, en une passe sur les tableaux :
+        - moyenne des notes de l'utilisateur par genre (matrice films x genres)
+        - ses top_k_genres genres préférés (moyenne puis nombre de notes)
+        - score = popularité x affinité moyenne du film pour ces genres (note / 5)
+        Films déjà notés exclus. None si les classements ne sont pas chargés.
+        """
+        boards = self._boards
+        if boards is None:
+            return None
+        catalog = boards.catalog
+        positions = catalog.positions(movie_ids)
+        keep = positions >= 0
+        positions = positions[keep]
+        ratings = np.asarray(ratings, dtype=np.float32)[keep]
+
+        genres = catalog.genre_matrix
+        rated = genres[positions]
+        counts = np.asarray(rated.sum(axis=0)).ravel()
+        sums = rated.T @ ratings
+        affinity = np.zeros(genres.shape[1], dtype=np.float32)
+        rated_genres = np.flatnonzero(counts > 0)
+        if rated_genres.size:
+            averages = sums[rated_genres] / counts[rated_genres]
+            preferred = rated_genres[np.lexsort((-counts[rated_genres], -averages))][:top_k_genres]
+            affinity[preferred] = sums[preferred] / counts[preferred] / 5.0
+
+        # Affinité moyenne sur les genres de chaque film éligible
+        candidates = boards.overall
+        blended = boards.scores[candidates] * (boards.candidate_genres @ affinity)
+        seen = boards.rank[positions]
+        blended[seen[seen >= 0]] = 0.0
+        if blended.shape[0] > N:
+            # Seuil du N-ième score : seuls les films au-dessus sont triés
+            threshold = np.partition(blended, blended.shape[0] - N)[blended.shape[0] - N]
+            selected = np.flatnonzero(blended >= max(threshold, np.finfo(np.float64).tiny))
+        else:
+            selected = np.flatnonzero(blended > 0)
+        # Tri stable : à score égal, l'ordre de popularité est conservé
+        selected = selected[np.argsort(-blended[selected], kind="stable")[:N]]
+        return [
+            (catalog.titles[candidates[i]], float(blended[i]), int(catalog.movie_ids[candidates[i]]))
+            for i in selected
+        ]
+
+    def top(self, N: int = 10, genre: Optional[str] = None) -> Optional[List[Tuple[str, float, int]]]:
+        """
+        Top N [(titre, score, movie_id)] global ou d'un genre.
+        None si les classements ne sont pas encore chargés.
+        """
+        boards = self._boards
+        if boards is None:
+            return None
+        if genre is None:
+            positions = boards.overall[:N]
+        else:
+            positions = boards.by_genre.get(genre, boards.overall[:0])[:N]
+        catalog = boards.catalog
+        return [
+            (catalog.titles[pos], float(boards.scores[pos]), int(catalog.movie_ids[pos]))
+            for pos in positions
+        ]
+
+
+popularity_board = PopularityBoard.from_config()
@@ -36,6 +36,62 @@ data_drift_detected = Gauge(
     'Data drift detection status (1 = detected, 0 = not detected)'
 )
 
+# Requêtes /predict/ par méthode (collaborative_filtering, fold_in, cold_start, cold_start_fallback)
+predict_requests_by_method_total = Counter(
+    'predict_requests_by_method_total',
+    'Total number of /predict/ requests by recommendation method',
+    ['method']
+)
+
+# Micro-batching des requêtes de prédiction
+predict_batch_size = Histogram(
+    'predict_batch_size',
+    'Number of users scored together by the micro-batcher',
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128, 256]
+)
+
+predict_batch_queue_wait_seconds = Histogram(
+    'predict_batch_queue_wait_seconds',
+    'Time a prediction request waits in the micro-batcher before scoring',
+    buckets=[0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1]
+)
+
+# Cache des recommandations
+recommendation_cache_requests_total = Counter(
+    'recommendation_cache_requests_total',
+    'Recommendation cache lookups',
+    ['result']  # hit, miss
+)
+
+recommendation_cache_evictions_total = Counter(
+    'recommendation_cache_evictions_total',
+    'Recommendation cache evictions',
+    ['reason']  # lru, expired, invalidated, model_swap
+)
+
+recommendation_cache_size = Gauge(
+    'recommendation_cache_size',
+    'Number of entries in the recommendation cache'
+)
+
+# Audit asynchrone des prédictions
+audit_records_total = Counter(
+    'audit_records_total',
+    'Prediction audit records by outcome (queued, dropped, flushed)',
+    ['status']
+)
+
+audit_queue_size = Gauge(
+    'audit_queue_size',
+    'Number of prediction audit records waiting to be flushed'
+)
+
+audit_flushes_total = Counter(
+    'audit_flushes_total',
+    'Number of prediction audit segment flushes',
+    ['status']
+)
+
 def get_metrics():
     """Retourne les métriques Prometheus"""
     return Response(content=generate_latest(), media_type="text/plain")
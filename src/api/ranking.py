@@ -0,0 +1,179 @@
+"""
+Classement complet d'un utilisateur pour la pagination et le streaming
+- Scores de tous les items calculés une fois, puis classés par morceaux :
+  chaque extension est un tri partiel (seuil par argpartition), les pages
+  déjà classées sont de simples tranches
+- Ordre total : score décroissant puis indice d'item croissant, identique
+  d'une extension à l'autre (les ex aequo au seuil sont départagés par item)
+- Curseur opaque (version du modèle, rang, dernier film) : reprise par
+  position en cache, ou par recherche du dernier film (keyset) si le
+  classement a expiré
+- Cache LRU à durée de vie courte, invalidé comme le cache des réponses
+"""
+import json
+import time
+import base64
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from pipeline.config import load_config
+from pipeline.model_store import ModelArtifact
+from api.fold_in import fold_in_engine
+
+MIN_EXTENSION = 64
+
+
+class RankedList:
+    """Classement incrémental des items non vus d'un utilisateur"""
+
+    def __init__(self, scores: np.ndarray, version: str, method: str):
+        self.scores = scores
+        self.version = version
+        self.method = method
+        self.order = np.empty(0, dtype=np.int64)
+        self._rest = np.flatnonzero(np.isfinite(scores))
+        self.total = int(self._rest.shape[0])
+        # Pages concurrentes d'un même utilisateur (threads du pool)
+        self._lock = threading.Lock()
+
+    @property
+    def ranked(self) -> int:
+        return self.order.shape[0]
+
+    def ensure(self, n: int):
+        """Classe au moins les n premiers items (extension géométrique)"""
+        with self._lock:
+            if n > self.ranked and self._rest.shape[0] > 0:
+                self._extend(n)
+
+    def _extend(self, n: int):
+        take = min(max(n - self.ranked, self.ranked, MIN_EXTENSION), self._rest.shape[0])
+        rest_scores = self.scores[self._rest]
+        if take == self._rest.shape[0]:
+            selected = np.ones(take, dtype=bool)
+        else:
+            # Tous les items au-dessus du seuil, ex aequo du seuil inclus
+            kth = np.partition(rest_scores, rest_scores.shape[0] - take)[rest_scores.shape[0] - take]
+            selected = rest_scores >= kth
+        candidates = self._rest[selected]
+        candidates = candidates[np.lexsort((candidates, -self.scores[candidates]))][:take]
+        keep = np.ones(self._rest.shape[0], dtype=bool)
+        keep[np.searchsorted(self._rest, np.sort(candidates))] = False
+        self._rest = self._rest[keep]
+        self.order = np.concatenate([self.order, candidates])
+
+    def page(self, offset: int, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Items internes et scores bruts des rangs [offset, offset + size)"""
+        self.ensure(offset + size)
+        items = self.order[offset:offset + size]
+        return items, self.scores[items]
+
+    def position_after(self, score: float, item: int) -> int:
+        """Rang qui suit l'item (score, item) dans l'ordre total (reprise keyset)"""
+        scores, score = self.scores, np.float32(score)
+        before = (scores > score) | ((scores == score) & (np.arange(scores.shape[0]) <= item))
+        return int(np.count_nonzero(before & np.isfinite(scores)))
+
+
+def encode_cursor(version: str, offset: int, score: float, movie_id: int) -> str:
+    payload = json.dumps({"v": version, "o": offset, "s": score, "m": movie_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Curseur opaque → {"v", "o", "s", "m"} (ValueError si invalide)"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return {"v": str(payload["v"]), "o": int(payload["o"]), "s": float(payload["s"]), "m": int(payload["m"])}
+    except Exception as e:
+        raise ValueError(f"Curseur invalide: {e}")
+
+
+def resume_offset(ranking: RankedList, cursor: Dict[str, Any], model: ModelArtifact) -> int:
+    """Rang de reprise d'un curseur : position si elle concorde, sinon keyset (score, film)"""
+    item = int(model.to_inner_iids([cursor["m"]])[0])
+    if item < 0:
+        raise ValueError(f"Curseur invalide: film {cursor['m']} absent du modèle")
+    offset = cursor["o"]
+    if 0 < offset <= ranking.ranked and ranking.order[offset - 1] == item:
+        return offset
+    return ranking.position_after(cursor["s"], item)
+
+
+def build_ranking(model: Any, version: str, user_id: int) -> Optional[RankedList]:
+    """
+    Scores bruts de tous les items, films vus masqués : utilisateur du modèle,
+    ou vecteur fold-in. None si l'utilisateur ne peut pas être scoré.
+    """
+    if not isinstance(model, ModelArtifact):
+        return None
+    scorer = model.scorer
+    inner_uid = model.to_inner_uid(user_id)
+    if inner_uid is not None:
+        scores = scorer.score_user(inner_uid).astype(np.float32)
+        seen, method = model.seen_items(inner_uid), "collaborative_filtering"
+    else:
+        entry = fold_in_engine.user_vector(model, user_id) if fold_in_engine.enabled else None
+        if entry is None:
+            return None
+        _, pu, bu, seen = entry
+        scores, method = scorer.score_vector(pu, bu).astype(np.float32), "fold_in"
+    if seen is not None:
+        scores[seen] = -np.inf
+    return RankedList(scores, version, method)
+
+
+class RankingCache:
+    """Classements récents par utilisateur (LRU + TTL)"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, RankedList]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "RankingCache":
+        config = config or load_config()
+        pagination_config = config["serving"].get("pagination", {})
+        return cls(
+            max_entries=pagination_config.get("max_rankings", 512),
+            ttl_seconds=pagination_config.get("ttl_seconds", 300)
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int, version: str) -> Optional[RankedList]:
+        key = (user_id, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, user_id: int, ranking: RankedList):
+        key = (user_id, ranking.version)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, ranking)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_users(self, user_ids: Iterable[int]):
+        user_ids = set(user_ids)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in user_ids]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+ranking_cache = RankingCache.from_config()
@@ -0,0 +1,106 @@
+"""
+Cache des recommandations par utilisateur
+- Clé (user_id, top_n, version du modèle), durée de vie (TTL) et éviction LRU
+- Invalidé entièrement à la bascule de modèle, et par utilisateur lorsque
+  de nouvelles notes sont insérées via les endpoints de données
+- Hits, misses, évictions et taille exportés dans Prometheus
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from pipeline.config import load_config
+from api.prometheus_metrics import (
+    recommendation_cache_requests_total,
+    recommendation_cache_evictions_total,
+    recommendation_cache_size
+)
+
+CacheKey = Tuple[int, int, Optional[str]]
+
+
+class RecommendationCache:
+    """Cache LRU borné avec TTL, indexé aussi par utilisateur pour l'invalidation"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._by_user: Dict[int, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "RecommendationCache":
+        config = config or load_config()
+        cache_config = config["serving"].get("cache", {})
+        return cls(
+            max_entries=cache_config.get("max_entries", 10000),
+            ttl_seconds=cache_config.get("ttl_seconds", 300),
+            enabled=cache_config.get("enabled", False)
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: CacheKey, reason: str):
+        del self._entries[key]
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+        recommendation_cache_evictions_total.labels(reason=reason).inc()
+
+    def get(self, user_id: int, top_n: int, model_version: Optional[str]) -> Optional[Any]:
+        """Valeur en cache (None si absente ou expirée)"""
+        if not self.enabled:
+            return None
+        key = (user_id, top_n, model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key, "expired")
+                recommendation_cache_size.set(len(self._entries))
+                entry = None
+            if entry is None:
+                recommendation_cache_requests_total.labels(result="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+        recommendation_cache_requests_total.labels(result="hit").inc()
+        return entry[1]
+
+    def put(self, user_id: int, top_n: int, model_version: Optional[str], value: Any):
+        if not self.enabled:
+            return
+        key = (user_id, top_n, model_version)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)), "lru")
+            recommendation_cache_size.set(len(self._entries))
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> int:
+        """Supprime les entrées des utilisateurs ayant de nouvelles notes"""
+        removed = 0
+        with self._lock:
+            for user_id in set(user_ids):
+                for key in list(self._by_user.get(user_id, ())):
+                    self._remove(key, "invalidated")
+                    removed += 1
+            recommendation_cache_size.set(len(self._entries))
+        return removed
+
+    def clear(self, reason: str = "model_swap"):
+        """Vide le cache (bascule vers une nouvelle version du modèle)"""
+        with self._lock:
+            if self._entries:
+                recommendation_cache_evictions_total.labels(reason=reason).inc(len(self._entries))
+            self._entries.clear()
+            self._by_user.clear()
+            recommendation_cache_size.set(0)
+
+
+recommendation_cache = RecommendationCache.from_config()
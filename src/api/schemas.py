@@ -1,7 +1,7 @@
 """
 Schémas Pydantic pour les requêtes et réponses de l'API
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from pydantic import BaseModel, Field
 
 
@@ -11,6 +11,10 @@ class TrainingRequest(BaseModel):
         default=False,
         description="Forcer l'entraînement même si un modèle récent existe"
     )
+    incremental: bool = Field(
+        default=False,
+        description="Mettre à jour le modèle exporté sur les nouvelles notes (complet en repli)"
+    )
 
 
 class TrainingResponse(BaseModel):
@@ -36,6 +40,7 @@ class MovieRecommendation(BaseModel):
     """Schéma pour une recommandation de film"""
     movie: str = Field(description="Titre du film")
     score: float = Field(description="Score de prédiction")
+    movie_id: int = Field(description="ID du film")
 
 
 class PredictionResponse(BaseModel):
@@ -82,12 +87,43 @@ class BatchPredictionRequest(BaseModel):
         le=50,
         description="Nombre de recommandations par utilisateur (1-50)"
     )
+    format: Literal["ndjson", "arrow"] = Field(
+        default="ndjson",
+        description="Format du flux de réponse : NDJSON ou Arrow IPC"
+    )
 
 
-class BatchPredictionResponse(BaseModel):
-    """Schéma pour la réponse de prédiction batch"""
-    status: str = Field(description="Statut de l'exécution")
-    message: str = Field(description="Message descriptif")
-    users_processed: int = Field(description="Nombre d'utilisateurs traités")
-    predictions_dir: str = Field(description="Chemin du dossier des prédictions")
-    mlflow_run_id: Optional[str] = Field(default=None, description="ID du run MLflow")
+class PagedPredictionRequest(BaseModel):
+    """Schéma pour une page du classement complet d'un utilisateur"""
+    user_id: int = Field(description="ID de l'utilisateur")
+    page_size: int = Field(
+        default=20,
+        ge=1,
+        le=100,
+        description="Nombre de recommandations par page (1-100)"
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="Curseur opaque renvoyé par la page précédente (absent pour la première page)"
+    )
+
+
+class PagedPredictionResponse(BaseModel):
+    """Schéma pour la réponse paginée"""
+    user_id: int = Field(description="ID de l'utilisateur")
+    recommendations: List[MovieRecommendation] = Field(description="Recommandations de la page")
+    offset: int = Field(description="Rang (0-indexé) de la première recommandation de la page")
+    total: int = Field(description="Nombre de films classables pour l'utilisateur")
+    next_cursor: Optional[str] = Field(default=None, description="Curseur de la page suivante (None en fin de liste)")
+    model_version: Optional[str] = Field(default=None, description="Version du modèle ayant produit le classement")
+
+
+class StreamPredictionRequest(BaseModel):
+    """Schéma pour le classement d'un utilisateur renvoyé en streaming"""
+    user_id: int = Field(description="ID de l'utilisateur")
+    limit: int = Field(
+        default=1000,
+        ge=1,
+        le=100000,
+        description="Nombre maximal de films renvoyés"
+    )
@@ -32,6 +32,21 @@ CREATE TABLE IF NOT EXISTS ratings (
     PRIMARY KEY (user_id, movie_id)
 );
 
+-- Création de la table de synthèse 'movie_popularity'
+-- (compteurs par film, tenus à jour à l'insertion des ratings)
+CREATE TABLE IF NOT EXISTS movie_popularity (
+    movie_id INTEGER PRIMARY KEY REFERENCES movies(movie_id) ON DELETE CASCADE,
+    num_ratings BIGINT NOT NULL DEFAULT 0,
+    rating_sum DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+-- Marqueur d'agrégation initiale de 'movie_popularity' depuis 'ratings'
+-- (posé par l'import ou au premier démarrage de l'API)
+CREATE TABLE IF NOT EXISTS movie_popularity_seed (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    seeded_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
 -- Création de la table 'tags'
 CREATE TABLE IF NOT EXISTS tags (
     tag_id SERIAL PRIMARY KEY,
@@ -1,6 +1,6 @@
 import psycopg2
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from tqdm import tqdm
 import re
 import sys
@@ -65,6 +65,19 @@ def import_data():
         chunk = chunk.rename(columns={"userId": "user_id", "movieId": "movie_id"})
         chunk.to_sql("ratings", engine, if_exists="append", index=False)
 
+    # Compteurs de popularité par film (classements cold start de l'API)
+    print("Calcul de movie_popularity...")
+    with engine.begin() as connection:
+        connection.execute(text("""
+            INSERT INTO movie_popularity (movie_id, num_ratings, rating_sum)
+            SELECT movie_id, COUNT(*), SUM(rating)
+            FROM ratings
+            GROUP BY movie_id
+            ON CONFLICT (movie_id) DO UPDATE
+            SET num_ratings = EXCLUDED.num_ratings, rating_sum = EXCLUDED.rating_sum
+        """))
+        connection.execute(text("INSERT INTO movie_popularity_seed DEFAULT VALUES ON CONFLICT DO NOTHING"))
+
     # Import des tags (en chunks)
     print("Import des tags...")
     unique_tags = set()
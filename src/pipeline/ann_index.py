@@ -0,0 +1,122 @@
+"""
+Index approximatif de produit scalaire maximal (MIPS) sur les facteurs items
+- Réduction MIPS → plus proche voisin L2 (augmentation des vecteurs)
+- Index IVF : k-means en NumPy, listes inversées par cluster
+- Recherche : sondage des nprobe clusters les plus proches, puis
+  re-scoring exact des candidats par le modèle
+"""
+import numpy as np
+from typing import Dict, Tuple
+
+
+def augment_items(qi: np.ndarray, bi: np.ndarray) -> np.ndarray:
+    """
+    Vecteurs items augmentés x_i = [qi, bi, sqrt(M² - ||(qi, bi)||²)].
+    Avec la requête y = [pu, 1, 0], ||x_i - y||² = cste - 2 (qi.pu + bi) :
+    le plus proche voisin L2 est l'item de score maximal.
+    """
+    base = np.hstack([qi, bi[:, None]]).astype(np.float32)
+    norms_sq = np.einsum("ij,ij->i", base, base)
+    extra = np.sqrt(np.maximum(norms_sq.max() - norms_sq, 0.0))
+    return np.hstack([base, extra[:, None]]).astype(np.float32)
+
+
+def augment_query(pu: np.ndarray) -> np.ndarray:
+    """Vecteur requête augmenté y = [pu, 1, 0]"""
+    return np.concatenate([pu, [1.0, 0.0]]).astype(np.float32)
+
+
+def _squared_distances(X: np.ndarray, C: np.ndarray) -> np.ndarray:
+    return (
+        np.einsum("ij,ij->i", X, X)[:, None]
+        - 2.0 * (X @ C.T)
+        + np.einsum("ij,ij->i", C, C)[None, :]
+    )
+
+
+def kmeans(X: np.ndarray, k: int, n_iter: int = 20, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """K-means de Lloyd. Retourne (centroïdes, affectations)"""
+    rng = np.random.default_rng(seed)
+    k = min(k, X.shape[0])
+    centroids = X[rng.choice(X.shape[0], size=k, replace=False)].copy()
+    labels = np.zeros(X.shape[0], dtype=np.int64)
+    for _ in range(n_iter):
+        labels = np.argmin(_squared_distances(X, centroids), axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+        # Cluster vide : réinitialisé sur un point aléatoire
+        n_empty = int((~non_empty).sum())
+        if n_empty:
+            centroids[~non_empty] = X[rng.choice(X.shape[0], size=n_empty, replace=False)]
+    return centroids, labels
+
+
+def build_ivf_index(qi: np.ndarray, bi: np.ndarray, nlist: int = 64, n_iter: int = 20,
+                    seed: int = 42) -> Dict[str, np.ndarray]:
+    """
+    Construit l'index IVF sous forme de tableaux exportables :
+    ivf_centroids (nlist × d+2), ivf_offsets (nlist+1), ivf_items (items groupés
+    par cluster) et ivf_vectors ([qi, bi] dans le même ordre, pour que chaque
+    cluster sondé soit une tranche contiguë, sans indexation aléatoire)
+    """
+    qi = np.asarray(qi)
+    bi = np.asarray(bi)
+    X = augment_items(qi, bi)
+    centroids, labels = kmeans(X, nlist, n_iter=n_iter, seed=seed)
+    order = np.argsort(labels, kind="stable")
+    offsets = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=centroids.shape[0]), out=offsets[1:])
+    return {
+        "ivf_centroids": centroids.astype(np.float32),
+        "ivf_offsets": offsets,
+        "ivf_items": order.astype(np.int32),
+        "ivf_vectors": np.ascontiguousarray(X[order, :-1]),
+    }
+
+
+class IVFIndex:
+    """Recherche de candidats dans l'index IVF"""
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, items: np.ndarray,
+                 vectors: np.ndarray, nprobe: int = 8):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.items = items
+        self.vectors = vectors
+        self.nprobe = nprobe
+        self._centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], nprobe: int = 8):
+        return cls(
+            arrays["ivf_centroids"], arrays["ivf_offsets"], arrays["ivf_items"],
+            arrays["ivf_vectors"], nprobe=nprobe
+        )
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    def probe(self, pu: np.ndarray, nprobe: int = None) -> np.ndarray:
+        """Clusters les plus proches de la requête augmentée"""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        query = augment_query(pu)
+        # ||c - y||² à une constante près (||y||² identique pour tous les clusters)
+        distances = self._centroid_norms - 2.0 * (self.centroids @ query)
+        return np.argpartition(distances, nprobe - 1)[:nprobe]
+
+    def search(self, pu: np.ndarray, nprobe: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Candidats des clusters sondés et leur score exact qi.pu + bi
+        (sans la moyenne globale ni le biais utilisateur, communs à tous les items)
+        """
+        query = np.append(pu, 1.0).astype(self.vectors.dtype)
+        items, scores = [], []
+        for c in self.probe(pu, nprobe):
+            start, end = self.offsets[c], self.offsets[c + 1]
+            items.append(self.items[start:end])
+            scores.append(self.vectors[start:end] @ query)
+        return np.concatenate(items), np.concatenate(scores)
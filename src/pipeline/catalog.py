@@ -0,0 +1,133 @@
+"""
+Catalogue des films en mémoire
+- Construit une fois par version de modèle, puis immuable
+- Tableaux denses alignés par position (movie_id trié, titre, année,
+  masque de bits des genres) : recherche movie_id → position par
+  dichotomie, sans index pandas
+- Partagé par le scoring, le cold start et le monitoring
+"""
+import numpy as np
+import pandas as pd
+import psycopg2
+import scipy.sparse as sp
+from functools import cached_property
+from typing import Iterable, List, Optional, Sequence, Tuple
+from pipeline.config import load_config
+from pipeline.model_store import lookup_sorted
+
+
+class MovieCatalog:
+    """Catalogue immuable des films (tableaux indexés par position)"""
+
+    def __init__(self, movie_ids: np.ndarray, titles: np.ndarray, years: np.ndarray,
+                 genre_masks: np.ndarray, genre_names: Sequence[str]):
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.years = years
+        self.genre_masks = genre_masks
+        self.genre_names = list(genre_names)
+        self._genre_bits = {name: np.uint64(1) << np.uint64(bit) for bit, name in enumerate(self.genre_names)}
+        for array in (self.movie_ids, self.titles, self.years, self.genre_masks):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_frames(cls, movies_df: pd.DataFrame, genres_df: Optional[pd.DataFrame] = None) -> "MovieCatalog":
+        """
+        movies_df : colonnes movie_id, title (release_year optionnelle)
+        genres_df : couples (movie_id, name) des genres de chaque film
+        """
+        movies_df = movies_df.drop_duplicates("movie_id").sort_values("movie_id")
+        movie_ids = movies_df["movie_id"].to_numpy(dtype=np.int32)
+        titles = movies_df["title"].to_numpy(dtype=object)
+        if "release_year" in movies_df:
+            years = movies_df["release_year"].fillna(0).to_numpy(dtype=np.int16)
+        else:
+            years = np.zeros(movie_ids.shape[0], dtype=np.int16)
+
+        genre_masks = np.zeros(movie_ids.shape[0], dtype=np.uint64)
+        genre_names: List[str] = []
+        if genres_df is not None and not genres_df.empty:
+            genre_names = sorted(genres_df["name"].unique())
+            if len(genre_names) > 64:
+                raise ValueError("Le masque de genres est limité à 64 genres")
+            bits = pd.Categorical(genres_df["name"], categories=genre_names).codes.astype(np.uint64)
+            positions = lookup_sorted(movie_ids, genres_df["movie_id"].to_numpy())
+            keep = positions >= 0
+            np.bitwise_or.at(genre_masks, positions[keep], np.uint64(1) << bits[keep])
+        return cls(movie_ids, titles, years, genre_masks, genre_names)
+
+    def __len__(self) -> int:
+        return self.movie_ids.shape[0]
+
+    def positions(self, movie_ids) -> np.ndarray:
+        """Positions des films dans le catalogue (-1 pour les films inconnus)"""
+        return lookup_sorted(self.movie_ids, movie_ids)
+
+    def title(self, movie_id: int) -> Optional[str]:
+        pos = self.positions([movie_id])[0]
+        return self.titles[pos] if pos >= 0 else None
+
+    def genre_mask(self, genres: Iterable[str]) -> np.uint64:
+        """Masque de bits d'une liste de genres (genres inconnus ignorés)"""
+        mask = np.uint64(0)
+        for genre in genres:
+            mask |= self._genre_bits.get(genre, np.uint64(0))
+        return mask
+
+    def genres_of(self, movie_id: int) -> List[str]:
+        pos = self.positions([movie_id])[0]
+        if pos < 0:
+            return []
+        mask = self.genre_masks[pos]
+        return [name for name, bit in self._genre_bits.items() if mask & bit]
+
+    def has_any_genre(self, genres: Iterable[str]) -> np.ndarray:
+        """Masque booléen (par position) des films ayant au moins un des genres"""
+        return (self.genre_masks & self.genre_mask(genres)) != 0
+
+    @cached_property
+    def genre_matrix(self) -> sp.csr_matrix:
+        """Matrice creuse films x genres (1 si le film a le genre), construite une fois"""
+        bits = np.arange(len(self.genre_names), dtype=np.uint64)
+        rows, cols = np.nonzero((self.genre_masks[:, None] >> bits) & np.uint64(1))
+        return sp.csr_matrix(
+            (np.ones(rows.shape[0], dtype=np.float32), (rows, cols)),
+            shape=(len(self), len(self.genre_names))
+        )
+
+    def attach(self, scored: Iterable[Tuple[int, float]]) -> List[Tuple[str, float, int]]:
+        """[(movie_id, score)] → [(titre, score, movie_id)], films inconnus ignorés"""
+        scored = list(scored)
+        if not scored:
+            return []
+        positions = self.positions([movie_id for movie_id, _ in scored])
+        return [
+            (self.titles[pos], score, int(movie_id))
+            for pos, (movie_id, score) in zip(positions, scored)
+            if pos >= 0
+        ]
+
+
+def load_catalog() -> MovieCatalog:
+    """Charge le catalogue (films, années, genres) depuis PostgreSQL"""
+    config = load_config()
+    conn = psycopg2.connect(
+        dbname=config["db"]["dbname"],
+        user=config["db"]["user"],
+        password=config["db"]["password"],
+        host=config["db"]["host"],
+        port=config["db"]["port"]
+    )
+    try:
+        movies_df = pd.read_sql("SELECT movie_id, title, release_year FROM movies", conn)
+        genres_df = pd.read_sql(
+            """
+            SELECT mg.movie_id, g.name
+            FROM movie_genres mg
+            JOIN genres g ON mg.genre_id = g.genre_id
+            """,
+            conn
+        )
+    finally:
+        conn.close()
+    return MovieCatalog.from_frames(movies_df, genres_df)
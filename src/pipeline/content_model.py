@@ -0,0 +1,278 @@
+"""
+Moteur de recommandation par contenu (genome MovieLens)
+- Matrice dense films x tags de pertinence (genome_scores), lignes normalisées
+  L2 et stockées en float16 (moitié de la mémoire du float32)
+- Export versionné .npy + manifest, chargé en mmap (démarrage instantané)
+- Produits matriciels par blocs de films convertis en float32 à la volée :
+  films similaires à X, utilisateurs susceptibles d'aimer un nouveau film X
+- Les K plus proches voisins de chaque film sont précalculés à l'export
+  (la conversion float16 → float32 de toute la matrice domine une requête isolée)
+"""
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+import psycopg2
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from pipeline.config import load_config
+from pipeline.model_store import (
+    MANIFEST_FILENAME,
+    lookup_sorted,
+    new_version_name,
+    read_current,
+    write_version
+)
+from pipeline.scoring import top_n_from_score_matrix
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+def build_genome_vectors(movie_ids, tag_ids, relevance) -> Dict[str, np.ndarray]:
+    """
+    Triplets (movie_id, tag_id, pertinence) → matrice dense films x tags.
+    Lignes triées par movie_id, normalisées L2 puis converties en float16.
+    """
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    tag_ids = np.asarray(tag_ids, dtype=np.int64)
+    unique_movies = np.unique(movie_ids)
+    unique_tags = np.unique(tag_ids)
+    vectors = np.zeros((unique_movies.shape[0], unique_tags.shape[0]), dtype=np.float32)
+    vectors[np.searchsorted(unique_movies, movie_ids), np.searchsorted(unique_tags, tag_ids)] = relevance
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.maximum(norms, 1e-12)
+    return {
+        "movie_ids": unique_movies.astype(np.int32),
+        "tag_ids": unique_tags.astype(np.int32),
+        "vectors": vectors.astype(np.float16),
+    }
+
+
+def load_genome_from_db(chunksize: int = 1_000_000) -> Dict[str, np.ndarray]:
+    """Lit genome_scores par blocs (~11M lignes) et construit la matrice"""
+    config = load_config()
+    conn = psycopg2.connect(
+        dbname=config["db"]["dbname"],
+        user=config["db"]["user"],
+        password=config["db"]["password"],
+        host=config["db"]["host"],
+        port=config["db"]["port"]
+    )
+    try:
+        chunks = [
+            (
+                chunk["movie_id"].to_numpy(dtype=np.int32),
+                chunk["tag_id"].to_numpy(dtype=np.int16),
+                chunk["relevance"].to_numpy(dtype=np.float32),
+            )
+            for chunk in pd.read_sql(
+                "SELECT movie_id, tag_id, relevance FROM genome_scores",
+                conn,
+                chunksize=chunksize
+            )
+        ]
+    finally:
+        conn.close()
+    if not chunks:
+        raise ValueError("Table genome_scores vide")
+    movie_ids, tag_ids, relevance = (np.concatenate(parts) for parts in zip(*chunks))
+    return build_genome_vectors(movie_ids, tag_ids, relevance)
+
+
+def blocked_similarities(vectors: np.ndarray, queries: np.ndarray, block_size: int = 4096) -> np.ndarray:
+    """
+    Cosinus (n_requêtes x n_films) entre des vecteurs requêtes normalisés et
+    tous les films, par blocs de films convertis en float32 (BLAS)
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    n_movies = vectors.shape[0]
+    out = np.empty((queries.shape[0], n_movies), dtype=np.float32)
+    for start in range(0, n_movies, block_size):
+        end = min(start + block_size, n_movies)
+        block = vectors[start:end].astype(np.float32)
+        np.matmul(queries, block.T, out=out[:, start:end])
+    return out
+
+
+def materialize_neighbors(vectors: np.ndarray, K: int, chunk_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K plus proches voisins (cosinus) de chaque film, lui-même exclu.
+    Retourne (lignes int32, scores float32) de forme (n_films, K).
+    """
+    n_movies = vectors.shape[0]
+    K = min(K, n_movies - 1)
+    neighbors = np.full((n_movies, K), -1, dtype=np.int32)
+    scores = np.full((n_movies, K), np.nan, dtype=np.float32)
+    for start in range(0, n_movies, chunk_size):
+        end = min(start + chunk_size, n_movies)
+        sims = blocked_similarities(vectors, vectors[start:end])
+        sims[np.arange(end - start), np.arange(start, end)] = -np.inf
+        items, top_scores = top_n_from_score_matrix(sims, K)
+        neighbors[start:end] = items
+        scores[start:end] = np.where(items >= 0, top_scores, np.nan)
+    return neighbors, scores
+
+
+def export_genome(
+    export_dir: str,
+    arrays: Dict[str, np.ndarray],
+    neighbors: int = 50,
+    version: Optional[str] = None,
+    set_current: bool = True
+) -> str:
+    """
+    Exporte la matrice genome dans export_dir/<version>/ (renommage atomique).
+    neighbors : nombre de voisins précalculés par film (0 pour désactiver).
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    version = version or new_version_name(export_dir)
+    arrays = dict(arrays)
+    if neighbors:
+        arrays["neighbor_rows"], arrays["neighbor_scores"] = materialize_neighbors(arrays["vectors"], neighbors)
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.now().isoformat(),
+        "n_movies": int(arrays["vectors"].shape[0]),
+        "n_tags": int(arrays["vectors"].shape[1]),
+        "dtype": str(arrays["vectors"].dtype),
+        "neighbors": int(arrays["neighbor_rows"].shape[1]) if "neighbor_rows" in arrays else 0,
+        "arrays": sorted(arrays),
+    }
+
+    version_dir = write_version(export_dir, version, arrays, manifest, set_current)
+    logger.info(f"Genome exporté : {version_dir}")
+    return version_dir
+
+
+class GenomeIndex:
+    """Vecteurs genome normalisés (float16, mmap) et requêtes de similarité"""
+
+    def __init__(self, version_dir: str, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray],
+                 block_size: int = 4096):
+        self.version_dir = version_dir
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.movie_ids = arrays["movie_ids"]
+        self.tag_ids = arrays["tag_ids"]
+        self.vectors = arrays["vectors"]
+        self.neighbor_rows = arrays.get("neighbor_rows")
+        self.neighbor_scores = arrays.get("neighbor_scores")
+        self.block_size = block_size
+
+    def __len__(self) -> int:
+        return self.movie_ids.shape[0]
+
+    def positions(self, movie_ids) -> np.ndarray:
+        """Lignes des films dans la matrice (-1 pour les films sans genome)"""
+        return lookup_sorted(self.movie_ids, movie_ids)
+
+    def similarities(self, queries: np.ndarray) -> np.ndarray:
+        """Cosinus entre des vecteurs requêtes et tous les films"""
+        return blocked_similarities(self.vectors, queries, self.block_size)
+
+    def similar_movies_batch(self, movie_ids: Sequence[int], N: int = 10) -> List[List[Tuple[int, float]]]:
+        """
+        Top N [(movie_id, cosinus)] de chaque film (lui-même exclu, [] sans genome).
+        Lecture des voisins précalculés si N <= K, produit par blocs sinon.
+        """
+        positions = self.positions(movie_ids)
+        results: List[List[Tuple[int, float]]] = [[] for _ in positions]
+        known = np.flatnonzero(positions >= 0)
+        if known.size == 0:
+            return results
+        if self.neighbor_rows is not None and N <= self.neighbor_rows.shape[1]:
+            for pos in known:
+                rows = self.neighbor_rows[positions[pos], :N]
+                valid = rows >= 0
+                results[pos] = [
+                    (int(self.movie_ids[i]), float(s))
+                    for i, s in zip(rows[valid], self.neighbor_scores[positions[pos], :N][valid])
+                ]
+            return results
+        rows = positions[known]
+        scores = self.similarities(self.vectors[rows])
+        scores[np.arange(rows.shape[0]), rows] = -np.inf
+        items, top_scores = top_n_from_score_matrix(scores, N)
+        for row, pos in enumerate(known):
+            valid = items[row] >= 0
+            results[pos] = [
+                (int(self.movie_ids[i]), float(s))
+                for i, s in zip(items[row][valid], top_scores[row][valid])
+            ]
+        return results
+
+    def similar_movies(self, movie_id: int, N: int = 10) -> List[Tuple[int, float]]:
+        return self.similar_movies_batch([movie_id], N=N)[0]
+
+    def users_for_movie(
+        self,
+        movie_id: int,
+        user_ids: np.ndarray,
+        item_ids: np.ndarray,
+        seen_indptr: np.ndarray,
+        seen_indices: np.ndarray,
+        N: int = 100
+    ) -> List[Tuple[int, float]]:
+        """
+        Utilisateurs les plus susceptibles d'aimer un film (nouveau ou non) :
+        similarité moyenne entre ce film et les films de leur historique.
+        user_ids / item_ids / seen_* : index CSR utilisateur → films vus du
+        modèle de serving (indices internes des items).
+        """
+        position = int(self.positions([movie_id])[0])
+        if position < 0:
+            return []
+        movie_scores = self.similarities(self.vectors[position])[0]
+        movie_scores[position] = 0.0
+        # Similarité par item du modèle (0 pour les films sans genome)
+        rows = self.positions(item_ids)
+        item_scores = np.where(rows >= 0, movie_scores[np.maximum(rows, 0)], 0.0).astype(np.float32)
+
+        counts = np.diff(seen_indptr)
+        sums = np.add.reduceat(
+            np.append(item_scores[seen_indices], np.float32(0)),
+            np.minimum(seen_indptr[:-1], seen_indices.shape[0])
+        )
+        user_scores = np.where(counts > 0, sums / np.maximum(counts, 1), -np.inf)
+        if user_scores.shape[0] == 0:
+            return []
+        users, scores = top_n_from_score_matrix(user_scores[None, :], N)
+        valid = users[0] >= 0
+        return [(int(user_ids[u]), float(s)) for u, s in zip(users[0][valid], scores[0][valid])]
+
+
+def load_genome_index(version_dir: str, mmap: bool = True) -> GenomeIndex:
+    """Charge une version exportée ; mmap=True mappe les tableaux en lecture seule"""
+    with open(os.path.join(version_dir, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Format genome non supporté : {manifest.get('format_version')}")
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in manifest["arrays"]
+    }
+    return GenomeIndex(version_dir, manifest, arrays)
+
+
+def load_current_genome(export_dir: str, mmap: bool = True) -> Optional[GenomeIndex]:
+    """Charge la version active du dossier genome (None si aucune)"""
+    version = read_current(export_dir)
+    if version is None:
+        return None
+    return load_genome_index(os.path.join(export_dir, version), mmap=mmap)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serving_config = load_config()["serving"]
+    export_genome(
+        serving_config["genome_dir"],
+        load_genome_from_db(),
+        neighbors=serving_config.get("genome_neighbors", 50)
+    )
@@ -0,0 +1,209 @@
+"""
+Validation croisée parallèle des modèles candidats
+- Chaque couple (algorithme, fold) est une tâche indépendante, exécutée
+  dans un pool de processus dimensionné sur la machine
+- Les échantillons de ratings sont écrits une fois en .npy (tmpfs si
+  disponible) et mappés en lecture seule par les workers : seule la
+  description de la tâche est sérialisée
+- Folds tirés une fois par échantillon : tous les algorithmes sont évalués
+  sur les mêmes découpages
+- Moteurs NumPy (NATIVE_ALGORITHMS) entraînés et évalués directement sur
+  les tableaux, sans trainset Surprise
+"""
+import os
+import time
+import shutil
+import logging
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from surprise import Dataset, Reader, SVD, KNNBasic, NormalPredictor, accuracy
+from pipeline.mf_engine import BiasedALS
+from pipeline.knn_engine import ItemKNN
+
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = {
+    "SVD": SVD,
+    "KNNBasic": KNNBasic,
+    "NormalPredictor": NormalPredictor,
+}
+
+# Même interface fit(user_ids, movie_ids, ratings) / predict_arrays(user_ids, movie_ids)
+NATIVE_ALGORITHMS = {
+    "ALS": BiasedALS,
+    "ItemKNN": ItemKNN,
+}
+
+RATING_COLUMNS = ("user_id", "movie_id", "rating")
+
+# (nom de l'algorithme, échantillon, paramètres du constructeur)
+Candidate = Tuple[str, str, Dict[str, Any]]
+
+
+def share_ratings(df: pd.DataFrame, work_dir: str, name: str) -> str:
+    """Écrit les colonnes d'un échantillon en .npy (une fois pour tous les workers)"""
+    dataset_dir = os.path.join(work_dir, name)
+    os.makedirs(dataset_dir, exist_ok=True)
+    np.save(os.path.join(dataset_dir, "user_id.npy"), df["user_id"].to_numpy(dtype=np.int64))
+    np.save(os.path.join(dataset_dir, "movie_id.npy"), df["movie_id"].to_numpy(dtype=np.int64))
+    np.save(os.path.join(dataset_dir, "rating.npy"), df["rating"].to_numpy(dtype=np.float32))
+    return dataset_dir
+
+
+def load_shared_ratings(dataset_dir: str) -> Dict[str, np.ndarray]:
+    """Colonnes d'un échantillon partagé, mappées en lecture seule"""
+    return {
+        column: np.load(os.path.join(dataset_dir, f"{column}.npy"), mmap_mode="r")
+        for column in RATING_COLUMNS
+    }
+
+
+def fold_indices(n_rows: int, n_folds: int, seed: int) -> List[np.ndarray]:
+    """Lignes de test de chaque fold (permutation aléatoire découpée en n_folds)"""
+    permutation = np.random.default_rng(seed).permutation(n_rows)
+    return np.array_split(permutation, n_folds)
+
+
+def _evaluate_surprise(task, arrays, train_mask, test_rows) -> Tuple[float, float, float, float]:
+    """(rmse, mae, fit_time, test_time) d'un algorithme Surprise sur un fold"""
+    reader = Reader(rating_scale=tuple(task["rating_scale"]))
+    train_df = pd.DataFrame({column: arrays[column][train_mask] for column in RATING_COLUMNS})
+    trainset = Dataset.load_from_df(train_df[list(RATING_COLUMNS)], reader).build_full_trainset()
+    testset = list(zip(
+        arrays["user_id"][test_rows].tolist(),
+        arrays["movie_id"][test_rows].tolist(),
+        arrays["rating"][test_rows].tolist()
+    ))
+
+    algo = ALGORITHMS[task["algorithm"]](**task["params"])
+    fit_start = time.perf_counter()
+    algo.fit(trainset)
+    fit_time = time.perf_counter() - fit_start
+    test_start = time.perf_counter()
+    predictions = algo.test(testset)
+    test_time = time.perf_counter() - test_start
+    return (accuracy.rmse(predictions, verbose=False), accuracy.mae(predictions, verbose=False),
+            fit_time, test_time)
+
+
+def _evaluate_native(task, arrays, train_mask, test_rows) -> Tuple[float, float, float, float]:
+    """(rmse, mae, fit_time, test_time) d'un moteur NumPy, prédictions vectorisées"""
+    algo = NATIVE_ALGORITHMS[task["algorithm"]](rating_scale=tuple(task["rating_scale"]), **task["params"])
+    fit_start = time.perf_counter()
+    algo.fit(arrays["user_id"][train_mask], arrays["movie_id"][train_mask], arrays["rating"][train_mask])
+    fit_time = time.perf_counter() - fit_start
+    test_start = time.perf_counter()
+    errors = algo.predict_arrays(arrays["user_id"][test_rows], arrays["movie_id"][test_rows]) \
+        - arrays["rating"][test_rows]
+    test_time = time.perf_counter() - test_start
+    return float(np.sqrt(np.mean(np.square(errors)))), float(np.mean(np.abs(errors))), fit_time, test_time
+
+
+def run_fold_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Entraîne et évalue un algorithme sur un fold (exécuté dans un worker)"""
+    started = time.perf_counter()
+    arrays = load_shared_ratings(task["dataset_dir"])
+    n_rows = arrays["rating"].shape[0]
+    test_rows = fold_indices(n_rows, task["n_folds"], task["seed"])[task["fold"]]
+    train_mask = np.ones(n_rows, dtype=bool)
+    train_mask[test_rows] = False
+
+    if task["algorithm"] in NATIVE_ALGORITHMS:
+        rmse, mae, fit_time, test_time = _evaluate_native(task, arrays, train_mask, test_rows)
+    else:
+        rmse, mae, fit_time, test_time = _evaluate_surprise(task, arrays, train_mask, test_rows)
+
+    return {
+        "algorithm": task["algorithm"],
+        "dataset": task["dataset"],
+        "fold": task["fold"],
+        "rmse": rmse,
+        "mae": mae,
+        "fit_time": fit_time,
+        "test_time": test_time,
+        "task_time": time.perf_counter() - started,
+        "n_train": int(train_mask.sum()),
+        "n_test": int(test_rows.shape[0]),
+        "pid": os.getpid(),
+    }
+
+
+def summarize(results: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Résultats des tâches → format de surprise.cross_validate par algorithme"""
+    summary: Dict[str, Dict[str, np.ndarray]] = {}
+    for algorithm in dict.fromkeys(result["algorithm"] for result in results):
+        folds = sorted((r for r in results if r["algorithm"] == algorithm), key=lambda r: r["fold"])
+        summary[algorithm] = {
+            "test_rmse": np.array([r["rmse"] for r in folds]),
+            "test_mae": np.array([r["mae"] for r in folds]),
+            "fit_time": np.array([r["fit_time"] for r in folds]),
+            "test_time": np.array([r["test_time"] for r in folds]),
+        }
+    return summary
+
+
+def run_cross_validation(
+    datasets: Dict[str, pd.DataFrame],
+    candidates: Sequence[Candidate],
+    n_folds: int = 3,
+    n_workers: Optional[int] = None,
+    start_method: str = "spawn",
+    seed: int = 0,
+    rating_scale: Tuple[float, float] = (0.5, 5.0),
+    shared_dir: Optional[str] = None,
+    on_task_done: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Tuple[Dict[str, Dict[str, np.ndarray]], List[Dict[str, Any]]]:
+    """
+    Validation croisée de tous les couples (candidat, fold) en parallèle.
+    datasets : échantillons de ratings nommés (user_id, movie_id, rating)
+    candidates : [(algorithme, échantillon, paramètres)], les plus coûteux en tête
+    n_workers : taille du pool (None ou 0 : un processus par cœur, 1 : séquentiel)
+    shared_dir : dossier des tableaux partagés (ex. /dev/shm), temporaire système sinon
+    on_task_done : appelé dans le processus parent à la fin de chaque tâche
+    Retourne (résumé par algorithme, résultats bruts des tâches).
+    """
+    work_dir = tempfile.mkdtemp(
+        prefix="cv_",
+        dir=shared_dir if shared_dir and os.path.isdir(shared_dir) else None
+    )
+    try:
+        dataset_dirs = {name: share_ratings(df, work_dir, name) for name, df in datasets.items()}
+        tasks = [
+            {
+                "algorithm": algorithm,
+                "dataset": dataset,
+                "dataset_dir": dataset_dirs[dataset],
+                "params": dict(params),
+                "fold": fold,
+                "n_folds": n_folds,
+                "seed": seed,
+                "rating_scale": list(rating_scale),
+            }
+            for algorithm, dataset, params in candidates
+            for fold in range(n_folds)
+        ]
+        n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+        logger.info(f"Validation croisée : {len(tasks)} tâches sur {n_workers} processus")
+
+        results = []
+        if n_workers <= 1:
+            for task in tasks:
+                results.append(run_fold_task(task))
+                if on_task_done is not None:
+                    on_task_done(results[-1])
+        else:
+            # spawn : pas de fork d'un processus multi-thread (API, client MLflow)
+            context = multiprocessing.get_context(start_method)
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as pool:
+                futures = [pool.submit(run_fold_task, task) for task in tasks]
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    if on_task_done is not None:
+                        on_task_done(results[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return summarize(results), results
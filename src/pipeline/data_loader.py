@@ -1,8 +1,33 @@
 import pandas as pd
+import numpy as np
 import psycopg2
 import os
+from typing import Dict, Optional
 from sqlalchemy import create_engine
 
+# En-tête du format binaire de COPY : signature, flags, longueur d'extension
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+COPY_HEADER_SIZE = len(COPY_SIGNATURE) + 8
+COPY_TRAILER = b"\xff\xff"
+
+
+def copy_row_dtype(fields) -> np.dtype:
+    """
+    Dtype structuré big-endian d'un tuple COPY binaire à colonnes de taille
+    fixe : nombre de champs puis (longueur, valeur) par champ
+    """
+    layout = [("n_fields", ">i2")]
+    for name, field_type in fields:
+        layout += [(f"{name}_len", ">i4"), (name, field_type)]
+    return np.dtype(layout)
+
+
+# Tuple (user_id int4, movie_id int4, rating float4) : 26 octets par ligne
+RATINGS_COPY_DTYPE = copy_row_dtype([("user_id", ">i4"), ("movie_id", ">i4"), ("rating", ">f4")])
+
+# Colonnes castées côté serveur en types de taille fixe (DECIMAL → float4)
+RATINGS_SELECT = "SELECT r.user_id::int4, r.movie_id::int4, r.rating::float4 FROM ratings r"
+
 def get_db_engine():
     """Établit une connexion à la base de données PostgreSQL via SQLAlchemy."""
     db_user = os.getenv("DB_USER", "reco_films")
@@ -12,13 +37,108 @@ def get_db_engine():
     
     return create_engine(f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}/{db_name}")
 
+class RatingsCopyParser:
+    """
+    Flux binaire de COPY ... TO STDOUT → tableaux typés (int32, int32, float32
+    par défaut, colonnes de dtype sinon).
+    Reçoit les messages de psycopg2 via write(), décode par blocs de
+    chunk_bytes : seul le bloc en cours est gardé sous forme brute.
+    """
+
+    def __init__(self, chunk_bytes: int = 1 << 22, dtype: np.dtype = RATINGS_COPY_DTYPE):
+        self.chunk_bytes = chunk_bytes
+        self.dtype = dtype
+        self.columns = [name for name in dtype.names if name != "n_fields" and not name.endswith("_len")]
+        self._buffer = bytearray()
+        self._header_read = False
+        self._chunks = []
+        self.n_rows = 0
+
+    def write(self, data) -> int:
+        self._buffer += data
+        if len(self._buffer) >= self.chunk_bytes:
+            self._parse()
+        return len(data)
+
+    def _parse(self):
+        buffer = self._buffer
+        start = 0
+        if not self._header_read:
+            if len(buffer) < COPY_HEADER_SIZE:
+                return
+            if bytes(buffer[:len(COPY_SIGNATURE)]) != COPY_SIGNATURE:
+                raise ValueError("Flux COPY binaire invalide (signature)")
+            extension = int.from_bytes(buffer[COPY_HEADER_SIZE - 4:COPY_HEADER_SIZE], "big")
+            start = COPY_HEADER_SIZE + extension
+            self._header_read = True
+        n_rows = (len(buffer) - start) // self.dtype.itemsize
+        if n_rows:
+            rows = np.frombuffer(buffer, dtype=self.dtype, count=n_rows, offset=start)
+            invalid = rows["n_fields"] != len(self.columns)
+            for name in self.columns:
+                invalid |= rows[f"{name}_len"] != self.dtype[name].itemsize
+            if invalid.any():
+                raise ValueError("Tuple COPY inattendu (colonne NULL ou type de taille différente)")
+            self._chunks.append([rows[name].astype(self.dtype[name].newbyteorder("=")) for name in self.columns])
+            self.n_rows += rows.shape[0]
+            start += n_rows * self.dtype.itemsize
+        self._buffer = buffer[start:]
+
+    def finish(self) -> Dict[str, np.ndarray]:
+        """Décode le reste du flux et assemble les colonnes"""
+        self._parse()
+        if bytes(self._buffer) not in (b"", COPY_TRAILER):
+            raise ValueError(f"Flux COPY binaire tronqué ({len(self._buffer)} octets restants)")
+        chunks = self._chunks or [[np.empty(0, self.dtype[name].newbyteorder("=")) for name in self.columns]]
+        columns = {name: np.concatenate(parts) for name, parts in zip(self.columns, zip(*chunks))}
+        self._chunks = []
+        return columns
+
+
+def copy_columns(cursor, query: str, params: Optional[dict] = None,
+                 dtype: np.dtype = RATINGS_COPY_DTYPE, chunk_bytes: int = 1 << 22) -> Dict[str, np.ndarray]:
+    """COPY (query) TO STDOUT en binaire sur un curseur psycopg2 → colonnes typées"""
+    parser = RatingsCopyParser(chunk_bytes=chunk_bytes, dtype=dtype)
+    # COPY n'accepte pas de paramètres liés : valeurs échappées par mogrify
+    sql = cursor.mogrify(query, params).decode("utf-8") if params else query
+    cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT binary)", parser)
+    return parser.finish()
+
+
+def copy_ratings(query: str, params: Optional[dict] = None, conn=None,
+                 chunk_bytes: int = 1 << 22) -> pd.DataFrame:
+    """
+    Exécute COPY (query) TO STDOUT en binaire et retourne un DataFrame typé
+    (user_id int32, movie_id int32, rating float32), sans objet Python par
+    cellule. query doit sélectionner user_id::int4, movie_id::int4, rating::float4.
+    conn : connexion psycopg2 existante (sinon ouverte depuis le moteur SQLAlchemy)
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_engine().raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            columns = copy_columns(cursor, query, params, chunk_bytes=chunk_bytes)
+        return pd.DataFrame(columns, copy=False)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def load_all_ratings(conn=None) -> pd.DataFrame:
+    """Tous les ratings : snapshot local rafraîchi si activé, COPY binaire sinon"""
+    from pipeline.ratings_snapshot import load_snapshot_ratings
+    columns = load_snapshot_ratings(conn=conn)
+    if columns is not None:
+        return pd.DataFrame(columns, copy=False)
+    return copy_ratings(RATINGS_SELECT, conn=conn)
+
+
 def load_filtered_ratings(min_ratings_user=50, min_ratings_movie=100):
     """
     Charge les notes depuis la base de données en appliquant des filtres 
     sur l'activité des utilisateurs et la popularité des films.
     """
-    engine = get_db_engine()
-    
     query = """
         WITH
         active_users AS (
@@ -33,7 +153,7 @@ def load_filtered_ratings(min_ratings_user=50, min_ratings_movie=100):
             GROUP BY movie_id
             HAVING COUNT(*) >= %(min_ratings_movie)s
         )
-        SELECT r.user_id, r.movie_id, r.rating
+        SELECT r.user_id::int4, r.movie_id::int4, r.rating::float4
         FROM ratings r
         JOIN active_users au ON r.user_id = au.user_id
         JOIN popular_movies pm ON r.movie_id = pm.movie_id
@@ -41,9 +161,16 @@ def load_filtered_ratings(min_ratings_user=50, min_ratings_movie=100):
     
     try:
         print(f"Chargement des données avec filtres : min_ratings_user={min_ratings_user}, min_ratings_movie={min_ratings_movie}")
-        # Use a connection from the engine for read_sql
-        with engine.connect() as conn:
-            ratings_df = pd.read_sql(query, conn, params={"min_ratings_user": min_ratings_user, "min_ratings_movie": min_ratings_movie})
+        from pipeline.ratings_snapshot import filter_active_ratings, load_snapshot_ratings
+        columns = load_snapshot_ratings()
+        if columns is not None:
+            # Snapshot local : seules les nouvelles lignes sont lues en base, filtres en mémoire
+            ratings_df = pd.DataFrame(
+                filter_active_ratings(columns, min_ratings_user, min_ratings_movie), copy=False
+            )
+        else:
+            # COPY binaire : colonnes typées décodées par blocs (pas de Decimal par cellule)
+            ratings_df = copy_ratings(query, params={"min_ratings_user": min_ratings_user, "min_ratings_movie": min_ratings_movie})
         print(f"Données chargées : {len(ratings_df)} lignes.")
         return ratings_df
     except Exception as e:
@@ -0,0 +1,334 @@
+"""
+Ré-entraînement incrémental du SVD à partir du modèle exporté
+- Facteurs et biais initialisés depuis la version active (facteurs figés
+  du dernier entraînement), lignes ajoutées pour les nouveaux
+  utilisateurs / films (initialisation de Surprise : N(0, 0.1), biais nuls)
+- Nouveaux utilisateurs initialisés par fold-in (moindres carrés contre
+  les facteurs items), puis quelques époques de SGD par mini-lots
+  vectorisés sur les notes postérieures au watermark du modèle, plus un
+  échantillon rejoué d'anciennes notes (limite l'oubli)
+- Durée proportionnelle au volume de nouvelles notes, pas à la table
+- RMSE mesuré sur un holdout de nouvelles notes, comparable à un
+  ré-entraînement complet (option compare_full_retrain)
+- Comme l'entraînement complet, le modèle actif n'est remplacé que si le
+  RMSE du holdout s'améliore (ou si force) : export de serving, pickle et
+  enregistrement dans le registry MLflow
+"""
+import os
+import time
+import logging
+import joblib
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from pipeline.config import load_config
+from pipeline.model_store import export_factor_model, load_current_artifact, lookup_sorted, ModelArtifact
+from pipeline.scoring import FactorScorer
+from pipeline.mf_engine import BiasedALS
+from pipeline.ratings_snapshot import RatingsSnapshot, filter_active_ratings
+
+logger = logging.getLogger(__name__)
+
+
+class FactorState:
+    """Facteurs et biais modifiables d'un SVD, avec les identifiants bruts de chaque ligne"""
+
+    def __init__(self, pu, qi, bu, bi, user_ids, item_ids, global_mean: float,
+                 biased: bool = True, rating_scale: Tuple[float, float] = (0.5, 5.0)):
+        self.pu = pu
+        self.qi = qi
+        self.bu = bu
+        self.bi = bi
+        # Identifiants bruts triés (lignes ajoutées par warm_start comprises)
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        # Lignes présentes dans le modèle de départ
+        self.known_users = np.ones(user_ids.shape[0], dtype=bool)
+        self.known_items = np.ones(item_ids.shape[0], dtype=bool)
+        self.global_mean = global_mean
+        self.biased = biased
+        self.rating_scale = rating_scale
+
+    def positions(self, user_ids, movie_ids) -> Tuple[np.ndarray, np.ndarray]:
+        return lookup_sorted(self.user_ids, user_ids), lookup_sorted(self.item_ids, movie_ids)
+
+    def predict(self, users: np.ndarray, items: np.ndarray) -> np.ndarray:
+        """
+        Notes prédites (non écrêtées) de couples (ligne utilisateur, ligne item).
+        Ligne -1 (identifiant absent de l'état) : seuls les termes connus,
+        comme Surprise
+        """
+        known_users, known_items = users >= 0, items >= 0
+        both = known_users & known_items
+        scores = np.zeros(users.shape[0], dtype=np.float32)
+        scores[both] = np.einsum("ij,ij->i", self.pu[users[both]], self.qi[items[both]])
+        if self.biased:
+            scores += self.global_mean
+            scores += np.where(known_users, self.bu[users], 0.0)
+            scores += np.where(known_items, self.bi[items], 0.0)
+        return scores
+
+    def to_model(self) -> BiasedALS:
+        """Modèle picklable (même prédiction, API Surprise) pour le pickle et le registry MLflow"""
+        model = BiasedALS(n_factors=self.pu.shape[1], rating_scale=self.rating_scale)
+        model.pu, model.qi = self.pu, self.qi
+        model.user_ids, model.item_ids = self.user_ids, self.item_ids
+        if self.biased:
+            model.bu, model.bi, model.global_mean = self.bu, self.bi, self.global_mean
+        else:
+            model.bu, model.bi, model.global_mean = np.zeros_like(self.bu), np.zeros_like(self.bi), 0.0
+        model.iteration_seconds = []
+        return model
+
+    def rmse(self, user_ids, movie_ids, ratings) -> float:
+        users, items = self.positions(user_ids, movie_ids)
+        low, high = self.rating_scale
+        errors = np.clip(self.predict(users, items), low, high) - np.asarray(ratings, dtype=np.float32)
+        return float(np.sqrt(np.mean(errors ** 2)))
+
+
+def warm_start(artifact: ModelArtifact, user_ids, movie_ids, init_std: float = 0.1,
+               seed: int = 0) -> FactorState:
+    """
+    Copie des facteurs du modèle exporté, complétée par des lignes pour les
+    utilisateurs et films absents (triés avec les anciens par identifiant brut)
+    """
+    rng = np.random.default_rng(seed)
+    scorer = artifact.scorer
+    n_factors = scorer.pu.shape[1]
+
+    def extend(old_ids, raw_ids, factors, biases):
+        new_ids = np.setdiff1d(np.unique(np.asarray(raw_ids, dtype=np.int64)), old_ids)
+        ids = np.concatenate([np.asarray(old_ids, dtype=np.int64), new_ids])
+        order = np.argsort(ids, kind="stable")
+        factors = np.vstack([
+            np.asarray(factors, dtype=np.float32),
+            rng.normal(0, init_std, size=(new_ids.shape[0], n_factors)).astype(np.float32)
+        ])
+        biases = np.concatenate([np.asarray(biases, dtype=np.float32), np.zeros(new_ids.shape[0], np.float32)])
+        return ids[order], factors[order], biases[order]
+
+    user_ids, pu, bu = extend(artifact.user_ids, user_ids, scorer.pu, scorer.bu)
+    item_ids, qi, bi = extend(artifact.item_ids, movie_ids, scorer.qi, scorer.bi)
+    state = FactorState(
+        pu, qi, bu, bi, user_ids, item_ids,
+        global_mean=float(scorer.global_mean),
+        biased=scorer.biased,
+        rating_scale=tuple(scorer.rating_scale)
+    )
+    state.known_users = lookup_sorted(artifact.user_ids, user_ids) >= 0
+    state.known_items = lookup_sorted(artifact.item_ids, item_ids) >= 0
+    return state
+
+
+def fold_in_new_users(state: FactorState, user_ids, movie_ids, ratings, reg: float = 0.02):
+    """
+    Initialise les nouveaux utilisateurs par moindres carrés régularisés
+    contre les facteurs des films du modèle précédent (même solution que le
+    fold-in du serving) : la SGD part d'un vecteur déjà ajusté
+    """
+    users, items = state.positions(user_ids, movie_ids)
+    rows = np.flatnonzero(~state.known_users[users] & state.known_items[items])
+    if rows.size == 0:
+        return
+    scorer = FactorScorer(state.pu, state.qi, state.bu, state.bi, state.global_mean,
+                          biased=state.biased, rating_scale=state.rating_scale)
+    rows = rows[np.argsort(users[rows], kind="stable")]
+    boundaries = np.flatnonzero(users[rows][1:] != users[rows][:-1]) + 1
+    ratings = np.asarray(ratings, dtype=np.float32)
+    for group in np.split(rows, boundaries):
+        user = users[group[0]]
+        state.pu[user], state.bu[user] = scorer.fold_in(items[group], ratings[group], reg=reg)
+
+
+def sgd_epochs(state: FactorState, user_ids, movie_ids, ratings, n_epochs: int = 5,
+               lr: float = 0.005, reg: float = 0.02, batch_size: int = 512, seed: int = 0):
+    """
+    SGD de Surprise (mêmes mises à jour, mêmes hyperparamètres par défaut)
+    par mini-lots : gradients d'un lot accumulés par ligne avec np.add.at
+    """
+    rng = np.random.default_rng(seed)
+    users, items = state.positions(user_ids, movie_ids)
+    ratings = np.asarray(ratings, dtype=np.float32)
+    lr, reg = np.float32(lr), np.float32(reg)
+    for _ in range(n_epochs):
+        order = rng.permutation(ratings.shape[0])
+        for start in range(0, order.shape[0], batch_size):
+            batch = order[start:start + batch_size]
+            u, i = users[batch], items[batch]
+            pu, qi = state.pu[u], state.qi[i]
+            err = ratings[batch] - state.predict(u, i)
+            if state.biased:
+                np.add.at(state.bu, u, lr * (err - reg * state.bu[u]))
+                np.add.at(state.bi, i, lr * (err - reg * state.bi[i]))
+            np.add.at(state.pu, u, lr * (err[:, None] * qi - reg * pu))
+            np.add.at(state.qi, i, lr * (err[:, None] * pu - reg * qi))
+
+
+def split_incremental(columns: Dict[str, np.ndarray], watermark: int, replay_ratio: float = 4.0,
+                      max_replay: int = 1_000_000, holdout_fraction: float = 0.1,
+                      seed: int = 0) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Découpe les notes en nouvelles (timestamp > watermark) et rejouées
+    (échantillon des anciennes). Le holdout n'est tiré que parmi les
+    nouvelles : aucun des modèles comparés ne les a vues.
+    """
+    rng = np.random.default_rng(seed)
+    new_rows = rng.permutation(np.flatnonzero(columns["timestamp"] > watermark))
+    old_rows = np.flatnonzero(columns["timestamp"] <= watermark)
+    n_replay = min(int(new_rows.shape[0] * replay_ratio), max_replay, old_rows.shape[0])
+    replay_rows = rng.choice(old_rows, size=n_replay, replace=False)
+    n_test = int(new_rows.shape[0] * holdout_fraction)
+    take = lambda rows: {name: values[rows] for name, values in columns.items()}
+    return {
+        "train": take(np.concatenate([new_rows[n_test:], replay_rows])),
+        "test": take(new_rows[:n_test]),
+    }
+
+
+def full_retrain_rmse(columns: Dict[str, np.ndarray], test: Dict[str, np.ndarray],
+                      sample_size: int, seed: int = 0) -> Tuple[float, float]:
+    """Référence : SVD Surprise ré-entraîné de zéro, holdout exclu. Retourne (rmse, secondes)"""
+    from surprise import Dataset, Reader, SVD
+    df = pd.DataFrame({name: columns[name] for name in ("user_id", "movie_id", "rating")})
+    held_out = pd.DataFrame({name: test[name] for name in ("user_id", "movie_id")})
+    df = df.merge(held_out, how="left", indicator=True).query("_merge == 'left_only'").drop(columns="_merge")
+    df = df.sample(n=min(sample_size, len(df)), random_state=seed)
+    start = time.perf_counter()
+    algo = SVD(random_state=seed)
+    algo.fit(Dataset.load_from_df(df, Reader(rating_scale=(0.5, 5))).build_full_trainset())
+    seconds = time.perf_counter() - start
+    errors = [
+        algo.predict(u, m).est - r
+        for u, m, r in zip(test["user_id"].tolist(), test["movie_id"].tolist(), test["rating"].tolist())
+    ]
+    return float(np.sqrt(np.mean(np.square(errors)))), seconds
+
+
+def train_incremental_mlflow(force: bool = False) -> Optional[str]:
+    """
+    Ré-entraînement incrémental depuis la version active du dossier d'export.
+    Retourne le run_id MLflow, ou None si un entraînement complet est
+    nécessaire (pas de modèle exporté, pas de watermark, trop de changements).
+    Le modèle actif n'est remplacé que si le RMSE du holdout s'améliore, ou si force.
+    """
+    import mlflow
+    import mlflow.sklearn
+    config = load_config()
+    incremental_config = config["model"].get("incremental", {})
+    serving_config = config["serving"]
+
+    artifact = load_current_artifact(serving_config["export_dir"], mmap=False)
+    if artifact is not None and artifact.kind != "factors":
+        logger.info(f"Modèle exporté de type {artifact.kind} : entraînement complet")
+        return None
+    watermark = artifact.manifest["metadata"].get("ratings_watermark") if artifact is not None else None
+    snapshot = RatingsSnapshot.from_config(config)
+    if watermark is None or not snapshot.enabled:
+        logger.info("Pas de modèle exporté avec watermark (ou snapshot désactivé) : entraînement complet")
+        return None
+
+    snapshot.refresh()
+    # Watermark du snapshot (notes non filtrées), comme l'entraînement complet
+    snapshot_watermark = snapshot.watermark
+    # Même filtre d'activité que l'entraînement complet
+    columns = filter_active_ratings(
+        snapshot.load(),
+        config["model"].get("min_ratings_user", 50),
+        config["model"].get("min_ratings_movie", 100)
+    )
+    n_new = int(np.count_nonzero(columns["timestamp"] > watermark["max_timestamp"]))
+    if n_new == 0:
+        logger.info("Aucune nouvelle note depuis le dernier entraînement")
+        return None
+    if n_new > incremental_config.get("max_new_fraction", 0.2) * columns["timestamp"].shape[0]:
+        logger.info(f"{n_new} nouvelles notes : changement trop important, entraînement complet")
+        return None
+
+    splits = split_incremental(
+        columns,
+        watermark["max_timestamp"],
+        replay_ratio=incremental_config.get("replay_ratio", 4.0),
+        max_replay=incremental_config.get("max_replay", 1_000_000),
+        holdout_fraction=incremental_config.get("holdout_fraction", 0.1)
+    )
+    train = splits["train"]
+
+    mlflow.set_tracking_uri(os.getenv('MLFLOW_TRACKING_URI'))
+    mlflow.set_experiment("Film_Recommendation_Experiment")
+    with mlflow.start_run(run_name="incremental") as run:
+        mlflow.log_param("training_mode", "incremental")
+        mlflow.log_param("parent_version", artifact.version)
+        mlflow.log_param("new_ratings", n_new)
+        mlflow.log_param("train_rows", int(train["rating"].shape[0]))
+        for name in ("n_epochs", "lr", "reg", "fold_in_reg", "replay_ratio"):
+            if name in incremental_config:
+                mlflow.log_param(f"incremental_{name}", incremental_config[name])
+
+        test = splits["test"]
+        start = time.perf_counter()
+        state = warm_start(artifact, train["user_id"], train["movie_id"])
+        parent_rmse = state.rmse(test["user_id"], test["movie_id"], test["rating"])
+        mlflow.log_metric("parent_rmse", parent_rmse)
+        fold_in_new_users(
+            state, train["user_id"], train["movie_id"], train["rating"],
+            reg=incremental_config.get("fold_in_reg", 1.0)
+        )
+        sgd_epochs(
+            state, train["user_id"], train["movie_id"], train["rating"],
+            n_epochs=incremental_config.get("n_epochs", 3),
+            lr=incremental_config.get("lr", 0.002),
+            reg=incremental_config.get("reg", 0.02)
+        )
+        mlflow.log_metric("incremental_seconds", time.perf_counter() - start)
+        incremental_rmse = state.rmse(test["user_id"], test["movie_id"], test["rating"])
+        mlflow.log_metric("incremental_rmse", incremental_rmse)
+
+        if incremental_config.get("compare_full_retrain", False):
+            rmse, seconds = full_retrain_rmse(columns, test, config["model"].get("train_sample_size", 200000))
+            mlflow.log_metric("full_retrain_rmse", rmse)
+            mlflow.log_metric("full_retrain_seconds", seconds)
+
+        is_best_model = incremental_rmse < parent_rmse
+        mlflow.log_param("is_best_model", is_best_model)
+        if not (is_best_model or force):
+            logger.info(f"RMSE incrémental {incremental_rmse:.4f} >= {parent_rmse:.4f} : version {artifact.version} conservée")
+            return run.info.run_id
+
+        # Pickle et registry : mêmes sources de serving que l'entraînement complet
+        model = state.to_model()
+        model_path = os.path.join(config["model"]["model_dir"], config["model"]["model_filename"])
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        joblib.dump(model, model_path)
+        mlflow.log_artifact(model_path)
+
+        version_dir = export_factor_model(
+            serving_config["export_dir"],
+            pu=state.pu, qi=state.qi, bu=state.bu, bi=state.bi,
+            global_mean=state.global_mean,
+            user_ids=state.user_ids,
+            item_ids=state.item_ids,
+            biased=state.biased,
+            rating_scale=state.rating_scale,
+            metadata={
+                "run_id": run.info.run_id,
+                "algorithm": artifact.manifest["metadata"].get("algorithm"),
+                "training_mode": "incremental",
+                "parent_version": artifact.version,
+                "ratings_watermark": {
+                    "max_timestamp": int(snapshot_watermark[0]),
+                    "row_count": int(snapshot_watermark[1]),
+                },
+            },
+            seen_ratings=pd.DataFrame({"user_id": columns["user_id"], "movie_id": columns["movie_id"]}),
+            ann=serving_config.get("ann"),
+            topk=serving_config.get("topk")
+        )
+        mlflow.log_param("serving_version", os.path.basename(version_dir))
+        mlflow.log_artifacts(version_dir, artifact_path="serving")
+        mlflow.sklearn.log_model(
+            sk_model=model,
+            artifact_path="model",
+            registered_model_name=serving_config.get("registered_model_name", "Best_Film_Recommender")
+        )
+        return run.info.run_id
@@ -0,0 +1,220 @@
+"""
+Voisinage item-item creux : k plus proches voisins de chaque film
+- Notes en COO (user_id, movie_id, rating) → matrice creuse films × utilisateurs
+- Similarités cosinus ou pearson_baseline (comme Surprise : normes sur les
+  utilisateurs communs ; rétrécissement par le support pour les deux) calculées par blocs
+  de films, en produits de matrices creuses : seul un bloc films × films
+  est dense à un instant donné
+- Seuls les k voisins les plus similaires (similarité positive) de chaque
+  film sont gardés, en CSR (n_items x k au plus, au lieu de n_items²)
+- Prédiction corrigée des baselines (surprise.KNNBaseline) par lecture
+  creuse des voisins et des notes de l'utilisateur
+- Export au format de serving (export_neighbourhood_model, scoring par ItemKNNScorer)
+"""
+import time
+import logging
+import numpy as np
+import scipy.sparse as sp
+from typing import Any, Dict, List, Optional, Tuple
+from pipeline.model_store import export_neighbourhood_model, lookup_sorted
+
+logger = logging.getLogger(__name__)
+
+SIMILARITIES = ("cosine", "pearson_baseline")
+
+
+def compute_baselines(users: np.ndarray, items: np.ndarray, ratings: np.ndarray, n_users: int, n_items: int,
+                      global_mean: float, reg_u: float = 15.0, reg_i: float = 10.0,
+                      n_epochs: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """Biais bu, bi par moindres carrés alternés (baselines ALS de Surprise)"""
+    user_counts = np.bincount(users, minlength=n_users)
+    item_counts = np.bincount(items, minlength=n_items)
+    bu = np.zeros(n_users)
+    bi = np.zeros(n_items)
+    for _ in range(n_epochs):
+        bi = np.bincount(items, ratings - global_mean - bu[users], minlength=n_items) / (reg_i + item_counts)
+        bu = np.bincount(users, ratings - global_mean - bi[items], minlength=n_users) / (reg_u + user_counts)
+    return bu.astype(np.float32), bi.astype(np.float32)
+
+
+def topk_similarities(values: sp.csr_matrix, k: int, similarity: str = "pearson_baseline",
+                      shrinkage: float = 100.0, min_support: int = 1,
+                      block_items: int = 256) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    k voisins les plus similaires de chaque ligne de values (films × utilisateurs :
+    notes pour cosine, résidus des baselines pour pearson_baseline).
+    Retourne le CSR (indptr, indices, data) films × films.
+    """
+    n_items = values.shape[0]
+    ones = values.copy()
+    ones.data = np.ones_like(ones.data)
+    squares = values.multiply(values).tocsr()
+    values_t, ones_t, squares_t = values.T.tocsr(), ones.T.tocsr(), squares.T.tocsr()
+
+    indptr = np.zeros(n_items + 1, dtype=np.int64)
+    indices: List[np.ndarray] = []
+    data: List[np.ndarray] = []
+    for start in range(0, n_items, block_items):
+        block = slice(start, min(start + block_items, n_items))
+        # Sommes sur les utilisateurs ayant noté les deux films
+        products = (values[block] @ values_t).toarray()
+        support = (ones[block] @ ones_t).toarray()
+        norms = np.sqrt((squares[block] @ ones_t).toarray() * (ones[block] @ squares_t).toarray())
+        sims = np.divide(products, norms, out=np.zeros_like(products), where=norms > 0)
+        # Rétrécissement vers 0 des paires peu co-notées, aussi pour cosine : sans lui, les
+        # paires à un seul utilisateur commun (similarité 1) occupent tout le top k
+        if shrinkage > 0:
+            sims *= np.maximum(support - 1, 0) / (np.maximum(support - 1, 0) + shrinkage)
+        sims[support < min_support] = 0.0
+        rows = np.arange(sims.shape[0])
+        sims[rows, rows + start] = 0.0
+
+        n_keep = min(k, n_items)
+        top = np.argpartition(-sims, n_keep - 1, axis=1)[:, :n_keep] if n_keep < n_items else \
+            np.broadcast_to(np.arange(n_items), sims.shape)
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+        top, top_sims = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_sims, order, axis=1)
+        keep = top_sims > 0
+        indices.append(top[keep].astype(np.int32))
+        data.append(top_sims[keep].astype(np.float32))
+        indptr[block.start + 1:block.stop + 1] = indptr[block.start] + np.cumsum(keep.sum(axis=1))
+    return indptr, np.concatenate(indices), np.concatenate(data)
+
+
+class ItemKNN:
+    """
+    Voisinage item-item : est(u, i) = b_ui + sum_j s_ij (r_uj - b_uj) / sum_j s_ij
+    sur les voisins j de i (k plus similaires) notés par u, écrêté à l'échelle des notes
+    """
+
+    def __init__(self, k: int = 40, similarity: str = "pearson_baseline", shrinkage: float = 100.0,
+                 min_support: int = 1, min_k: int = 1, reg_u: float = 15.0, reg_i: float = 10.0,
+                 block_items: int = 256, predict_chunk: int = 65536,
+                 rating_scale: Tuple[float, float] = (0.5, 5.0)):
+        if similarity not in SIMILARITIES:
+            raise ValueError(f"Similarité inconnue : {similarity} (attendu : {', '.join(SIMILARITIES)})")
+        self.k = k
+        self.similarity = similarity
+        self.shrinkage = shrinkage
+        self.min_support = min_support
+        self.min_k = min_k
+        self.reg_u = reg_u
+        self.reg_i = reg_i
+        self.block_items = block_items
+        self.predict_chunk = predict_chunk
+        self.rating_scale = rating_scale
+
+    def fit(self, user_ids, movie_ids, ratings) -> "ItemKNN":
+        """Entraîne sur des notes en COO (identifiants bruts)"""
+        started = time.perf_counter()
+        self.user_ids, users = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+        self.item_ids, items = np.unique(np.asarray(movie_ids, dtype=np.int64), return_inverse=True)
+        ratings = np.asarray(ratings, dtype=np.float64)
+        n_users, n_items = self.user_ids.shape[0], self.item_ids.shape[0]
+        self.global_mean = float(ratings.mean()) if ratings.shape[0] else 0.0
+        self.bu, self.bi = compute_baselines(users, items, ratings, n_users, n_items, self.global_mean,
+                                             reg_u=self.reg_u, reg_i=self.reg_i)
+        residuals = (ratings - self.global_mean - self.bu[users] - self.bi[items]).astype(np.float32)
+
+        signal = residuals if self.similarity == "pearson_baseline" else ratings.astype(np.float32)
+        by_item = sp.csr_matrix((signal, (items, users)), shape=(n_items, n_users))
+        self.sim_indptr, self.sim_indices, self.sim_data = topk_similarities(
+            by_item, self.k, similarity=self.similarity, shrinkage=self.shrinkage,
+            min_support=self.min_support, block_items=self.block_items
+        )
+
+        # Notes par utilisateur (films triés) : recherche (u, j) par dichotomie
+        by_user = sp.csr_matrix((residuals, (users, items)), shape=(n_users, n_items))
+        by_user.sort_indices()
+        self.rating_indptr = by_user.indptr.astype(np.int64)
+        self.rating_items = by_user.indices.astype(np.int32)
+        self.rating_residuals = by_user.data.astype(np.float32)
+        self._keys = None
+        self.fit_seconds = time.perf_counter() - started
+        logger.info(f"ItemKNN : {self.sim_data.shape[0]} similarités gardées pour {n_items} films "
+                    f"({ratings.shape[0]} notes) en {self.fit_seconds:.1f}s")
+        return self
+
+    def _rating_keys(self) -> np.ndarray:
+        """Clés u * n_items + j des notes d'entraînement (triées), calculées à la première prédiction"""
+        if getattr(self, "_keys", None) is None:
+            rated_users = np.repeat(np.arange(self.user_ids.shape[0]), np.diff(self.rating_indptr))
+            self._keys = rated_users * self.item_ids.shape[0] + self.rating_items
+        return self._keys
+
+    def _neighbourhood(self, users: np.ndarray, items: np.ndarray) -> np.ndarray:
+        """Correction de voisinage de couples (utilisateur, film) internes, par lectures creuses"""
+        n_items = self.item_ids.shape[0]
+        starts, ends = self.sim_indptr[items], self.sim_indptr[items + 1]
+        lengths = ends - starts
+        pair = np.repeat(np.arange(items.shape[0]), lengths)
+        positions = np.arange(pair.shape[0]) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        neighbours, sims = self.sim_indices[positions], self.sim_data[positions]
+
+        # Note de l'utilisateur sur chaque voisin : clés u * n_items + j triées dans le CSR
+        keys = self._rating_keys()
+        wanted = users[pair] * n_items + neighbours
+        found = np.minimum(np.searchsorted(keys, wanted), keys.shape[0] - 1)
+        rated = keys[found] == wanted
+
+        n_pairs = items.shape[0]
+        weights = np.bincount(pair[rated], sims[rated], minlength=n_pairs)
+        numerator = np.bincount(pair[rated], sims[rated] * self.rating_residuals[found[rated]], minlength=n_pairs)
+        support = np.bincount(pair[rated], minlength=n_pairs)
+        valid = (support >= self.min_k) & (weights > 0)
+        return np.where(valid, numerator / np.where(valid, weights, 1.0), 0.0)
+
+    def predict_arrays(self, user_ids, movie_ids) -> np.ndarray:
+        """
+        Notes estimées (écrêtées) pour des identifiants bruts ; un utilisateur
+        ou film inconnu ne garde que les termes de baseline connus
+        """
+        users = lookup_sorted(self.user_ids, user_ids)
+        items = lookup_sorted(self.item_ids, movie_ids)
+        known_users, known_items = users >= 0, items >= 0
+        est = np.full(users.shape, self.global_mean, dtype=np.float64)
+        est += np.where(known_users, self.bu[users], 0.0)
+        est += np.where(known_items, self.bi[items], 0.0)
+        both = np.flatnonzero(known_users & known_items)
+        for start in range(0, both.shape[0], self.predict_chunk):
+            chunk = both[start:start + self.predict_chunk]
+            est[chunk] += self._neighbourhood(users[chunk], items[chunk])
+        return np.clip(est, *self.rating_scale).astype(np.float32)
+
+    def test(self, testset) -> List[Any]:
+        """Prédictions au format surprise (Prediction), pour les appelants de l'API Surprise"""
+        from surprise import Prediction
+        if not testset:
+            return []
+        user_ids, movie_ids, ratings = zip(*testset)
+        est = self.predict_arrays(np.asarray(user_ids), np.asarray(movie_ids))
+        return [Prediction(u, i, r, float(e), {}) for u, i, r, e in zip(user_ids, movie_ids, ratings, est)]
+
+    def predict(self, uid, iid, r_ui=None, clip=True, verbose=False):
+        return self.test([(uid, iid, r_ui)])[0]
+
+    def export(self, export_dir: str, metadata: Optional[Dict[str, Any]] = None, **kwargs) -> str:
+        """Exporte voisins, notes et baselines au format de serving (voir export_neighbourhood_model)"""
+        metadata = dict(metadata or {})
+        metadata.setdefault("algorithm", type(self).__name__)
+        metadata.setdefault("similarity", self.similarity)
+        return export_neighbourhood_model(
+            export_dir,
+            sim_indptr=self.sim_indptr,
+            sim_indices=self.sim_indices,
+            sim_data=self.sim_data,
+            rating_indptr=self.rating_indptr,
+            rating_items=self.rating_items,
+            rating_residuals=self.rating_residuals,
+            bu=self.bu,
+            bi=self.bi,
+            global_mean=self.global_mean,
+            user_ids=self.user_ids,
+            item_ids=self.item_ids,
+            min_k=self.min_k,
+            user_reg=self.reg_u,
+            rating_scale=self.rating_scale,
+            metadata=metadata,
+            **kwargs
+        )
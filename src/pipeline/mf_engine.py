@@ -0,0 +1,197 @@
+"""
+Factorisation matricielle biaisée par moindres carrés alternés (ALS), en NumPy float32
+- Entrée : notes en COO (user_id, movie_id, rating), indexées en CSR par
+  utilisateur et par film (int32 / float32, sans structure Python par note)
+- Chaque demi-itération résout un problème de moindres carrés régularisés
+  par ligne, avec le biais comme facteur supplémentaire (même solution que
+  FactorScorer.fold_in : pénalité reg * nombre de notes)
+- Résolutions par blocs : lignes regroupées par nombre de notes (puissances
+  de 2), notes complétées par des zéros, produits de Gram et np.linalg.solve
+  empilés ; blocs répartis sur un pool de threads (BLAS/LAPACK libèrent le GIL)
+- Budget de temps : les itérations s'arrêtent avant de dépasser le budget
+- Facteurs exportés au format de serving (export_factor_model)
+"""
+import time
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from pipeline.model_store import export_factor_model, lookup_sorted
+
+logger = logging.getLogger(__name__)
+
+
+def build_csr(rows: np.ndarray, cols: np.ndarray, values: np.ndarray,
+              n_rows: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Index CSR (indptr int64, indices int32, data float32) de notes en COO"""
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32), values[order].astype(np.float32)
+
+
+def solve_blocks(indptr: np.ndarray, block_ratings: int) -> Iterator[Tuple[np.ndarray, int]]:
+    """
+    Blocs de lignes de même taille complétée (puissance de 2 >= nombre de
+    notes), d'au plus block_ratings notes complétées chacun.
+    Produit (lignes, taille complétée).
+    """
+    counts = np.diff(indptr)
+    rows = np.flatnonzero(counts)
+    padded = 1 << np.ceil(np.log2(counts[rows])).astype(np.int64)
+    for length in np.unique(padded):
+        bucket = rows[padded == length]
+        step = max(1, block_ratings // int(length))
+        for start in range(0, bucket.shape[0], step):
+            yield bucket[start:start + step], int(length)
+
+
+class BiasedALS:
+    """
+    est(u, i) = global_mean + bu[u] + bi[i] + qi[i] . pu[u], écrêté à
+    l'échelle des notes (même modèle que surprise.SVD)
+    """
+
+    def __init__(self, n_factors: int = 64, reg: float = 0.05, bias_reg: float = 0.01,
+                 n_iterations: int = 10, time_budget_seconds: Optional[float] = None,
+                 n_threads: Optional[int] = None, block_ratings: int = 131072,
+                 init_std: float = 0.1, random_state: int = 0,
+                 rating_scale: Tuple[float, float] = (0.5, 5.0)):
+        self.n_factors = n_factors
+        self.reg = reg
+        self.bias_reg = bias_reg
+        self.n_iterations = n_iterations
+        self.time_budget_seconds = time_budget_seconds
+        self.n_threads = n_threads
+        self.block_ratings = block_ratings
+        self.init_std = init_std
+        self.random_state = random_state
+        self.rating_scale = rating_scale
+
+    def _solve(self, indptr: np.ndarray, indices: np.ndarray, targets: np.ndarray,
+               other: np.ndarray, out: np.ndarray, pool: ThreadPoolExecutor):
+        """
+        Pour chaque ligne r : out[r] = argmin sum (t - other[j] . x)^2 + n_r * (reg_diag . x^2)
+        other : facteurs augmentés d'une colonne de 1 (biais)
+        """
+        n_cols = other.shape[1]
+        reg_diag = np.full(n_cols, self.reg, dtype=np.float32)
+        reg_diag[-1] = self.bias_reg
+
+        def solve_block(block: Tuple[np.ndarray, int]):
+            rows, length = block
+            counts = indptr[rows + 1] - indptr[rows]
+            offsets = np.arange(length)
+            valid = offsets < counts[:, None]
+            positions = np.where(valid, indptr[rows][:, None] + offsets, 0)
+            design = other[indices[positions]] * valid[..., None]
+            target = targets[positions] * valid
+            if length < n_cols:
+                # Moins de notes que de facteurs : système length x length équivalent
+                # (D'D + nR)^-1 D't = R^-1 D' (D R^-1 D' + nI)^-1 t ; notes de complément nulles
+                scaled = design / reg_diag
+                kernel = np.matmul(design, scaled.transpose(0, 2, 1))
+                kernel[:, offsets, offsets] += counts[:, None]
+                alpha = np.linalg.solve(kernel, target[..., None])
+                out[rows] = np.matmul(scaled.transpose(0, 2, 1), alpha)[..., 0]
+                return
+            gram = np.matmul(design.transpose(0, 2, 1), design)
+            gram[:, np.arange(n_cols), np.arange(n_cols)] += counts[:, None] * reg_diag
+            rhs = np.matmul(design.transpose(0, 2, 1), target[..., None])
+            out[rows] = np.linalg.solve(gram, rhs)[..., 0]
+
+        # list() : propage les exceptions des threads
+        list(pool.map(solve_block, solve_blocks(indptr, self.block_ratings)))
+        out[np.diff(indptr) == 0] = 0.0
+
+    def fit(self, user_ids, movie_ids, ratings) -> "BiasedALS":
+        """Entraîne sur des notes en COO (identifiants bruts)"""
+        started = time.perf_counter()
+        self.user_ids, users = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+        self.item_ids, items = np.unique(np.asarray(movie_ids, dtype=np.int64), return_inverse=True)
+        ratings = np.asarray(ratings, dtype=np.float32)
+        self.global_mean = float(ratings.mean(dtype=np.float64)) if ratings.shape[0] else 0.0
+        n_users, n_items = self.user_ids.shape[0], self.item_ids.shape[0]
+
+        by_user = build_csr(users, items, ratings, n_users)
+        by_item = build_csr(items, users, ratings, n_items)
+        by_user_bias, by_item_bias = by_user[2] - self.global_mean, by_item[2] - self.global_mean
+
+        # Facteurs augmentés : [p_u, b_u] et [q_i, b_i], colonne de 1 en face du biais
+        rng = np.random.default_rng(self.random_state)
+        user_x = np.zeros((n_users, self.n_factors + 1), dtype=np.float32)
+        item_x = np.zeros((n_items, self.n_factors + 1), dtype=np.float32)
+        item_x[:, :-1] = rng.normal(0, self.init_std, size=(n_items, self.n_factors))
+        ones = lambda n: np.ones((n, 1), dtype=np.float32)
+
+        self.iteration_seconds: List[float] = []
+        with ThreadPoolExecutor(max_workers=self.n_threads) as pool:
+            for _ in range(self.n_iterations):
+                iteration_start = time.perf_counter()
+                # Utilisateurs : design [q_i, 1], cible r - mu - b_i
+                targets = by_user_bias - item_x[by_user[1], -1]
+                self._solve(by_user[0], by_user[1], targets,
+                            np.hstack([item_x[:, :-1], ones(n_items)]), user_x, pool)
+                # Films : design [p_u, 1], cible r - mu - b_u
+                targets = by_item_bias - user_x[by_item[1], -1]
+                self._solve(by_item[0], by_item[1], targets,
+                            np.hstack([user_x[:, :-1], ones(n_users)]), item_x, pool)
+                self.iteration_seconds.append(time.perf_counter() - iteration_start)
+
+                # Arrêt si l'itération suivante dépasserait le budget
+                elapsed = time.perf_counter() - started
+                if self.time_budget_seconds and elapsed + self.iteration_seconds[-1] > self.time_budget_seconds:
+                    break
+
+        self.pu, self.bu = np.ascontiguousarray(user_x[:, :-1]), np.ascontiguousarray(user_x[:, -1])
+        self.qi, self.bi = np.ascontiguousarray(item_x[:, :-1]), np.ascontiguousarray(item_x[:, -1])
+        self.fit_seconds = time.perf_counter() - started
+        logger.info(f"ALS : {len(self.iteration_seconds)} itérations sur {ratings.shape[0]} notes "
+                    f"en {self.fit_seconds:.1f}s")
+        return self
+
+    def predict_arrays(self, user_ids, movie_ids) -> np.ndarray:
+        """
+        Notes estimées (écrêtées) pour des identifiants bruts ; comme Surprise,
+        un utilisateur ou film inconnu ne garde que les termes connus
+        """
+        users = lookup_sorted(self.user_ids, user_ids)
+        items = lookup_sorted(self.item_ids, movie_ids)
+        known_users, known_items = users >= 0, items >= 0
+        est = np.full(users.shape, self.global_mean, dtype=np.float32)
+        est += np.where(known_users, self.bu[users], 0.0)
+        est += np.where(known_items, self.bi[items], 0.0)
+        both = known_users & known_items
+        est[both] += np.einsum("ij,ij->i", self.pu[users[both]], self.qi[items[both]])
+        return np.clip(est, *self.rating_scale)
+
+    def test(self, testset) -> List[Any]:
+        """Prédictions au format surprise (Prediction), pour les appelants de l'API Surprise"""
+        from surprise import Prediction
+        if not testset:
+            return []
+        user_ids, movie_ids, ratings = zip(*testset)
+        est = self.predict_arrays(np.asarray(user_ids), np.asarray(movie_ids))
+        return [Prediction(u, i, r, float(e), {}) for u, i, r, e in zip(user_ids, movie_ids, ratings, est)]
+
+    def predict(self, uid, iid, r_ui=None, clip=True, verbose=False):
+        return self.test([(uid, iid, r_ui)])[0]
+
+    def export(self, export_dir: str, metadata: Optional[Dict[str, Any]] = None, **kwargs) -> str:
+        """Exporte les facteurs au format de serving (voir export_factor_model)"""
+        metadata = dict(metadata or {})
+        metadata.setdefault("algorithm", type(self).__name__)
+        metadata.setdefault("iterations", len(self.iteration_seconds))
+        return export_factor_model(
+            export_dir,
+            pu=self.pu,
+            qi=self.qi,
+            bu=self.bu,
+            bi=self.bi,
+            global_mean=self.global_mean,
+            user_ids=self.user_ids,
+            item_ids=self.item_ids,
+            rating_scale=self.rating_scale,
+            metadata=metadata,
+            **kwargs
+        )
@@ -0,0 +1,505 @@
+"""
+Format d'export compact des modèles pour le serving
+- Un dossier versionné de fichiers .npy (facteurs, biais, identifiants) + un manifest JSON
+- Chargement par np.load(mmap_mode="r") : démarrage instantané et pages
+  partagées entre processus via le cache du système de fichiers
+- Deux types de modèles (champ "kind" du manifest) : factorisation
+  ("factors") ou voisinage item-item ("item_knn", k voisins par film en CSR)
+"""
+import os
+import json
+import shutil
+import logging
+import numpy as np
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Sequence, Tuple
+from pipeline.scoring import FactorScorer, ItemKNNScorer, top_n_from_score_matrix, mask_seen_rows
+from pipeline.ann_index import IVFIndex, build_ivf_index
+from pipeline.topk_store import TopKStore, materialize_topk
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+CURRENT_FILENAME = "CURRENT"
+
+
+def new_version_name(export_dir: str) -> str:
+    """Nom de version horodaté, unique dans le dossier d'export"""
+    base = datetime.now().strftime("%Y%m%dT%H%M%S")
+    version = base
+    suffix = 1
+    while os.path.exists(os.path.join(export_dir, version)):
+        version = f"{base}-{suffix}"
+        suffix += 1
+    return version
+
+
+def _to_id_array(ids) -> np.ndarray:
+    """Convertit des identifiants bruts en int32 (vérifie l'absence de débordement)"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if ids.size and (ids.min() < np.iinfo(np.int32).min or ids.max() > np.iinfo(np.int32).max):
+        raise ValueError("Identifiants hors de la plage int32")
+    return ids.astype(np.int32)
+
+
+def write_current(export_dir: str, version: str):
+    """Met à jour atomiquement le pointeur vers la version active"""
+    tmp_path = os.path.join(export_dir, f".{CURRENT_FILENAME}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(export_dir, CURRENT_FILENAME))
+
+
+def clear_current(export_dir: str):
+    """Désactive le modèle exporté (le serving retombe sur le pickle)"""
+    path = os.path.join(export_dir, CURRENT_FILENAME)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def read_current(export_dir: str) -> Optional[str]:
+    """Retourne la version active (ou None si aucun modèle n'a été exporté)"""
+    path = os.path.join(export_dir, CURRENT_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        version = f.read().strip()
+    return version or None
+
+
+def lookup_sorted(sorted_ids: np.ndarray, raw_ids) -> np.ndarray:
+    """Positions des identifiants bruts dans un tableau trié (-1 si absent)"""
+    raw_ids = np.asarray(raw_ids, dtype=np.int64)
+    if sorted_ids.shape[0] == 0:
+        return np.full(raw_ids.shape, -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(sorted_ids, raw_ids), sorted_ids.shape[0] - 1)
+    return np.where(sorted_ids[pos] == raw_ids, pos, -1)
+
+
+def build_seen_index(
+    user_ids: np.ndarray,
+    item_ids: np.ndarray,
+    rating_user_ids,
+    rating_movie_ids
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Construit l'index CSR utilisateur → items vus (indices internes triés).
+    user_ids / item_ids : identifiants bruts triés du modèle
+    rating_* : notes à indexer (les couples hors modèle sont ignorés)
+    """
+    users = lookup_sorted(user_ids, rating_user_ids)
+    items = lookup_sorted(item_ids, rating_movie_ids)
+    keep = (users >= 0) & (items >= 0)
+    users, items = users[keep], items[keep]
+
+    order = np.lexsort((items, users))
+    indptr = np.zeros(user_ids.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(users, minlength=user_ids.shape[0]), out=indptr[1:])
+    return indptr, items[order].astype(np.int32)
+
+
+def export_factor_model(
+    export_dir: str,
+    pu: np.ndarray,
+    qi: np.ndarray,
+    bu: np.ndarray,
+    bi: np.ndarray,
+    global_mean: float,
+    user_ids,
+    item_ids,
+    biased: bool = True,
+    rating_scale: Tuple[float, float] = (0.5, 5.0),
+    metadata: Optional[Dict[str, Any]] = None,
+    seen_ratings=None,
+    ann: Optional[Dict[str, Any]] = None,
+    topk: Optional[int] = None,
+    extra_arrays: Optional[Dict[str, np.ndarray]] = None,
+    version: Optional[str] = None,
+    set_current: bool = True
+) -> str:
+    """
+    Exporte un modèle de factorisation dans export_dir/<version>/.
+
+    Les lignes sont réordonnées par identifiant brut croissant, ce qui permet
+    la conversion brut → interne par recherche dichotomique (np.searchsorted)
+    sans construire de dictionnaire au chargement.
+    seen_ratings : DataFrame (user_id, movie_id) de l'historique complet, indexé
+    en CSR (seen_indptr / seen_indices) pour masquer les films déjà vus.
+    ann : configuration de l'index IVF ({"enabled", "search", "nlist", "nprobe"}),
+    construit sur les facteurs items ; "search" fixe le mode par défaut du modèle.
+    topk : si renseigné, matérialise le top K de chaque utilisateur (topk_items /
+    topk_scores) pour servir les requêtes top_n <= K par simple lecture.
+    Retourne le chemin du dossier de la version.
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    version = version or new_version_name(export_dir)
+
+    user_ids = _to_id_array(user_ids)
+    item_ids = _to_id_array(item_ids)
+    user_order = np.argsort(user_ids, kind="stable")
+    item_order = np.argsort(item_ids, kind="stable")
+
+    arrays = {
+        "pu": np.ascontiguousarray(pu[user_order], dtype=np.float32),
+        "qi": np.ascontiguousarray(qi[item_order], dtype=np.float32),
+        "bu": np.ascontiguousarray(bu[user_order], dtype=np.float32),
+        "bi": np.ascontiguousarray(bi[item_order], dtype=np.float32),
+        "user_ids": user_ids[user_order],
+        "item_ids": item_ids[item_order],
+    }
+    if seen_ratings is not None:
+        arrays["seen_indptr"], arrays["seen_indices"] = build_seen_index(
+            arrays["user_ids"],
+            arrays["item_ids"],
+            seen_ratings["user_id"].to_numpy(),
+            seen_ratings["movie_id"].to_numpy()
+        )
+    search = "exact"
+    ann_manifest = None
+    if ann and ann.get("enabled", True):
+        item_bias = arrays["bi"] if biased else np.zeros_like(arrays["bi"])
+        arrays.update(build_ivf_index(arrays["qi"], item_bias, nlist=ann.get("nlist", 64)))
+        search = ann.get("search", "exact")
+        ann_manifest = {
+            "nlist": int(arrays["ivf_centroids"].shape[0]),
+            "nprobe": int(ann.get("nprobe", 8)),
+        }
+    topk_manifest = None
+    if topk:
+        scorer = FactorScorer(
+            arrays["pu"], arrays["qi"], arrays["bu"], arrays["bi"],
+            global_mean, biased=biased, rating_scale=rating_scale
+        )
+        arrays["topk_items"], arrays["topk_scores"] = materialize_topk(
+            scorer, topk, arrays.get("seen_indptr"), arrays.get("seen_indices")
+        )
+        topk_manifest = {"k": int(arrays["topk_items"].shape[1]), "model_version": version}
+    if extra_arrays:
+        arrays.update(extra_arrays)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "kind": "factors",
+        "version": version,
+        "created_at": datetime.now().isoformat(),
+        "global_mean": float(global_mean),
+        "biased": bool(biased),
+        "rating_scale": [float(rating_scale[0]), float(rating_scale[1])],
+        "n_users": int(arrays["pu"].shape[0]),
+        "n_items": int(arrays["qi"].shape[0]),
+        "n_factors": int(arrays["pu"].shape[1]),
+        "search": search,
+        "ann": ann_manifest,
+        "topk": topk_manifest,
+        "arrays": sorted(arrays),
+        "metadata": metadata or {},
+    }
+    return write_version(export_dir, version, arrays, manifest, set_current)
+
+
+def write_version(export_dir: str, version: str, arrays: Dict[str, np.ndarray],
+                  manifest: Dict[str, Any], set_current: bool = True) -> str:
+    """
+    Écrit une version (tableaux .npy + manifest) dans un dossier temporaire,
+    la renomme atomiquement en export_dir/<version>/ puis, si set_current,
+    bascule le pointeur CURRENT. Utilisé par tous les exports versionnés.
+    """
+    tmp_dir = os.path.join(export_dir, f".{version}.tmp")
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    with open(os.path.join(tmp_dir, MANIFEST_FILENAME), "w") as f:
+        json.dump(manifest, f, indent=4)
+
+    version_dir = os.path.join(export_dir, version)
+    os.rename(tmp_dir, version_dir)
+    if set_current:
+        write_current(export_dir, version)
+
+    logger.info(f"Version exportée : {version_dir}")
+    return version_dir
+
+
+def export_surprise_model(
+    algo,
+    export_dir: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> str:
+    """Exporte un algorithme Surprise à facteurs (SVD) au format de serving"""
+    if not FactorScorer.supports(algo):
+        raise ValueError(f"{type(algo).__name__} n'expose pas de facteurs latents exportables")
+    trainset = algo.trainset
+    user_ids = [trainset.to_raw_uid(u) for u in trainset.all_users()]
+    item_ids = [trainset.to_raw_iid(i) for i in trainset.all_items()]
+    metadata = dict(metadata or {})
+    metadata.setdefault("algorithm", type(algo).__name__)
+    return export_factor_model(
+        export_dir,
+        pu=algo.pu,
+        qi=algo.qi,
+        bu=algo.bu,
+        bi=algo.bi,
+        global_mean=trainset.global_mean,
+        user_ids=user_ids,
+        item_ids=item_ids,
+        biased=getattr(algo, "biased", True),
+        rating_scale=trainset.rating_scale,
+        metadata=metadata,
+        **kwargs
+    )
+
+
+def export_neighbourhood_model(
+    export_dir: str,
+    sim_indptr: np.ndarray,
+    sim_indices: np.ndarray,
+    sim_data: np.ndarray,
+    rating_indptr: np.ndarray,
+    rating_items: np.ndarray,
+    rating_residuals: np.ndarray,
+    bu: np.ndarray,
+    bi: np.ndarray,
+    global_mean: float,
+    user_ids,
+    item_ids,
+    min_k: int = 1,
+    user_reg: float = 15.0,
+    rating_scale: Tuple[float, float] = (0.5, 5.0),
+    metadata: Optional[Dict[str, Any]] = None,
+    seen_ratings=None,
+    ann: Optional[Dict[str, Any]] = None,
+    topk: Optional[int] = None,
+    version: Optional[str] = None,
+    set_current: bool = True
+) -> str:
+    """
+    Exporte un modèle de voisinage item-item dans export_dir/<version>/.
+
+    sim_* : k plus proches voisins de chaque film (CSR films × films)
+    rating_* : résidus r - baseline des notes d'entraînement (CSR utilisateurs × films)
+    user_ids / item_ids : identifiants bruts triés (indices internes des CSR).
+    seen_ratings, topk : comme export_factor_model ; ann est ignoré (pas de
+    facteurs items à indexer).
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    version = version or new_version_name(export_dir)
+    user_ids = _to_id_array(user_ids)
+    item_ids = _to_id_array(item_ids)
+    if np.any(np.diff(user_ids) <= 0) or np.any(np.diff(item_ids) <= 0):
+        raise ValueError("Les identifiants d'un modèle de voisinage doivent être triés et uniques")
+
+    arrays = {
+        "sim_indptr": np.asarray(sim_indptr, dtype=np.int64),
+        "sim_indices": np.asarray(sim_indices, dtype=np.int32),
+        "sim_data": np.asarray(sim_data, dtype=np.float32),
+        "rating_indptr": np.asarray(rating_indptr, dtype=np.int64),
+        "rating_items": np.asarray(rating_items, dtype=np.int32),
+        "rating_residuals": np.asarray(rating_residuals, dtype=np.float32),
+        "bu": np.asarray(bu, dtype=np.float32),
+        "bi": np.asarray(bi, dtype=np.float32),
+        "user_ids": user_ids,
+        "item_ids": item_ids,
+    }
+    if seen_ratings is not None:
+        arrays["seen_indptr"], arrays["seen_indices"] = build_seen_index(
+            user_ids, item_ids, seen_ratings["user_id"].to_numpy(), seen_ratings["movie_id"].to_numpy()
+        )
+    neighbours = {
+        "k": int(np.diff(arrays["sim_indptr"]).max(initial=0)),
+        "min_k": int(min_k),
+        "user_reg": float(user_reg),
+    }
+    topk_manifest = None
+    if topk:
+        scorer = ItemKNNScorer.from_arrays(arrays, global_mean, neighbours, rating_scale)
+        arrays["topk_items"], arrays["topk_scores"] = materialize_topk(
+            scorer, topk, arrays.get("seen_indptr"), arrays.get("seen_indices")
+        )
+        topk_manifest = {"k": int(arrays["topk_items"].shape[1]), "model_version": version}
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "kind": "item_knn",
+        "version": version,
+        "created_at": datetime.now().isoformat(),
+        "global_mean": float(global_mean),
+        "biased": True,
+        "rating_scale": [float(rating_scale[0]), float(rating_scale[1])],
+        "n_users": int(user_ids.shape[0]),
+        "n_items": int(item_ids.shape[0]),
+        "neighbours": neighbours,
+        "search": "exact",
+        "ann": None,
+        "topk": topk_manifest,
+        "arrays": sorted(arrays),
+        "metadata": metadata or {},
+    }
+    return write_version(export_dir, version, arrays, manifest, set_current)
+
+
+class ModelArtifact:
+    """Modèle de serving chargé depuis un dossier de version (tableaux mappés en mémoire)"""
+
+    def __init__(self, version_dir: str, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.version_dir = version_dir
+        self.manifest = manifest
+        self.arrays = arrays
+        self.version = manifest["version"]
+        self.user_ids = arrays["user_ids"]
+        self.item_ids = arrays["item_ids"]
+        self.kind = manifest.get("kind", "factors")
+        if self.kind == "item_knn":
+            self.scorer = ItemKNNScorer.from_arrays(
+                arrays, manifest["global_mean"], manifest["neighbours"], tuple(manifest["rating_scale"])
+            )
+        else:
+            self.scorer = FactorScorer(
+                pu=arrays["pu"],
+                qi=arrays["qi"],
+                bu=arrays["bu"],
+                bi=arrays["bi"],
+                global_mean=manifest["global_mean"],
+                biased=manifest["biased"],
+                rating_scale=tuple(manifest["rating_scale"]),
+            )
+        self.ann = None
+        if manifest.get("ann") and "ivf_centroids" in arrays:
+            self.ann = IVFIndex.from_arrays(arrays, nprobe=manifest["ann"]["nprobe"])
+        # Mode de recherche propre au modèle : exact ou ivf (approximatif)
+        self.search = manifest.get("search", "exact") if self.ann is not None else "exact"
+        # Store top-K : ignoré s'il ne correspond pas aux tableaux de ce modèle
+        self.topk = None
+        topk_manifest = manifest.get("topk")
+        if topk_manifest:
+            expected = (self.user_ids.shape[0], topk_manifest["k"])
+            topk_items, topk_scores = arrays.get("topk_items"), arrays.get("topk_scores")
+            if (topk_items is not None and topk_scores is not None
+                    and topk_items.shape == expected and topk_scores.shape == expected
+                    and (topk_items.size == 0 or int(topk_items.max()) < self.item_ids.shape[0])):
+                self.topk = TopKStore(topk_items, topk_scores, self.version)
+            else:
+                logger.warning(f"Store top-K incohérent avec le modèle {self.version} : scoring en direct")
+
+    @property
+    def n_users(self) -> int:
+        return self.user_ids.shape[0]
+
+    @property
+    def n_items(self) -> int:
+        return self.item_ids.shape[0]
+
+    @property
+    def has_seen_index(self) -> bool:
+        return "seen_indptr" in self.arrays
+
+    def to_inner_uid(self, user_id: int) -> Optional[int]:
+        """Indice interne d'un utilisateur (None s'il n'est pas dans le modèle)"""
+        inner = int(lookup_sorted(self.user_ids, [user_id])[0])
+        return inner if inner >= 0 else None
+
+    def to_inner_iids(self, movie_ids) -> np.ndarray:
+        """Indices internes des films (-1 pour les films hors modèle)"""
+        return lookup_sorted(self.item_ids, movie_ids)
+
+    def seen_items(self, inner_uid: int) -> Optional[np.ndarray]:
+        """Indices internes triés des films déjà notés (None sans index)"""
+        if not self.has_seen_index:
+            return None
+        indptr = self.arrays["seen_indptr"]
+        return self.arrays["seen_indices"][indptr[inner_uid]:indptr[inner_uid + 1]]
+
+    def _search(self, inner_uid: int, N: int, seen) -> Tuple[np.ndarray, np.ndarray]:
+        """Top N exact, ou approximatif via l'index IVF si le modèle l'active"""
+        if self.search == "ivf":
+            candidates, item_scores = self.ann.search(self.scorer.pu[inner_uid])
+            items, scores = self.scorer.top_n_among(
+                inner_uid, candidates, N=N, seen_items=seen, item_scores=item_scores
+            )
+            if items.shape[0] >= N:
+                return items, scores
+        return self.scorer.top_n(inner_uid, N=N, seen_items=seen)
+
+    def top_n(self, user_id: int, N: int = 5, seen_movie_ids=None) -> List[Tuple[int, float]]:
+        """
+        Top N [(movie_id, score)] des films non vus pour un utilisateur du modèle.
+        Sans seen_movie_ids, les films vus proviennent de l'index persisté.
+        """
+        inner_uid = self.to_inner_uid(user_id)
+        if inner_uid is None:
+            return []
+        if seen_movie_ids is not None:
+            seen = self.to_inner_iids(seen_movie_ids)
+            seen = seen[seen >= 0]
+            items, scores = self._search(inner_uid, N, seen)
+        else:
+            # Lecture directe du store top-K, scoring en direct si N > K
+            found = self.topk.lookup(inner_uid, N) if self.topk is not None else None
+            if found is not None:
+                items, scores = found
+            else:
+                items, scores = self._search(inner_uid, N, self.seen_items(inner_uid))
+        return [(int(self.item_ids[i]), float(s)) for i, s in zip(items, scores)]
+
+    def is_precomputed(self, N: int) -> bool:
+        """True si le top N se lit directement dans le store top-K"""
+        return self.topk is not None and N <= self.topk.k
+
+    def top_n_batch(self, user_ids: Sequence[int], Ns: Sequence[int]) -> List[List[Tuple[int, float]]]:
+        """
+        Top N de plusieurs utilisateurs (films vus issus de l'index persisté).
+        Les scorings exacts sont regroupés en un seul produit matrice-matrice ;
+        en mode ivf, chaque utilisateur passe par l'index approximatif.
+        """
+        results: List[List[Tuple[int, float]]] = [[] for _ in user_ids]
+        inner_uids = lookup_sorted(self.user_ids, list(user_ids))
+        live = []
+        for pos, (user_id, inner, N) in enumerate(zip(user_ids, inner_uids, Ns)):
+            if inner < 0:
+                continue
+            if self.search == "ivf" or self.is_precomputed(N):
+                results[pos] = self.top_n(user_id, N=N)
+            else:
+                live.append(pos)
+        if not live:
+            return results
+
+        rows = inner_uids[live]
+        scores = self.scorer.score_users(rows)
+        if self.has_seen_index:
+            mask_seen_rows(scores, self.arrays["seen_indptr"], self.arrays["seen_indices"], rows)
+        items, top_scores = top_n_from_score_matrix(scores, max(Ns[pos] for pos in live))
+        top_scores = self.scorer.clip(top_scores)
+        for row, pos in enumerate(live):
+            N = Ns[pos]
+            valid = items[row, :N] >= 0
+            results[pos] = [
+                (int(self.item_ids[i]), float(s))
+                for i, s in zip(items[row, :N][valid], top_scores[row, :N][valid])
+            ]
+        return results
+
+
+def load_model_artifact(version_dir: str, mmap: bool = True) -> ModelArtifact:
+    """Charge un dossier de version ; mmap=True mappe les tableaux en lecture seule"""
+    with open(os.path.join(version_dir, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Format de modèle non supporté : {manifest.get('format_version')}")
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in manifest["arrays"]
+    }
+    return ModelArtifact(version_dir, manifest, arrays)
+
+
+def load_current_artifact(export_dir: str, mmap: bool = True) -> Optional[ModelArtifact]:
+    """Charge la version active du dossier d'export (None si aucune)"""
+    version = read_current(export_dir)
+    if version is None:
+        return None
+    return load_model_artifact(os.path.join(export_dir, version), mmap=mmap)
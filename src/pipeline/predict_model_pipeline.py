@@ -9,42 +9,61 @@ import mlflow
 import psycopg2
 from surprise import Dataset, Reader
 from pipeline.config import load_config
+from pipeline.scoring import FactorScorer
+from pipeline.model_store import ModelArtifact
+from pipeline.catalog import load_catalog
+from pipeline.data_loader import load_all_ratings
 
 # Charger la configuration
 config = load_config()
 
 
-def top_n_user(algo, trainset, movies_df, user_id, N=5):
-    """Renvoie le top N des recommandations pour un utilisateur donné."""
+def top_n_user_artifact(artifact, catalog, user_id, N=5, seen_movie_ids=None):
+    """Top N des recommandations à partir d'un modèle exporté (ModelArtifact)."""
+    if artifact.to_inner_uid(user_id) is None:
+        print(f"L'utilisateur {user_id} n'existe pas dans le modele.")
+        return []
+    return catalog.attach(artifact.top_n(user_id, N=N, seen_movie_ids=seen_movie_ids))
+
+
+def top_n_user(algo, trainset, catalog, user_id, N=5):
+    """
+    Renvoie le top N des recommandations pour un utilisateur donné.
+    Format: [(titre, score, movie_id), ...]
+    """
+    if isinstance(algo, ModelArtifact):
+        # Modèle exporté : les items vus proviennent de son index persisté
+        return top_n_user_artifact(algo, catalog, user_id, N=N)
+
     try:
         inner_uid = trainset.to_inner_uid(user_id)
     except ValueError:
         print(f"L'utilisateur {user_id} n'existe pas dans l'echantillon.")
         return []
 
-    # Récupérer les items déjà notés par l'utilisateur
-    rated_items = {trainset.to_raw_iid(i) for (i, _) in trainset.ur[inner_uid]}
-
-    # Créer l'anti-testset
-    anti_testset = [
-        (user_id, trainset.to_raw_iid(i), trainset.global_mean)
-        for i in trainset.all_items()
-        if trainset.to_raw_iid(i) not in rated_items
-    ]
-
-    # Prédictions
-    preds = algo.test(anti_testset)
+    # Items déjà notés par l'utilisateur (indices internes)
+    rated_inner = [i for (i, _) in trainset.ur[inner_uid]]
 
-    # Sélection du top N
-    top_n = sorted(preds, key=lambda x: x.est, reverse=True)[:N]
-
-    # Récupérer les titres des films
-    movie_index = movies_df.set_index('movie_id')
-    return [
-        (movie_index.loc[p.iid, 'title'], p.est)
-        for p in top_n
-        if p.iid in movie_index.index
-    ]
+    if FactorScorer.supports(algo):
+        # Modèle à facteurs : scoring vectorisé de tout le catalogue
+        scorer = FactorScorer.from_surprise(algo)
+        items, scores = scorer.top_n(inner_uid, N=N, seen_items=rated_inner)
+        top_n = [(trainset.to_raw_iid(int(i)), float(s)) for i, s in zip(items, scores)]
+    else:
+        # Autres algorithmes (KNN, baseline) : prédiction item par item
+        rated_items = set(rated_inner)
+        anti_testset = [
+            (user_id, trainset.to_raw_iid(i), trainset.global_mean)
+            for i in trainset.all_items()
+            if i not in rated_items
+        ]
+        preds = algo.test(anti_testset)
+        top_n = [
+            (p.iid, p.est)
+            for p in sorted(preds, key=lambda x: x.est, reverse=True)[:N]
+        ]
+
+    return catalog.attach(top_n)
 
 
 def predict_model_mlflow(users_id=None, N=5, predict_sample_size=2_000_000):
@@ -78,14 +97,15 @@ def predict_model_mlflow(users_id=None, N=5, predict_sample_size=2_000_000):
         port=config["db"]["port"]
     )
     
-    # Charger les ratings
-    ratings_df = pd.read_sql("SELECT user_id, movie_id, rating FROM ratings", conn)
-    
-    # Charger les films
-    movies_df = pd.read_sql("SELECT movie_id, title FROM movies", conn)
-    
-    # Fermer la connexion
-    conn.close()
+    # Charger les ratings (COPY binaire, colonnes typées)
+    try:
+        ratings_df = load_all_ratings(conn)
+    finally:
+        # Fermer la connexion
+        conn.close()
+
+    # Charger le catalogue des films
+    catalog = load_catalog()
 
     # Échantillonnage des ratings si nécessaire
     if predict_sample_size < len(ratings_df):
@@ -112,21 +132,21 @@ def predict_model_mlflow(users_id=None, N=5, predict_sample_size=2_000_000):
 
         for user_id in users_id:
             # Top N recommandations
-            top_n = top_n_user(best_svd, trainset, movies_df, user_id=user_id, N=N)
+            top_n = top_n_user(best_svd, trainset, catalog, user_id=user_id, N=N)
 
             # Sauvegarder les résultats
-            results_df = pd.DataFrame(top_n, columns=['movie', 'score'])
+            results_df = pd.DataFrame(top_n, columns=['movie', 'score', 'movie_id'])
             results_path = f"./predictions/top_{N}_user_{user_id}.csv"
             results_df.to_csv(results_path, index=False)
             mlflow.log_artifact(results_path)
 
             # Affichage
             print(f"\nTop {N} recommandations pour l'utilisateur {user_id} :")
-            for title, score in top_n:
+            for title, score, _ in top_n:
                 print(f"{title} → {score:.2f}")
 
             # Stocker la meilleure note pour le JSON des métriques
-            all_metrics[f"user_{user_id}_top_score"] = max([s for _, s in top_n], default=None)
+            all_metrics[f"user_{user_id}_top_score"] = max([s for _, s, _ in top_n], default=None)
 
         # Sauvegarder les métriques dans un fichier JSON
         metrics_path = "./metrics/predict_metrics.json"
@@ -0,0 +1,248 @@
+"""
+Snapshot local et colonnaire de la table ratings
+- Partitions .npz (user_id int32, movie_id int32, rating float32,
+  timestamp int64) sous un dossier de données, décrites par un manifest
+- Watermark (timestamp max, nombre de lignes) : un rafraîchissement ne
+  copie que les lignes postérieures au watermark, en une partition de plus
+- Watermark et delta lus dans une même transaction REPEATABLE READ : si le
+  nombre de lignes ne concorde pas (notes tardives, mises à jour,
+  suppressions), le snapshot est reconstruit en entier
+- Manifest remplacé atomiquement après l'écriture des partitions
+- Rafraîchissement et compaction sérialisés entre processus (DAG,
+  entraînement incrémental, CLI) par un verrou de fichier exclusif ;
+  les lectures prennent le verrou partagé
+"""
+import os
+import json
+import fcntl
+import logging
+import numpy as np
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from pipeline.config import load_config
+from pipeline.data_loader import copy_columns, copy_row_dtype, get_db_engine
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+LOCK_FILENAME = ".snapshot.lock"
+
+SNAPSHOT_COLUMNS = ("user_id", "movie_id", "rating", "timestamp")
+SNAPSHOT_COPY_DTYPE = copy_row_dtype([
+    ("user_id", ">i4"), ("movie_id", ">i4"), ("rating", ">f4"), ("timestamp", ">i8")
+])
+SNAPSHOT_SELECT = (
+    "SELECT user_id::int4, movie_id::int4, rating::float4, timestamp::int8 FROM ratings"
+)
+WATERMARK_QUERY = "SELECT COUNT(*), COALESCE(MAX(timestamp), 0) FROM ratings"
+
+# (timestamp max, nombre de lignes)
+Watermark = Tuple[int, int]
+
+
+def filter_active_ratings(columns: Dict[str, np.ndarray], min_ratings_user: int = 50,
+                          min_ratings_movie: int = 100) -> Dict[str, np.ndarray]:
+    """
+    Même filtre que la requête SQL de load_filtered_ratings, en mémoire :
+    utilisateurs et films ayant assez de notes dans toute la table
+    """
+    user_ids, movie_ids = columns["user_id"], columns["movie_id"]
+    if user_ids.shape[0] == 0:
+        return dict(columns)
+    keep = (
+        (np.bincount(user_ids)[user_ids] >= min_ratings_user)
+        & (np.bincount(movie_ids)[movie_ids] >= min_ratings_movie)
+    )
+    return {name: values[keep] for name, values in columns.items()}
+
+
+class RatingsSnapshot:
+    """Partitions colonnaires de ratings, rafraîchies par watermark"""
+
+    def __init__(self, snapshot_dir: str, partition_rows: int = 5_000_000, max_partitions: int = 16,
+                 enabled: bool = True):
+        self.snapshot_dir = snapshot_dir
+        self.partition_rows = partition_rows
+        self.max_partitions = max_partitions
+        self.enabled = enabled
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "RatingsSnapshot":
+        config = config or load_config()
+        snapshot_config = config["data"].get("snapshot", {})
+        return cls(
+            snapshot_config.get("dir", os.path.join(config["data"]["processed_dir"], "ratings_snapshot")),
+            partition_rows=snapshot_config.get("partition_rows", 5_000_000),
+            max_partitions=snapshot_config.get("max_partitions", 16),
+            enabled=snapshot_config.get("enabled", False)
+        )
+
+    @contextmanager
+    def _lock(self, shared: bool = False):
+        """Verrou entre processus sur le dossier du snapshot (exclusif pour les écritures)"""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with open(os.path.join(self.snapshot_dir, LOCK_FILENAME), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        """Manifest du snapshot (None s'il n'a jamais été construit)"""
+        path = os.path.join(self.snapshot_dir, MANIFEST_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            return None
+        return manifest
+
+    @property
+    def watermark(self) -> Optional[Watermark]:
+        manifest = self.read_manifest()
+        if manifest is None:
+            return None
+        return manifest["watermark"]["max_timestamp"], manifest["watermark"]["row_count"]
+
+    def _write_manifest(self, partitions: List[Dict[str, Any]], watermark: Watermark, next_part: int):
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "updated_at": datetime.now().isoformat(),
+            "watermark": {"max_timestamp": int(watermark[0]), "row_count": int(watermark[1])},
+            "next_part": next_part,
+            "partitions": partitions,
+        }
+        tmp_path = os.path.join(self.snapshot_dir, f".{MANIFEST_FILENAME}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmp_path, os.path.join(self.snapshot_dir, MANIFEST_FILENAME))
+        # Partitions remplacées (reconstruction, compaction) ou orphelines
+        referenced = {partition["file"] for partition in partitions}
+        for name in os.listdir(self.snapshot_dir):
+            if name.startswith("part-") and name not in referenced:
+                os.remove(os.path.join(self.snapshot_dir, name))
+
+    def _write_partitions(self, columns: Dict[str, np.ndarray], next_part: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Écrit des colonnes en partitions de partition_rows lignes au plus"""
+        partitions = []
+        n_rows = columns["user_id"].shape[0]
+        for start in range(0, n_rows, self.partition_rows):
+            part = {name: values[start:start + self.partition_rows] for name, values in columns.items()}
+            name = f"part-{next_part:05d}.npz"
+            tmp_path = os.path.join(self.snapshot_dir, f".{name}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **part)
+            os.replace(tmp_path, os.path.join(self.snapshot_dir, name))
+            partitions.append({
+                "file": name,
+                "rows": int(part["user_id"].shape[0]),
+                "min_timestamp": int(part["timestamp"].min()),
+                "max_timestamp": int(part["timestamp"].max()),
+            })
+            next_part += 1
+        return partitions, next_part
+
+    def apply(self, watermark: Watermark, columns: Dict[str, np.ndarray], delta: bool) -> str:
+        """
+        Enregistre des lignes lues en base : ajout d'une partition (delta) ou
+        remplacement complet. Compacte au-delà de max_partitions.
+        """
+        with self._lock():
+            return self._apply(watermark, columns, delta)
+
+    def _apply(self, watermark: Watermark, columns: Dict[str, np.ndarray], delta: bool) -> str:
+        manifest = self.read_manifest() if delta else None
+        partitions = list(manifest["partitions"]) if manifest else []
+        next_part = manifest["next_part"] if manifest else 0
+        new_partitions, next_part = self._write_partitions(columns, next_part)
+        partitions += new_partitions
+        if len(partitions) > self.max_partitions:
+            logger.info(f"Compaction du snapshot ratings ({len(partitions)} partitions)")
+            partitions, next_part = self._write_partitions(self._load(SNAPSHOT_COLUMNS, partitions), next_part)
+        self._write_manifest(partitions, watermark, next_part)
+        return "appended" if delta else "rebuilt"
+
+    def refresh(self, conn=None) -> str:
+        """
+        Met le snapshot à jour depuis PostgreSQL.
+        Retourne "unchanged", "appended" (lignes après le watermark) ou "rebuilt".
+        """
+        own_conn = conn is None
+        if own_conn:
+            conn = get_db_engine().raw_connection()
+        try:
+            # Un seul rafraîchissement à la fois : le watermark lu reste celui du manifest écrit
+            with self._lock(), conn.cursor() as cursor:
+                # Watermark et lignes lus sur la même image de la table
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                cursor.execute(WATERMARK_QUERY)
+                row_count, max_timestamp = cursor.fetchone()
+                current = (int(max_timestamp), int(row_count))
+                previous = self.watermark
+                if previous == current:
+                    return "unchanged"
+                if previous is not None and current[1] > previous[1] and current[0] >= previous[0]:
+                    delta = copy_columns(
+                        cursor, SNAPSHOT_SELECT + " WHERE timestamp > %(watermark)s",
+                        {"watermark": previous[0]}, dtype=SNAPSHOT_COPY_DTYPE
+                    )
+                    if previous[1] + delta["user_id"].shape[0] == current[1]:
+                        status = self._apply(current, delta, delta=True)
+                        logger.info(f"Snapshot ratings : {delta['user_id'].shape[0]} lignes ajoutées")
+                        return status
+                    logger.info("Watermark incohérent (notes tardives ou modifiées), reconstruction")
+                columns = copy_columns(cursor, SNAPSHOT_SELECT, dtype=SNAPSHOT_COPY_DTYPE)
+                status = self._apply(current, columns, delta=False)
+                logger.info(f"Snapshot ratings reconstruit : {current[1]} lignes")
+                return status
+        finally:
+            conn.rollback()
+            if own_conn:
+                conn.close()
+
+    def load(self, columns: Sequence[str] = SNAPSHOT_COLUMNS,
+             partitions: Optional[List[Dict[str, Any]]] = None) -> Dict[str, np.ndarray]:
+        """Colonnes du snapshot, partitions concaténées colonne par colonne"""
+        # Verrou partagé : pas de compaction (suppression de partitions) pendant la lecture
+        with self._lock(shared=True):
+            if partitions is None:
+                manifest = self.read_manifest()
+                if manifest is None:
+                    raise FileNotFoundError(f"Pas de snapshot ratings dans {self.snapshot_dir}")
+                partitions = manifest["partitions"]
+            return self._load(columns, partitions)
+
+    def _load(self, columns: Sequence[str], partitions: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        files = [np.load(os.path.join(self.snapshot_dir, partition["file"])) for partition in partitions]
+        try:
+            return {
+                name: np.concatenate([f[name] for f in files]) if files
+                else np.empty(0, SNAPSHOT_COPY_DTYPE[name].newbyteorder("="))
+                for name in columns
+            }
+        finally:
+            for f in files:
+                f.close()
+
+
+def load_snapshot_ratings(columns: Sequence[str] = ("user_id", "movie_id", "rating"),
+                          snapshot: Optional[RatingsSnapshot] = None,
+                          conn=None) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Ratings lus depuis le snapshot local, rafraîchi au préalable.
+    None si le snapshot est désactivé dans la configuration.
+    """
+    snapshot = snapshot or RatingsSnapshot.from_config()
+    if not snapshot.enabled:
+        return None
+    snapshot.refresh(conn)
+    return snapshot.load(columns)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(RatingsSnapshot.from_config().refresh())
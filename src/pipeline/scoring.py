@@ -0,0 +1,344 @@
+"""
+Moteur de scoring vectorisé pour les modèles de factorisation (SVD)
+- Score de tous les items en un seul produit matrice-vecteur
+- Masquage des items déjà vus par tableau booléen
+- Sélection du top N par argpartition
+- Variante par lots : plusieurs utilisateurs en un produit matrice-matrice
+- Modèles de voisinage item-item (ItemKNNScorer) : mêmes méthodes, scores
+  par produits creux contre la matrice des k plus proches voisins
+"""
+import numpy as np
+import scipy.sparse as sp
+from typing import Optional, Tuple
+
+
+def top_n_from_scores(
+    scores: np.ndarray,
+    N: int,
+    seen_mask: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sélectionne les N meilleurs items d'un vecteur de scores.
+    Retourne (indices internes des items, scores) triés par score décroissant.
+    """
+    if seen_mask is not None:
+        candidates = np.flatnonzero(~seen_mask)
+        candidate_scores = scores[candidates]
+    else:
+        candidates = None
+        candidate_scores = scores
+
+    n_candidates = candidate_scores.shape[0]
+    if n_candidates == 0 or N <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=scores.dtype)
+
+    if N < n_candidates:
+        part = np.argpartition(-candidate_scores, N - 1)[:N]
+    else:
+        part = np.arange(n_candidates)
+
+    # Tri stable du sous-ensemble retenu (les ex aequo gardent l'ordre interne)
+    order = part[np.argsort(-candidate_scores[part], kind="stable")]
+    items = candidates[order] if candidates is not None else order
+    return items, candidate_scores[order]
+
+
+def _block_threshold(scores: np.ndarray, N: int, block: int) -> np.ndarray:
+    """
+    Borne inférieure du N-ième meilleur score de chaque ligne : N blocs
+    distincts ont un maximum au moins égal au N-ième plus grand maximum de bloc.
+    """
+    n_rows, n_items = scores.shape
+    n_full = n_items // block
+    block_max = scores[:, :n_full * block].reshape(n_rows, n_full, block).max(axis=2)
+    if n_full * block < n_items:
+        block_max = np.concatenate([block_max, scores[:, n_full * block:].max(axis=1, keepdims=True)], axis=1)
+    n_blocks = block_max.shape[1]
+    return np.partition(block_max, n_blocks - N, axis=1)[:, n_blocks - N]
+
+
+def top_n_from_score_matrix(scores: np.ndarray, N: int, block: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top N par ligne d'une matrice de scores (utilisateurs × items).
+    Les items masqués valent -inf ; les cases sans item valent -1 / -inf.
+    Les candidats sont présélectionnés par un seuil calculé sur les maxima
+    de blocs de colonnes, puis seuls ces candidats sont triés.
+    """
+    n_rows, n_items = scores.shape
+    N = min(N, n_items)
+    if N <= 0:
+        return np.empty((n_rows, 0), dtype=np.int64), np.empty((n_rows, 0), dtype=scores.dtype)
+    if -(-n_items // block) < 4 * N:
+        # Trop peu de blocs pour élaguer : argpartition sur chaque ligne
+        part = np.argpartition(-scores, N - 1, axis=1)[:, :N]
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        order = np.argsort(-part_scores, axis=1, kind="stable")
+        items = np.take_along_axis(part, order, axis=1)
+        top_scores = np.take_along_axis(part_scores, order, axis=1)
+        return np.where(np.isfinite(top_scores), items, -1), top_scores
+
+    threshold = _block_threshold(scores, N, block)
+    rows, cols = np.nonzero(scores >= threshold[:, None])
+    candidates = scores[rows, cols]
+    # Tri par ligne, score décroissant puis indice d'item croissant
+    order = np.lexsort((cols, -candidates, rows))
+    rows, cols, candidates = rows[order], cols[order], candidates[order]
+    rank = np.arange(rows.shape[0]) - np.searchsorted(rows, np.arange(n_rows))[rows]
+    keep = rank < N
+    items = np.full((n_rows, N), -1, dtype=np.int64)
+    top_scores = np.full((n_rows, N), -np.inf, dtype=scores.dtype)
+    items[rows[keep], rank[keep]] = cols[keep]
+    top_scores[rows[keep], rank[keep]] = candidates[keep]
+    return np.where(np.isfinite(top_scores), items, -1), top_scores
+
+
+def mask_seen_rows(scores: np.ndarray, seen_indptr: np.ndarray, seen_indices: np.ndarray,
+                   inner_uids: np.ndarray):
+    """Met à -inf les items vus (index CSR) de chaque ligne de la matrice de scores"""
+    inner_uids = np.asarray(inner_uids)
+    starts, ends = seen_indptr[inner_uids], seen_indptr[inner_uids + 1]
+    rows = np.repeat(np.arange(inner_uids.shape[0]), ends - starts)
+    if rows.shape[0] == 0:
+        return
+    cols = np.concatenate([seen_indices[a:b] for a, b in zip(starts, ends)])
+    scores[rows, cols] = -np.inf
+
+
+class FactorScorer:
+    """
+    Scoring d'un modèle de factorisation à partir de ses paramètres :
+    est(u, i) = global_mean + bu[u] + bi[i] + qi[i] . pu[u]
+    (identique à surprise.SVD.estimate, avec écrêtage à l'échelle des notes)
+    """
+
+    def __init__(self, pu, qi, bu, bi, global_mean, biased=True, rating_scale=(0.5, 5.0)):
+        self.pu = pu
+        self.qi = qi
+        self.bu = bu
+        self.bi = bi
+        self.global_mean = float(global_mean)
+        self.biased = biased
+        self.rating_scale = rating_scale
+
+    @classmethod
+    def from_surprise(cls, algo):
+        """Construit le scorer à partir d'un algorithme Surprise entraîné (SVD, SVDpp...)"""
+        trainset = algo.trainset
+        return cls(
+            pu=algo.pu,
+            qi=algo.qi,
+            bu=algo.bu,
+            bi=algo.bi,
+            global_mean=trainset.global_mean,
+            biased=getattr(algo, "biased", True),
+            rating_scale=trainset.rating_scale,
+        )
+
+    @staticmethod
+    def supports(algo) -> bool:
+        """Indique si l'algorithme expose des facteurs latents exploitables"""
+        return all(hasattr(algo, attr) for attr in ("pu", "qi", "bu", "bi", "trainset"))
+
+    @property
+    def n_users(self) -> int:
+        return self.pu.shape[0]
+
+    @property
+    def n_items(self) -> int:
+        return self.qi.shape[0]
+
+    def score_user(self, inner_uid: int) -> np.ndarray:
+        """Scores bruts (non écrêtés) de tous les items pour un utilisateur interne"""
+        scores = self.qi @ self.pu[inner_uid]
+        if self.biased:
+            scores = scores + (self.global_mean + self.bu[inner_uid]) + self.bi
+        return scores
+
+    def score_users(self, inner_uids) -> np.ndarray:
+        """Matrice des scores bruts (utilisateurs × items) en un produit matrice-matrice"""
+        scores = self.pu[inner_uids] @ self.qi.T
+        if self.biased:
+            scores += (self.global_mean + self.bu[inner_uids])[:, None] + self.bi[None, :]
+        return scores
+
+    def score_items(self, inner_uid: int, items: np.ndarray) -> np.ndarray:
+        """Scores bruts d'un sous-ensemble d'items (re-scoring exact de candidats)"""
+        scores = self.qi[items] @ self.pu[inner_uid]
+        if self.biased:
+            scores = scores + (self.global_mean + self.bu[inner_uid]) + self.bi[items]
+        return scores
+
+    def clip(self, scores: np.ndarray) -> np.ndarray:
+        """Écrête les scores à l'échelle des notes, comme Surprise"""
+        low, high = self.rating_scale
+        return np.clip(scores, low, high)
+
+    def fold_in(self, items: np.ndarray, ratings: np.ndarray, reg: float = 0.02) -> Tuple[np.ndarray, float]:
+        """
+        Facteurs (pu, bu) d'un utilisateur absent du modèle, par moindres carrés
+        régularisés contre les facteurs et biais items figés :
+        min sum (r - mu - bi - bu - qi.pu)^2 + reg * n * (|pu|^2 + bu^2)
+        (même pénalité par note que la descente de gradient de Surprise)
+        """
+        items = np.asarray(items)
+        Q = np.asarray(self.qi[items], dtype=np.float64)
+        target = np.asarray(ratings, dtype=np.float64)
+        if self.biased:
+            target = target - self.global_mean - self.bi[items]
+            Q = np.hstack([Q, np.ones((Q.shape[0], 1))])
+        A = Q.T @ Q
+        A[np.diag_indices_from(A)] += reg * Q.shape[0]
+        solution = np.linalg.solve(A, Q.T @ target)
+        if self.biased:
+            return solution[:-1].astype(self.qi.dtype), float(solution[-1])
+        return solution.astype(self.qi.dtype), 0.0
+
+    def score_vector(self, pu: np.ndarray, bu: float = 0.0) -> np.ndarray:
+        """Scores bruts de tous les items pour un vecteur utilisateur hors modèle"""
+        scores = self.qi @ pu
+        if self.biased:
+            scores = scores + (self.global_mean + bu) + self.bi
+        return scores
+
+    def top_n(self, inner_uid: int, N: int = 5, seen_items=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top N des items non vus pour un utilisateur interne.
+        seen_items : indices internes des items déjà notés (ou masque booléen)
+        """
+        return self.top_n_from_item_scores(self.score_user(inner_uid), N, seen_items)
+
+    def top_n_from_item_scores(self, scores: np.ndarray, N: int = 5,
+                               seen_items=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top N (écrêté) d'un vecteur de scores bruts de tous les items"""
+        seen_mask = None
+        if seen_items is not None:
+            seen_items = np.asarray(seen_items)
+            if seen_items.dtype == np.bool_:
+                seen_mask = seen_items
+            else:
+                seen_mask = np.zeros(self.n_items, dtype=bool)
+                seen_mask[seen_items] = True
+        items, top_scores = top_n_from_scores(scores, N, seen_mask)
+        return items, self.clip(top_scores)
+
+    def top_n_among(self, inner_uid: int, candidates: np.ndarray, N: int = 5,
+                    seen_items=None, item_scores=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top N parmi des items candidats (ex. issus d'un index approximatif).
+        item_scores : qi.pu + bi déjà calculés pour les candidats (optionnel)
+        """
+        if item_scores is None:
+            scores = self.score_items(inner_uid, candidates)
+        elif self.biased:
+            scores = item_scores + (self.global_mean + self.bu[inner_uid])
+        else:
+            scores = item_scores
+        seen_mask = np.isin(candidates, seen_items) if seen_items is not None else None
+        order, top_scores = top_n_from_scores(scores, N, seen_mask)
+        return candidates[order], self.clip(top_scores)
+
+
+class ItemKNNScorer(FactorScorer):
+    """
+    Scoring d'un modèle de voisinage item-item (k plus proches voisins par film) :
+    est(u, i) = global_mean + bu[u] + bi[i]
+                + sum_j s_ij (r_uj - b_uj) / sum_j s_ij
+    sur les voisins j de i notés par u (similarités positives, comme
+    surprise.KNNBaseline), baseline seule si moins de min_k voisins notés.
+    Les « facteurs » d'un utilisateur sont ses notes en creux (positions
+    des items notés, résidus r_uj - b_uj), calculés sans entraînement.
+    """
+
+    def __init__(self, sim_indptr, sim_indices, sim_data, rating_indptr, rating_items, rating_residuals,
+                 bu, bi, global_mean, min_k=1, user_reg=15.0, rating_scale=(0.5, 5.0)):
+        super().__init__(None, None, bu, bi, global_mean, biased=True, rating_scale=rating_scale)
+        n_items = np.asarray(bi).shape[0]
+        self.similarity = sp.csr_matrix((sim_data, sim_indices, sim_indptr), shape=(n_items, n_items))
+        # Support : nombre de voisins notés (mêmes positions, poids 1)
+        self._support = self.similarity.copy()
+        self._support.data = np.ones_like(self._support.data)
+        self._similarity_t = self.similarity.T.tocsr()
+        self._support_t = self._support.T.tocsr()
+        self.rating_indptr = rating_indptr
+        self.rating_items = rating_items
+        self.rating_residuals = rating_residuals
+        self.min_k = min_k
+        self.user_reg = user_reg
+
+    @classmethod
+    def from_arrays(cls, arrays, global_mean, neighbours, rating_scale=(0.5, 5.0)):
+        """Construit le scorer à partir des tableaux d'un export item_knn"""
+        return cls(
+            arrays["sim_indptr"], arrays["sim_indices"], arrays["sim_data"],
+            arrays["rating_indptr"], arrays["rating_items"], arrays["rating_residuals"],
+            arrays["bu"], arrays["bi"], global_mean,
+            min_k=neighbours.get("min_k", 1),
+            user_reg=neighbours.get("user_reg", 15.0),
+            rating_scale=rating_scale,
+        )
+
+    @property
+    def n_users(self) -> int:
+        return self.bu.shape[0]
+
+    @property
+    def n_items(self) -> int:
+        return self.bi.shape[0]
+
+    def _rating_rows(self, inner_uids: np.ndarray) -> Tuple[sp.csr_matrix, sp.csr_matrix]:
+        """Résidus et masque des notes des utilisateurs (utilisateurs × items, creux)"""
+        starts, ends = self.rating_indptr[inner_uids], self.rating_indptr[inner_uids + 1]
+        indptr = np.zeros(inner_uids.shape[0] + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=indptr[1:])
+        positions = np.arange(indptr[-1]) + np.repeat(starts - indptr[:-1], ends - starts)
+        shape = (inner_uids.shape[0], self.n_items)
+        items = self.rating_items[positions]
+        residuals = sp.csr_matrix((self.rating_residuals[positions], items, indptr), shape=shape)
+        mask = sp.csr_matrix((np.ones(positions.shape[0], dtype=np.float32), items, indptr), shape=shape)
+        return residuals, mask
+
+    def _neighbourhood(self, numerator, weights, support) -> np.ndarray:
+        valid = (support >= self.min_k) & (weights > 0)
+        return np.where(valid, numerator / np.where(valid, weights, 1.0), 0.0)
+
+    def score_users(self, inner_uids) -> np.ndarray:
+        """Matrice des scores bruts (utilisateurs × items) en trois produits creux"""
+        inner_uids = np.arange(self.n_users)[inner_uids]
+        residuals, mask = self._rating_rows(inner_uids)
+        scores = self._neighbourhood(
+            (residuals @ self._similarity_t).toarray(),
+            (mask @ self._similarity_t).toarray(),
+            (mask @ self._support_t).toarray()
+        )
+        scores += (self.global_mean + self.bu[inner_uids])[:, None] + self.bi[None, :]
+        return scores
+
+    def score_user(self, inner_uid: int) -> np.ndarray:
+        return self.score_users(np.array([inner_uid]))[0]
+
+    def score_items(self, inner_uid: int, items: np.ndarray) -> np.ndarray:
+        return self.score_user(inner_uid)[items]
+
+    def fold_in(self, items: np.ndarray, ratings: np.ndarray,
+                reg: float = 0.02) -> Tuple[Tuple[np.ndarray, np.ndarray], float]:
+        """
+        Profil d'un utilisateur absent du modèle : biais par moyenne régularisée
+        (user_reg, comme les baselines de l'entraînement ; reg est ignoré),
+        puis résidus de ses notes, gardés en creux (items notés, résidus)
+        """
+        items = np.asarray(items)
+        deviations = np.asarray(ratings, dtype=np.float64) - self.global_mean - self.bi[items]
+        bu = float(deviations.sum() / (self.user_reg + items.shape[0]))
+        return (items.astype(np.int32), (deviations - bu).astype(np.float32)), bu
+
+    def score_vector(self, pu: Tuple[np.ndarray, np.ndarray], bu: float = 0.0) -> np.ndarray:
+        """Scores bruts de tous les items pour un profil creux issu de fold_in"""
+        items, residuals = pu
+        # Colonnes des items notés uniquement (lignes de la transposée)
+        similarity, support = self._similarity_t[items], self._support_t[items]
+        scores = self._neighbourhood(
+            similarity.T @ residuals,
+            np.asarray(similarity.sum(axis=0)).ravel(),
+            np.asarray(support.sum(axis=0)).ravel()
+        )
+        return scores + (self.global_mean + bu) + self.bi
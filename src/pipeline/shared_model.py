@@ -0,0 +1,102 @@
+"""
+Segment mémoire partagé entre les workers de l'API
+- La première instance publie la version du modèle dans un dossier en
+  mémoire (tmpfs, /dev/shm), sous verrou de fichier
+- Les autres workers mappent les mêmes fichiers .npy en lecture seule :
+  facteurs, identifiants et index des films vus ne sont présents qu'une
+  fois en RAM, quel que soit le nombre de workers
+"""
+import os
+import fcntl
+import shutil
+import logging
+import joblib
+import pandas as pd
+from contextlib import contextmanager
+from typing import Optional
+from pipeline.scoring import FactorScorer
+from pipeline.model_store import MANIFEST_FILENAME, export_surprise_model
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILENAME = ".publish.lock"
+
+
+@contextmanager
+def _publish_lock(shared_dir: str):
+    """Verrou exclusif entre processus (un seul worker publie une version)"""
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(os.path.join(shared_dir, LOCK_FILENAME), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _is_published(version_dir: str) -> bool:
+    return os.path.exists(os.path.join(version_dir, MANIFEST_FILENAME))
+
+
+def _prune(shared_dir: str, keep_versions: int, current: str):
+    """
+    Supprime les versions les plus anciennes. Les workers qui les mappent
+    encore gardent leurs pages jusqu'à la fin du mapping (sémantique unlink).
+    """
+    versions = [
+        name for name in os.listdir(shared_dir)
+        if not name.startswith(".") and name != current
+        and os.path.isdir(os.path.join(shared_dir, name))
+    ]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(shared_dir, name)))
+    for name in versions[:max(len(versions) - (keep_versions - 1), 0)]:
+        shutil.rmtree(os.path.join(shared_dir, name), ignore_errors=True)
+        logger.info(f"Version {name} retirée du segment partagé")
+
+
+def publish_version(version_dir: str, shared_dir: str, keep_versions: int = 2) -> str:
+    """
+    Copie un dossier de version exporté dans le segment partagé (une seule fois
+    pour tous les workers) et retourne le chemin à mapper.
+    """
+    version = os.path.basename(os.path.normpath(version_dir))
+    target = os.path.join(shared_dir, version)
+    if _is_published(target):
+        return target
+    with _publish_lock(shared_dir):
+        if not _is_published(target):
+            tmp_dir = os.path.join(shared_dir, f".{version}.tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            shutil.copytree(version_dir, tmp_dir)
+            os.rename(tmp_dir, target)
+            logger.info(f"Version {version} publiée dans le segment partagé {shared_dir}")
+            _prune(shared_dir, keep_versions, version)
+    return target
+
+
+def publish_surprise_pickle(model_path: str, shared_dir: str, version: str,
+                            keep_versions: int = 2) -> Optional[str]:
+    """
+    Convertit un pickle Surprise à facteurs au format de serving, directement
+    dans le segment partagé ; seul le worker qui publie charge le pickle.
+    Retourne None si le modèle n'expose pas de facteurs (KNN, baseline).
+    """
+    target = os.path.join(shared_dir, version)
+    if _is_published(target):
+        return target
+    with _publish_lock(shared_dir):
+        if not _is_published(target):
+            algo = joblib.load(model_path)
+            if not FactorScorer.supports(algo):
+                return None
+            trainset = algo.trainset
+            history = pd.DataFrame(
+                [(trainset.to_raw_uid(u), trainset.to_raw_iid(i)) for u, i, _ in trainset.all_ratings()],
+                columns=["user_id", "movie_id"]
+            )
+            export_surprise_model(
+                algo, shared_dir, metadata={"source": model_path},
+                seen_ratings=history, version=version, set_current=False
+            )
+            _prune(shared_dir, keep_versions, version)
+    return target
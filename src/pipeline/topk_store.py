@@ -0,0 +1,61 @@
+"""
+Store des top-K recommandations précalculées par utilisateur
+- Calculé après l'entraînement, par blocs d'utilisateurs (produit matrice-matrice)
+- Tableaux à largeur fixe (n_users × K) indexés par utilisateur interne,
+  enregistrés en .npy avec le modèle et lus en mmap
+"""
+import numpy as np
+from typing import Optional, Tuple
+from pipeline.scoring import FactorScorer, top_n_from_score_matrix, mask_seen_rows
+
+
+def materialize_topk(
+    scorer: FactorScorer,
+    K: int,
+    seen_indptr: Optional[np.ndarray] = None,
+    seen_indices: Optional[np.ndarray] = None,
+    chunk_size: int = 512
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calcule le top K des items non vus pour tous les utilisateurs.
+    Retourne (items int32, scores float32) de forme (n_users, K) ; les cases
+    sans item (catalogue non vu < K) valent -1 / NaN.
+    """
+    n_users, n_items = scorer.n_users, scorer.n_items
+    K = min(K, n_items)
+    top_items = np.full((n_users, K), -1, dtype=np.int32)
+    top_scores = np.full((n_users, K), np.nan, dtype=np.float32)
+
+    for start in range(0, n_users, chunk_size):
+        end = min(start + chunk_size, n_users)
+        scores = scorer.score_users(slice(start, end))
+        if seen_indptr is not None:
+            mask_seen_rows(scores, seen_indptr, seen_indices, np.arange(start, end))
+
+        items, chunk_scores = top_n_from_score_matrix(scores, K)
+        valid = items >= 0
+        top_items[start:end] = items
+        top_scores[start:end] = np.where(valid, scorer.clip(chunk_scores), np.nan)
+
+    return top_items, top_scores
+
+
+class TopKStore:
+    """Lecture du store top-K d'une version de modèle"""
+
+    def __init__(self, items: np.ndarray, scores: np.ndarray, model_version: str):
+        self.items = items
+        self.scores = scores
+        self.model_version = model_version
+
+    @property
+    def k(self) -> int:
+        return self.items.shape[1]
+
+    def lookup(self, inner_uid: int, N: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Top N précalculé (None si N dépasse K : scoring en direct nécessaire)"""
+        if N > self.k:
+            return None
+        items = self.items[inner_uid, :N]
+        valid = items >= 0
+        return items[valid], self.scores[inner_uid, :N][valid]
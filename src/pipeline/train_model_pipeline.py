@@ -1,84 +1,133 @@
 import pandas as pd
 import mlflow
 import mlflow.sklearn
-from surprise import Dataset, Reader, SVD, KNNBasic, NormalPredictor
-from surprise.model_selection import cross_validate
+from surprise import Dataset, Reader, SVD, NormalPredictor
 import joblib
 import os
+import time
+from functools import partial
 from src.pipeline.data_loader import load_filtered_ratings
+from pipeline.scoring import FactorScorer
+from pipeline.model_store import export_surprise_model, clear_current
+from pipeline.cv_scheduler import run_cross_validation
+from pipeline.mf_engine import BiasedALS
+from pipeline.knn_engine import ItemKNN
+from pipeline.incremental_training import train_incremental_mlflow
+from pipeline.ratings_snapshot import RatingsSnapshot
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Moteurs entraînés sur tableaux, avec leur propre export de serving
+NATIVE_ENGINES = (BiasedALS, ItemKNN)
 
-def train_model_mlflow(force=False):
+
+def train_model_mlflow(force=False, incremental=False):
     from api.endpoints.training import training_status
     
+    if incremental:
+        # Mise à jour du modèle exporté sur les seules nouvelles notes si possible
+        training_status["progress"] = "Entraînement incrémental..."
+        run_id = train_incremental_mlflow(force=force)
+        if run_id is not None:
+            return run_id
+        logger.info("Entraînement incrémental impossible, entraînement complet")
+    
     mlflow.set_tracking_uri(os.getenv('MLFLOW_TRACKING_URI'))
     mlflow.set_experiment("Film_Recommendation_Experiment")
 
     sample_size = 100000 
-    knn_sample_size = 20000
     train_sample_size = 200000
-    min_ratings_user = 50
-    min_ratings_movie = 100
+    from pipeline.config import load_config
+    config = load_config()
+    # Filtre d'activité partagé avec l'entraînement incrémental
+    min_ratings_user = config["model"].get("min_ratings_user", 50)
+    min_ratings_movie = config["model"].get("min_ratings_movie", 100)
     
     training_status["progress"] = "Chargement des données..."
     ratings_df = load_filtered_ratings(min_ratings_user=min_ratings_user, min_ratings_movie=min_ratings_movie)
+    watermark = RatingsSnapshot.from_config().watermark
+    ratings_watermark = (
+        {"max_timestamp": watermark[0], "row_count": watermark[1]} if watermark is not None else None
+    )
 
-    from pipeline.config import load_config
-    config = load_config()
     model_dir = config["model"]["model_dir"]
     model_filename = config["model"]["model_filename"]
     model_path = os.path.join(model_dir, model_filename)
     
     available_rows = len(ratings_df)
     actual_sample_size = min(sample_size, available_rows)
-    actual_knn_sample_size = min(knn_sample_size, available_rows)
     actual_train_sample_size = min(train_sample_size, available_rows)
     
     reader = Reader(rating_scale=(0.5, 5))
     
     df_sample = ratings_df.sample(n=actual_sample_size)
-    df_surprise_sample = Dataset.load_from_df(df_sample[['user_id','movie_id','rating']], reader)
-    
-    df_knn_sample = ratings_df.sample(n=actual_knn_sample_size)
-    df_surprise_knn = Dataset.load_from_df(df_knn_sample[['user_id','movie_id','rating']], reader)
 
     with mlflow.start_run() as run:
         run_id = run.info.run_id
         logger.info(f"MLflow run démarrée: {run_id}")
         
         mlflow.log_param("original_sample_size", sample_size)
-        mlflow.log_param("original_knn_sample_size", knn_sample_size)
         mlflow.log_param("original_train_sample_size", train_sample_size)
         mlflow.log_param("actual_sample_size", actual_sample_size)
-        mlflow.log_param("actual_knn_sample_size", actual_knn_sample_size)
         mlflow.log_param("actual_train_sample_size", actual_train_sample_size)
         mlflow.log_param("available_rows_after_filter", available_rows)
         mlflow.log_param("min_ratings_user", min_ratings_user)
         mlflow.log_param("min_ratings_movie", min_ratings_movie)
         mlflow.log_param("force_training", force)
 
-        training_status["progress"] = "Entraînement SVD..."
-        model_svd = SVD()
-        cv_svd = cross_validate(model_svd, df_surprise_sample, measures=['RMSE', 'MAE'], cv=3, verbose=True)
-        mean_rmse_svd = cv_svd['test_rmse'].mean()
-        mlflow.log_metric("svd_rmse", mean_rmse_svd)
+        # Tous les couples (algorithme, fold) en parallèle, échantillons partagés en mmap
+        cv_config = config["model"].get("cv", {})
+        n_folds = cv_config.get("folds", 3)
+        als_config = dict(config["model"].get("als", {}))
+        als_budget = als_config.pop("time_budget_seconds", None)
+        # Parallélisme porté par le pool de processus pendant la validation croisée
+        als_cv_params = dict(als_config, n_threads=1 if cv_config.get("n_workers") != 1 else als_config.get("n_threads"))
+        knn_config = config["model"].get("knn", {})
+        candidates = [
+            ("ItemKNN", "sample", knn_config),
+            ("ALS", "sample", als_cv_params),
+            ("SVD", "sample", {}),
+            ("NormalPredictor", "sample", {}),
+        ]
+        n_tasks = len(candidates) * n_folds
+        mlflow.log_param("cv_folds", n_folds)
+        mlflow.log_param("cv_workers", min(cv_config.get("n_workers") or os.cpu_count() or 1, n_tasks))
+        training_status["progress"] = f"Validation croisée (0/{n_tasks} tâches)..."
+        done = []
 
-        training_status["progress"] = "Entraînement KNNBasic..."
-        model_knn = KNNBasic()
-        cv_knn = cross_validate(model_knn, df_surprise_knn, measures=['RMSE', 'MAE'], cv=3, verbose=True)
-        mean_rmse_knn = cv_knn['test_rmse'].mean()
-        mlflow.log_metric("knn_rmse", mean_rmse_knn)
+        def log_task(result):
+            # Durées par tâche, un pas par fold
+            done.append(result)
+            name, fold = result["algorithm"].lower(), result["fold"]
+            mlflow.log_metric(f"cv_{name}_rmse", result["rmse"], step=fold)
+            mlflow.log_metric(f"cv_{name}_fit_seconds", result["fit_time"], step=fold)
+            mlflow.log_metric(f"cv_{name}_test_seconds", result["test_time"], step=fold)
+            mlflow.log_metric(f"cv_{name}_task_seconds", result["task_time"], step=fold)
+            training_status["progress"] = f"Validation croisée ({len(done)}/{n_tasks} tâches)..."
+
+        cv_start = time.perf_counter()
+        cv_results, _ = run_cross_validation(
+            {"sample": df_sample},
+            candidates,
+            n_folds=n_folds,
+            n_workers=cv_config.get("n_workers"),
+            start_method=cv_config.get("start_method", "spawn"),
+            shared_dir=cv_config.get("shared_dir"),
+            on_task_done=log_task
+        )
+        mlflow.log_metric("cv_wall_seconds", time.perf_counter() - cv_start)
 
-        training_status["progress"] = "Entraînement NormalPredictor..."
-        model_dummy = NormalPredictor()
-        cv_dummy = cross_validate(model_dummy, df_surprise_sample, measures=['RMSE', 'MAE'], cv=3, verbose=True)
-        mean_rmse_dummy = cv_dummy['test_rmse'].mean()
+        mean_rmse_svd = cv_results["SVD"]['test_rmse'].mean()
+        mlflow.log_metric("svd_rmse", mean_rmse_svd)
+        mean_rmse_knn = cv_results["ItemKNN"]['test_rmse'].mean()
+        mlflow.log_metric("knn_rmse", mean_rmse_knn)
+        mean_rmse_dummy = cv_results["NormalPredictor"]['test_rmse'].mean()
         mlflow.log_metric("dummy_rmse", mean_rmse_dummy)
+        mean_rmse_als = cv_results["ALS"]['test_rmse'].mean()
+        mlflow.log_metric("als_rmse", mean_rmse_als)
 
-        best_rmse = min(mean_rmse_svd, mean_rmse_knn, mean_rmse_dummy)
+        best_rmse = min(mean_rmse_svd, mean_rmse_knn, mean_rmse_dummy, mean_rmse_als)
         
         client = mlflow.tracking.MlflowClient()
         experiment_id = client.get_experiment_by_name("Film_Recommendation_Experiment").experiment_id
@@ -102,25 +151,60 @@ def train_model_mlflow(force=False):
         mlflow.log_param("is_best_model", is_best_model)
 
         if is_best_model or not model_exists or force:
-            if best_rmse == mean_rmse_svd:
+            if best_rmse == mean_rmse_als:
+                best_algo = BiasedALS(time_budget_seconds=als_budget, **als_config)
+                best_algo_name = "ALS"
+            elif best_rmse == mean_rmse_svd:
                 best_algo = SVD()
                 best_algo_name = "SVD"
             elif best_rmse == mean_rmse_knn:
-                best_algo = KNNBasic()
-                best_algo_name = "KNNBasic"
+                best_algo = ItemKNN(**knn_config)
+                best_algo_name = "ItemKNN"
             else:
                 best_algo = NormalPredictor()
                 best_algo_name = "NormalPredictor"
             
             mlflow.log_param("best_algorithm", best_algo_name)
             
-            train_df = ratings_df.sample(n=actual_train_sample_size)
-            train_set = Dataset.load_from_df(train_df[['user_id','movie_id','rating']], reader).build_full_trainset()
-            best_algo.fit(train_set)
+            if isinstance(best_algo, NATIVE_ENGINES):
+                # Moteurs NumPy : toutes les notes filtrées (ALS dans son budget de temps)
+                training_status["progress"] = f"Entraînement {best_algo_name} sur toutes les notes..."
+                best_algo.fit(ratings_df["user_id"].to_numpy(), ratings_df["movie_id"].to_numpy(),
+                              ratings_df["rating"].to_numpy())
+                mlflow.log_param("final_train_rows", available_rows)
+                mlflow.log_metric(f"{best_algo_name.lower()}_fit_seconds", best_algo.fit_seconds)
+                if isinstance(best_algo, BiasedALS):
+                    mlflow.log_param("als_iterations", len(best_algo.iteration_seconds))
+            else:
+                train_df = ratings_df.sample(n=actual_train_sample_size)
+                train_set = Dataset.load_from_df(train_df[['user_id','movie_id','rating']], reader).build_full_trainset()
+                best_algo.fit(train_set)
             
             os.makedirs(os.path.dirname(model_path), exist_ok=True)
             joblib.dump(best_algo, model_path)
             mlflow.log_artifact(model_path)
+
+            # Export compact pour le serving (facteurs + identifiants en .npy)
+            if FactorScorer.supports(best_algo) or isinstance(best_algo, NATIVE_ENGINES):
+                training_status["progress"] = "Export du modèle pour le serving..."
+                export = best_algo.export if isinstance(best_algo, NATIVE_ENGINES) else partial(export_surprise_model, best_algo)
+                version_dir = export(
+                    config["serving"]["export_dir"],
+                    metadata={
+                        "run_id": run_id,
+                        "best_rmse": float(best_rmse),
+                        # Point de départ du prochain entraînement incrémental
+                        "ratings_watermark": ratings_watermark,
+                    },
+                    seen_ratings=ratings_df,
+                    ann=config["serving"].get("ann"),
+                    topk=config["serving"].get("topk")
+                )
+                mlflow.log_param("serving_version", os.path.basename(version_dir))
+                mlflow.log_artifacts(version_dir, artifact_path="serving")
+            else:
+                # Modèle sans facteurs : le serving utilise le pickle
+                clear_current(config["serving"]["export_dir"])
             
             mlflow.sklearn.log_model(
                 sk_model=best_algo,
@@ -0,0 +1,82 @@
+"""
+Fixtures partagées des tests : notes synthétiques et modèles de factorisation exportés
+"""
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.model_store import export_factor_model
+
+
+def build_ratings(n_users=200, n_movies=60, n_rows=4000, n_factors=3, factor_std=0.6, bias_std=0.0,
+                  noise=0.4, zipf=None, half_stars=True, unique=True, seed=0, with_truth=False):
+    """
+    Notes synthétiques 3.5 + bu + bi + qi . pu + bruit, écrêtées à [0.5, 5]
+    (identifiants à partir de 1). zipf : popularité des films en loi de Zipf.
+    half_stars : arrondi à la demi-étoile ; unique : un seul couple (user, movie).
+    with_truth : retourne aussi les facteurs et biais générateurs.
+    """
+    rng = np.random.default_rng(seed)
+    truth = {
+        "pu": rng.normal(0, factor_std, size=(n_users, n_factors)),
+        "qi": rng.normal(0, factor_std, size=(n_movies, n_factors)),
+        "bu": rng.normal(0, bias_std, size=n_users),
+        "bi": rng.normal(0, bias_std, size=n_movies),
+    }
+    users = rng.integers(0, n_users, size=n_rows)
+    if zipf:
+        movies = np.minimum(rng.zipf(zipf, size=n_rows) - 1, n_movies - 1)
+    else:
+        movies = rng.integers(0, n_movies, size=n_rows)
+    ratings = (3.5 + truth["bu"][users] + truth["bi"][movies]
+               + np.einsum("ij,ij->i", truth["pu"][users], truth["qi"][movies])
+               + rng.normal(0, noise, size=n_rows))
+    if half_stars:
+        ratings = np.round(ratings * 2) / 2
+    df = pd.DataFrame({
+        "user_id": users + 1,
+        "movie_id": movies + 1,
+        "rating": np.clip(ratings, 0.5, 5.0),
+    })
+    if unique:
+        df = df.drop_duplicates(["user_id", "movie_id"])
+    return (df, truth) if with_truth else df
+
+
+def build_factor_model(export_dir, version="v1", n_users=20, n_items=50, n_factors=4, factor_std=1.0,
+                       bias_std=1.0, first_item_id=1, seed=0, **kwargs):
+    """
+    Exporte un modèle de factorisation aléatoire (utilisateurs 1..n_users,
+    films first_item_id..) et retourne le dossier de la version.
+    kwargs : options de export_factor_model (seen_ratings, topk, ann...)
+    """
+    rng = np.random.default_rng(seed)
+    return export_factor_model(
+        str(export_dir),
+        pu=rng.normal(0, factor_std, size=(n_users, n_factors)),
+        qi=rng.normal(0, factor_std, size=(n_items, n_factors)),
+        bu=rng.normal(0, bias_std, size=n_users),
+        bi=rng.normal(0, bias_std, size=n_items),
+        global_mean=3.5,
+        user_ids=np.arange(1, n_users + 1),
+        item_ids=np.arange(first_item_id, first_item_id + n_items),
+        version=version,
+        **kwargs
+    )
+
+
+@pytest.fixture(scope="session")
+def make_ratings():
+    """Générateur de notes synthétiques (voir build_ratings)"""
+    return build_ratings
+
+
+@pytest.fixture(scope="session")
+def make_factor_model():
+    """Export de modèles de factorisation aléatoires (voir build_factor_model)"""
+    return build_factor_model
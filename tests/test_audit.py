@@ -0,0 +1,52 @@
+"""
+Tests pour l'audit asynchrone des prédictions
+"""
+import pytest
+import sys
+import os
+import json
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api.audit import AuditSink
+
+
+def read_segments(output_dir):
+    records = []
+    for name in sorted(os.listdir(output_dir)):
+        with open(os.path.join(output_dir, name)) as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+def test_audit_flush_by_batch_and_on_stop(tmp_path):
+    """Les enregistrements sont groupés en segments et tous écrits à l'arrêt"""
+    uploaded = []
+    sink = AuditSink(
+        str(tmp_path), flush_interval=3600, flush_max_records=10,
+        uploader=lambda path, n: uploaded.append((path, n))
+    )
+    sink.start()
+    for user_id in range(25):
+        assert sink.submit({"user_id": user_id, "method": "collaborative_filtering"})
+    sink.stop()
+
+    records = read_segments(tmp_path)
+    assert sorted(r["user_id"] for r in records) == list(range(25))
+    assert all("timestamp" in r for r in records)
+    # Un artefact par segment, pas un par prédiction
+    assert len(uploaded) == len(os.listdir(tmp_path)) < 25
+    assert sum(n for _, n in uploaded) == 25
+
+
+def test_audit_drops_when_queue_full(tmp_path):
+    """File pleine : la requête n'attend pas, l'enregistrement est abandonné"""
+    sink = AuditSink(str(tmp_path), max_queue_size=2)
+    assert sink.submit({"user_id": 1})
+    assert sink.submit({"user_id": 2})
+    assert not sink.submit({"user_id": 3})
+
+    sink.start()
+    sink.stop()
+    assert [r["user_id"] for r in read_segments(tmp_path)] == [1, 2]
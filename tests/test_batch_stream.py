@@ -0,0 +1,61 @@
+"""
+Tests pour les prédictions batch en streaming
+"""
+import pytest
+import sys
+import os
+import io
+import json
+import asyncio
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.catalog import MovieCatalog
+from pipeline.model_store import load_model_artifact
+from api.model_registry import ModelSnapshot
+from api.batch_stream import iter_batch_recommendations, encode_ndjson, ArrowStreamEncoder
+
+
+@pytest.fixture
+def snapshot(tmp_path, make_factor_model):
+    version_dir = make_factor_model(tmp_path / "serving", n_users=30, n_items=40)
+    catalog = MovieCatalog.from_frames(
+        pd.DataFrame({"movie_id": np.arange(1, 41), "title": [f"Film {i}" for i in range(1, 41)]})
+    )
+    return ModelSnapshot("v1", load_model_artifact(version_dir), None, catalog, "directory", 0.0)
+
+
+def collect(snapshot, user_ids, N, chunk_size):
+    async def run():
+        return [chunk async for chunk in iter_batch_recommendations(snapshot, user_ids, N, chunk_size)]
+    return asyncio.run(run())
+
+
+def test_batch_stream_chunks_match_single_user(snapshot):
+    """Blocs de taille bornée, même top N que le scoring utilisateur par utilisateur"""
+    user_ids = list(range(1, 31))
+    chunks = collect(snapshot, user_ids, 5, chunk_size=8)
+    assert [len(c) for c in chunks] == [8, 8, 8, 6]
+
+    lines = b"".join(encode_ndjson(c) for c in chunks).decode().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [r["user_id"] for r in records] == user_ids
+    for record in records:
+        expected = snapshot.model.top_n(record["user_id"], N=5)
+        assert [r["movie_id"] for r in record["recommendations"]] == [m for m, _ in expected]
+        assert record["method"] == "collaborative_filtering"
+
+
+def test_batch_stream_arrow_ipc(snapshot):
+    encoder = ArrowStreamEncoder()
+    chunks = collect(snapshot, [1, 2, 3], 4, chunk_size=2)
+    payload = b"".join(encoder.encode(c) for c in chunks) + encoder.close()
+
+    table = pa.ipc.open_stream(io.BytesIO(payload)).read_all()
+    assert table.column("user_id").to_pylist() == [1, 2, 3]
+    assert all(len(ids) == 4 for ids in table.column("movie_ids").to_pylist())
+    assert table.column("titles").to_pylist()[0][0].startswith("Film ")
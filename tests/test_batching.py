@@ -0,0 +1,58 @@
+"""
+Tests pour le micro-batching des requêtes de prédiction
+"""
+import pytest
+import sys
+import os
+import asyncio
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api.batching import MicroBatcher
+
+
+def make_batcher(calls, **kwargs):
+    async def score_batch(model, user_ids, Ns):
+        calls.append((model, list(user_ids)))
+        return [[(user_id, float(N))] for user_id, N in zip(user_ids, Ns)]
+    return MicroBatcher(score_batch=score_batch, **kwargs)
+
+
+def test_concurrent_requests_are_coalesced():
+    """Les requêtes d'une même fenêtre sont scorées en un seul lot"""
+    calls = []
+    batcher = make_batcher(calls, window_ms=20, max_batch_size=64)
+
+    async def run():
+        return await asyncio.gather(*[batcher.submit("v1", user_id, 5) for user_id in range(10)])
+
+    results = asyncio.run(run())
+    assert calls == [("v1", list(range(10)))]
+    assert results == [[(user_id, 5.0)] for user_id in range(10)]
+
+
+def test_batch_size_limit_and_model_versions():
+    """Un lot plein part immédiatement ; deux versions de modèle ne sont pas mélangées"""
+    calls = []
+    batcher = make_batcher(calls, window_ms=1000, max_batch_size=4)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(
+            *[batcher.submit("v1" if user_id < 2 else "v2", user_id, 3) for user_id in range(4)]
+        ), timeout=0.5)
+
+    results = asyncio.run(run())
+    assert sorted(calls) == [("v1", [0, 1]), ("v2", [2, 3])]
+    assert [r[0][0] for r in results] == [0, 1, 2, 3]
+
+
+def test_scoring_error_propagates_to_callers():
+    async def failing(model, user_ids, Ns):
+        raise ValueError("boom")
+    batcher = MicroBatcher(score_batch=failing, window_ms=1)
+
+    async def run():
+        return await asyncio.gather(batcher.submit("v1", 1, 5), return_exceptions=True)
+
+    assert isinstance(asyncio.run(run())[0], ValueError)
@@ -0,0 +1,46 @@
+"""
+Tests pour le catalogue des films en mémoire
+"""
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.catalog import MovieCatalog
+
+
+@pytest.fixture
+def catalog():
+    movies_df = pd.DataFrame({
+        "movie_id": [30, 10, 20],
+        "title": ["Heat (1995)", "Toy Story (1995)", "Jumanji (1995)"],
+        "release_year": [1995, 1995, None],
+    })
+    genres_df = pd.DataFrame({
+        "movie_id": [10, 10, 20, 30, 99],
+        "name": ["Animation", "Comedy", "Adventure", "Action", "Drama"],
+    })
+    return MovieCatalog.from_frames(movies_df, genres_df)
+
+
+def test_catalog_arrays_sorted_and_immutable(catalog):
+    assert catalog.movie_ids.tolist() == [10, 20, 30]
+    assert catalog.years.tolist() == [1995, 0, 1995]
+    assert len(catalog) == 3
+    with pytest.raises(ValueError):
+        catalog.titles[0] = "autre"
+
+
+def test_catalog_attach_and_genres(catalog):
+    """attach conserve l'ordre, ajoute titre et movie_id, ignore les films inconnus"""
+    attached = catalog.attach([(30, 4.5), (999, 4.0), (10, 3.5)])
+    assert attached == [("Heat (1995)", 4.5, 30), ("Toy Story (1995)", 3.5, 10)]
+    assert catalog.title(20) == "Jumanji (1995)"
+    assert catalog.title(999) is None
+    assert catalog.genres_of(10) == ["Animation", "Comedy"]
+    assert catalog.has_any_genre(["Comedy", "Action"]).tolist() == [True, False, True]
+    assert catalog.has_any_genre(["Inconnu"]).tolist() == [False, False, False]
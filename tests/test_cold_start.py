@@ -21,7 +21,7 @@ def test_get_popular_movies():
     movies = get_popular_movies(N=5)
     assert len(movies) <= 5
     assert all(isinstance(movie, tuple) for movie in movies)
-    assert all(len(movie) == 2 for movie in movies)  # (title, score)
+    assert all(len(movie) == 3 for movie in movies)  # (title, score, movie_id)
     assert all(isinstance(movie[1], (int, float)) for movie in movies)
 
 
@@ -31,6 +31,6 @@ def test_get_cold_start_recommendations():
     recommendations = get_cold_start_recommendations(user_id=999999999, N=5)
     assert len(recommendations) <= 5
     assert all(isinstance(rec, tuple) for rec in recommendations)
-    assert all(len(rec) == 2 for rec in recommendations)
+    assert all(len(rec) == 3 for rec in recommendations)
     assert all(isinstance(rec[1], (int, float)) for rec in recommendations)
 
@@ -0,0 +1,79 @@
+"""
+Tests du moteur par contenu (genome float16 en mmap)
+"""
+import sys
+import os
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.content_model import build_genome_vectors, export_genome, load_current_genome
+
+
+def make_genome(n_movies=40, n_tags=12, seed=0):
+    rng = np.random.default_rng(seed)
+    movie_ids = rng.choice(np.arange(1, 1000), size=n_movies, replace=False)
+    tag_ids = np.arange(1, n_tags + 1)
+    relevance = rng.random((n_movies, n_tags)).astype(np.float32)
+    rows = np.repeat(movie_ids, n_tags)
+    cols = np.tile(tag_ids, n_movies)
+    return movie_ids, relevance, (rows, cols, relevance.ravel())
+
+
+def test_build_normalizes_rows_in_float16():
+    movie_ids, relevance, triplets = make_genome()
+    arrays = build_genome_vectors(*triplets)
+    assert arrays["vectors"].dtype == np.float16
+    assert np.all(np.diff(arrays["movie_ids"]) > 0)
+    norms = np.linalg.norm(arrays["vectors"].astype(np.float32), axis=1)
+    assert np.allclose(norms, 1.0, atol=1e-3)
+    # Ligne du film = vecteur de pertinence normalisé
+    row = np.searchsorted(arrays["movie_ids"], movie_ids[0])
+    expected = relevance[0] / np.linalg.norm(relevance[0])
+    assert np.allclose(arrays["vectors"][row], expected, atol=1e-3)
+
+
+def test_similar_movies_match_brute_force(tmp_path):
+    _, _, triplets = make_genome()
+    export_genome(str(tmp_path), build_genome_vectors(*triplets), neighbors=3, version="v1")
+    genome = load_current_genome(str(tmp_path))
+    assert isinstance(genome.vectors, np.memmap)
+    assert genome.neighbor_rows.shape == (40, 3)
+    genome.block_size = 7  # plusieurs blocs de films
+
+    vectors = genome.vectors.astype(np.float32)
+    query = int(genome.movie_ids[3])
+    cosines = vectors @ vectors[3]
+    cosines[3] = -np.inf
+    expected = genome.movie_ids[np.argsort(-cosines, kind="stable")[:5]]
+    # N > K : produit par blocs ; N <= K : voisins précalculés
+    similar = genome.similar_movies(query, N=5)
+    assert [movie_id for movie_id, _ in similar] == list(expected)
+    assert query not in [movie_id for movie_id, _ in similar]
+    precomputed = genome.similar_movies(query, N=3)
+    assert [movie_id for movie_id, _ in precomputed] == list(expected[:3])
+    assert np.allclose([score for _, score in precomputed], [score for _, score in similar[:3]])
+    assert genome.similar_movies_batch([query, -1], N=5)[1] == []
+
+
+def test_users_for_movie_ranks_by_mean_similarity(tmp_path):
+    _, _, triplets = make_genome()
+    export_genome(str(tmp_path), build_genome_vectors(*triplets), version="v1")
+    genome = load_current_genome(str(tmp_path))
+    vectors = genome.vectors.astype(np.float32)
+
+    # Modèle de serving : 4 items (dont un sans genome), 3 utilisateurs
+    item_ids = np.array([genome.movie_ids[0], genome.movie_ids[1], genome.movie_ids[2], 5000])
+    user_ids = np.array([10, 20, 30])
+    seen_indptr = np.array([0, 2, 2, 4])
+    seen_indices = np.array([0, 1, 2, 3])
+
+    new_movie = int(genome.movie_ids[10])
+    users = genome.users_for_movie(new_movie, user_ids, item_ids, seen_indptr, seen_indices, N=5)
+    sims = vectors[[0, 1, 2]] @ vectors[10]
+    expected = {10: (sims[0] + sims[1]) / 2, 30: sims[2] / 2}
+    # Utilisateur 20 sans historique : exclu
+    assert [user_id for user_id, _ in users] == sorted(expected, key=expected.get, reverse=True)
+    for user_id, score in users:
+        assert np.isclose(score, expected[user_id], atol=1e-5)
@@ -0,0 +1,36 @@
+"""
+Tests de la validation croisée parallèle des modèles candidats
+"""
+import sys
+import os
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.cv_scheduler import fold_indices, run_cross_validation
+
+
+def test_folds_partition_rows():
+    folds = fold_indices(1000, 3, seed=4)
+    assert sum(fold.shape[0] for fold in folds) == 1000
+    np.testing.assert_array_equal(np.sort(np.concatenate(folds)), np.arange(1000))
+
+
+def test_process_pool_matches_sequential(tmp_path, make_ratings):
+    ratings = make_ratings(n_users=100, n_movies=80, n_rows=3000)
+    candidates = [("SVD", "sample", {"random_state": 0, "n_epochs": 5})]
+    kwargs = dict(n_folds=3, seed=1, shared_dir=str(tmp_path))
+
+    sequential, _ = run_cross_validation({"sample": ratings}, candidates, n_workers=1, **kwargs)
+    done = []
+    parallel, results = run_cross_validation(
+        {"sample": ratings}, candidates, n_workers=2, on_task_done=done.append, **kwargs
+    )
+
+    np.testing.assert_allclose(parallel["SVD"]["test_rmse"], sequential["SVD"]["test_rmse"])
+    assert len(done) == len(results) == 3
+    assert sorted(r["fold"] for r in results) == [0, 1, 2]
+    assert all(r["n_train"] + r["n_test"] == len(ratings) for r in results)
+    # Tableaux partagés supprimés en fin de validation
+    assert os.listdir(tmp_path) == []
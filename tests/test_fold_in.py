@@ -0,0 +1,70 @@
+"""
+Tests du fold-in des utilisateurs absents du modèle
+"""
+import pytest
+import sys
+import os
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.scoring import FactorScorer
+from pipeline.model_store import load_model_artifact
+from api.fold_in import FoldInEngine
+
+
+@pytest.fixture
+def model(tmp_path, make_factor_model):
+    return load_model_artifact(make_factor_model(
+        tmp_path, n_users=30, n_items=200, n_factors=8, factor_std=0.3, bias_std=0.2, first_item_id=100
+    ))
+
+
+def test_fold_in_recovers_user_factors(model):
+    scorer = model.scorer
+    rng = np.random.default_rng(1)
+    true_pu = rng.normal(0, 0.3, size=scorer.qi.shape[1]).astype(np.float32)
+    items = rng.choice(scorer.n_items, size=80, replace=False)
+    ratings = scorer.score_vector(true_pu, 0.25)[items]
+
+    pu, bu = scorer.fold_in(items, ratings, reg=1e-6)
+    assert np.allclose(pu, true_pu, atol=1e-3)
+    assert np.isclose(bu, 0.25, atol=1e-3)
+
+    # Régularisation : le vecteur rétrécit vers 0
+    pu_reg, _ = scorer.fold_in(items, ratings, reg=1.0)
+    assert np.linalg.norm(pu_reg) < np.linalg.norm(pu)
+
+
+def test_engine_scores_unseen_items_and_caches_vector(model):
+    calls = []
+
+    def ratings_loader(user_id):
+        calls.append(user_id)
+        return np.array([100, 101, 102, 103, 9999]), np.array([5.0, 4.5, 1.0, 2.0, 3.0])
+
+    engine = FoldInEngine(max_entries=2, min_ratings=3, ratings_loader=ratings_loader)
+    top = engine.top_n(model, 5000, N=10)
+    assert len(top) == 10
+    assert not {100, 101, 102, 103} & {movie_id for movie_id, _ in top}
+    scores = [score for _, score in top]
+    assert scores == sorted(scores, reverse=True)
+
+    # Vecteur en cache : pas de nouvelle lecture des notes
+    assert engine.top_n(model, 5000, N=10) == top
+    assert calls == [5000]
+    engine.invalidate_users([5000])
+    engine.top_n(model, 5000, N=10)
+    assert calls == [5000, 5000]
+
+    # LRU borné à 2 entrées
+    engine.top_n(model, 5001, N=5)
+    engine.top_n(model, 5002, N=5)
+    assert len(engine) == 2
+
+
+def test_engine_requires_enough_known_ratings(model):
+    engine = FoldInEngine(min_ratings=3, ratings_loader=lambda user_id: (np.array([100, 9999]), np.array([4.0, 3.0])))
+    assert engine.top_n(model, 5000, N=5) == []
+    assert FoldInEngine(enabled=False).top_n(model, 5000, N=5) == []
@@ -0,0 +1,99 @@
+"""
+Tests du ré-entraînement incrémental (warm start, fold-in, SGD par mini-lots)
+"""
+import pytest
+import sys
+import os
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.model_store import export_factor_model, load_model_artifact
+from pipeline.incremental_training import fold_in_new_users, sgd_epochs, split_incremental, warm_start
+
+
+@pytest.fixture
+def world(make_ratings):
+    df, truth = make_ratings(
+        n_users=400, n_movies=150, n_rows=30000, n_factors=4, factor_std=0.5, bias_std=0.3,
+        noise=0.3, half_stars=False, unique=False, with_truth=True
+    )
+    users = df["user_id"].to_numpy()
+    columns = {
+        "user_id": users,
+        "movie_id": df["movie_id"].to_numpy(),
+        "rating": df["rating"].to_numpy(dtype=np.float32),
+        # Les 50 derniers utilisateurs n'apparaissent qu'après le watermark
+        "timestamp": np.where(users > 350, 2, np.random.default_rng(1).integers(0, 2, size=users.shape[0])),
+    }
+    return truth, columns
+
+
+def export_parent(tmp_path, truth, n_known_users):
+    """Modèle précédent : facteurs exacts, sans les utilisateurs arrivés depuis"""
+    rng = np.random.default_rng(1)
+    n_items = truth["qi"].shape[0]
+    noisy = lambda values: values + rng.normal(0, 0.2, size=values.shape)
+    version_dir = export_factor_model(
+        str(tmp_path),
+        pu=noisy(truth["pu"][:n_known_users]),
+        qi=noisy(truth["qi"]),
+        bu=truth["bu"][:n_known_users],
+        bi=truth["bi"],
+        global_mean=3.5,
+        user_ids=np.arange(1, n_known_users + 1),
+        item_ids=np.arange(1, n_items + 1),
+        version="v1"
+    )
+    return load_model_artifact(version_dir, mmap=False)
+
+
+def test_warm_start_keeps_parent_factors(tmp_path, world):
+    truth, _ = world
+    parent = export_parent(tmp_path, truth, n_known_users=350)
+    state = warm_start(parent, user_ids=[1, 360, 355], movie_ids=[1, 200])
+
+    assert state.user_ids.tolist() == list(range(1, 351)) + [355, 360]
+    assert state.item_ids[-1] == 200 and state.qi.shape[0] == 151
+    np.testing.assert_array_equal(state.pu[:350], parent.scorer.pu)
+    assert state.known_users.sum() == 350 and not state.known_items[-1]
+    assert state.bu[-1] == 0.0
+
+
+def test_incremental_update_improves_new_ratings(tmp_path, world):
+    truth, columns = world
+    parent = export_parent(tmp_path, truth, n_known_users=350)
+    splits = split_incremental(columns, watermark=1, replay_ratio=2.0)
+    train, test = splits["train"], splits["test"]
+    assert (test["timestamp"] > 1).all()
+
+    state = warm_start(parent, train["user_id"], train["movie_id"])
+    before = state.rmse(test["user_id"], test["movie_id"], test["rating"])
+    fold_in_new_users(state, train["user_id"], train["movie_id"], train["rating"], reg=1.0)
+    after_fold_in = state.rmse(test["user_id"], test["movie_id"], test["rating"])
+    sgd_epochs(state, train["user_id"], train["movie_id"], train["rating"], n_epochs=3, lr=0.002)
+    after = state.rmse(test["user_id"], test["movie_id"], test["rating"])
+
+    assert after_fold_in < before * 0.8
+    assert after <= after_fold_in * 1.01
+
+    # Modèle picklé / enregistré : mêmes prédictions que l'état exporté
+    users, items = state.positions(test["user_id"], test["movie_id"])
+    np.testing.assert_allclose(
+        state.to_model().predict_arrays(test["user_id"], test["movie_id"]),
+        np.clip(state.predict(users, items), *state.rating_scale),
+        atol=1e-5
+    )
+
+
+def test_holdout_only_ids_use_known_baselines(tmp_path, world):
+    truth, _ = world
+    parent = export_parent(tmp_path, truth, n_known_users=350)
+    state = warm_start(parent, user_ids=[1], movie_ids=[1])
+
+    # Utilisateur 999 et film 999 absents de l'état : pas de facteurs de la dernière ligne
+    predicted = state.predict(*state.positions([999, 999, 1], [1, 999, 999]))
+    expected = [3.5 + state.bi[0], 3.5, 3.5 + state.bu[0]]
+    np.testing.assert_allclose(predicted, expected, atol=1e-5)
+    assert abs(state.rmse([999], [999], [4.5]) - 1.0) < 1e-5
@@ -0,0 +1,59 @@
+"""
+Tests du voisinage item-item creux (top k en CSR, export de serving)
+"""
+import sys
+import os
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from surprise import Dataset, Reader, KNNBaseline
+from pipeline.knn_engine import ItemKNN
+from pipeline.model_store import load_model_artifact
+from pipeline.cv_scheduler import run_cross_validation
+
+
+def test_unpruned_matches_surprise_knn_baseline(make_ratings):
+    df = make_ratings()
+    train, test = df.iloc[:3000], df.iloc[3000:]
+    knn = ItemKNN(k=1000, block_items=16).fit(train["user_id"], train["movie_id"], train["rating"])
+
+    algo = KNNBaseline(k=1000, sim_options={"name": "pearson_baseline", "user_based": False}, verbose=False)
+    algo.fit(Dataset.load_from_df(train, Reader(rating_scale=(0.5, 5))).build_full_trainset())
+    expected = [algo.predict(u, m).est for u, m in zip(test["user_id"], test["movie_id"])]
+
+    np.testing.assert_allclose(knn.predict_arrays(test["user_id"], test["movie_id"]), expected, atol=1e-4)
+    # Seuls les k meilleurs voisins (similarité positive) sont gardés
+    pruned = ItemKNN(k=5).fit(train["user_id"], train["movie_id"], train["rating"])
+    assert np.diff(pruned.sim_indptr).max() <= 5 and (pruned.sim_data > 0).all()
+
+
+def test_export_serves_neighbourhood(tmp_path, make_ratings):
+    df = make_ratings()
+    knn = ItemKNN(k=10).fit(df["user_id"], df["movie_id"], df["rating"])
+    artifact = load_model_artifact(knn.export(str(tmp_path / "serving"), seen_ratings=df, topk=5))
+    assert artifact.kind == "item_knn"
+
+    user_id = int(knn.user_ids[7])
+    inner = artifact.to_inner_uid(user_id)
+    scores = artifact.scorer.score_user(inner)
+    np.testing.assert_allclose(
+        artifact.scorer.clip(scores),
+        knn.predict_arrays(np.full(knn.item_ids.shape, user_id), knn.item_ids),
+        atol=1e-5
+    )
+    # Fold-in à partir des mêmes notes : même profil que l'utilisateur du modèle
+    rated = df[df["user_id"] == user_id]
+    profile, bu = artifact.scorer.fold_in(artifact.to_inner_iids(rated["movie_id"]), rated["rating"])
+    np.testing.assert_allclose(artifact.scorer.score_vector(profile, bu), scores, atol=1e-4)
+    # Profil creux : une entrée par film noté, pas n_items
+    assert profile[0].shape[0] == profile[1].shape[0] == len(rated)
+
+    top = artifact.top_n(user_id, N=5)
+    assert len(top) == 5 and not set(m for m, _ in top) & set(rated["movie_id"])
+    assert artifact.top_n_batch([user_id], [5])[0] == top
+
+    candidates = [("ItemKNN", "sample", {"k": 10}), ("NormalPredictor", "sample", {})]
+    summary, _ = run_cross_validation({"sample": df}, candidates, n_folds=3, n_workers=1, shared_dir=str(tmp_path))
+    assert summary["ItemKNN"]["test_rmse"].mean() < summary["NormalPredictor"]["test_rmse"].mean()
@@ -0,0 +1,37 @@
+"""
+Tests de l'index en mémoire des utilisateurs connus
+"""
+import sys
+import os
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api.known_users import KnownUserIndex
+
+
+def test_contains_after_build():
+    index = KnownUserIndex()
+    assert not index.ready
+    assert index.contains(1) is None
+
+    index.build([1, 7, 8, 138493])
+    assert index.ready
+    assert all(index.contains(user_id) for user_id in (1, 7, 8, 138493))
+    assert not any(index.contains(user_id) for user_id in (0, 2, 9, 138492, 10 ** 9, -1))
+    assert index.is_new_user(2)
+    assert not index.is_new_user(7)
+
+
+def test_add_grows_bitmap_and_keeps_existing_users():
+    index = KnownUserIndex()
+    index.build([3, 5])
+    index.add({5, 42, 500000})
+    assert all(index.contains(user_id) for user_id in (3, 5, 42, 500000))
+    assert not index.contains(41)
+
+
+def test_add_is_ignored_before_build():
+    index = KnownUserIndex()
+    index.add([1])
+    assert not index.ready
@@ -0,0 +1,84 @@
+"""
+Tests pour le registre de modèles (rechargement à chaud)
+"""
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.catalog import MovieCatalog
+from api.model_registry import ModelRegistry
+
+
+def make_catalog():
+    movies_df = pd.DataFrame({"movie_id": np.arange(1, 51), "title": [f"Film {i}" for i in range(1, 51)]})
+    return MovieCatalog.from_frames(movies_df)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    config = {
+        "serving": {"export_dir": str(tmp_path / "serving"), "reload_interval_seconds": 1},
+        "model": {"model_dir": str(tmp_path), "model_filename": "absent.pkl"},
+    }
+    return ModelRegistry(config=config, catalog_loader=make_catalog)
+
+
+def test_registry_without_model(registry):
+    """Sans modèle, le registre lève FileNotFoundError"""
+    with pytest.raises(FileNotFoundError):
+        registry.current()
+
+
+def test_registry_hot_swap(registry, make_factor_model):
+    """Une nouvelle version est chargée sans affecter la requête en cours"""
+    swaps = []
+    registry.on_swap(lambda snapshot: swaps.append(snapshot.version))
+    export_dir = registry.config["serving"]["export_dir"]
+    make_factor_model(export_dir, "v1")
+    assert registry.current().version == "v1"
+    assert registry.reload() is False
+
+    with registry.acquire() as snapshot:
+        make_factor_model(export_dir, "v2", seed=1)
+        registry.reload_async().join()
+        # La requête en cours garde la version v1, encore mappée
+        assert snapshot.version == "v1"
+        assert snapshot.model.top_n(1, N=3)
+        assert registry.status()["model_version"] == "v2"
+        assert registry.status()["draining_versions"] == ["v1"]
+
+    assert swaps == ["v1", "v2"]
+    status = registry.status()
+    assert status["draining_versions"] == []
+    assert status["load_seconds"] is not None
+
+
+def test_registry_workers_share_published_segment(tmp_path, make_factor_model):
+    """Deux workers mappent les mêmes fichiers publiés une seule fois"""
+    shared_dir = tmp_path / "shm"
+    config = {
+        "serving": {
+            "export_dir": str(tmp_path / "serving"),
+            "shared_memory": {"enabled": True, "dir": str(shared_dir), "keep_versions": 2},
+        },
+        "model": {"model_dir": str(tmp_path), "model_filename": "absent.pkl"},
+    }
+    workers = [ModelRegistry(config=config, catalog_loader=make_catalog) for _ in range(2)]
+
+    make_factor_model(config["serving"]["export_dir"], "v1")
+    artifacts = [worker.current().model for worker in workers]
+    assert artifacts[0].version_dir == artifacts[1].version_dir == str(shared_dir / "v1")
+    assert artifacts[0].scorer.pu.filename == artifacts[1].scorer.pu.filename
+
+    # Les anciennes versions sont retirées du segment au-delà de keep_versions
+    for version in ("v2", "v3"):
+        make_factor_model(config["serving"]["export_dir"], version)
+        workers[0].reload()
+    assert sorted(p.name for p in shared_dir.iterdir() if not p.name.startswith(".")) == ["v2", "v3"]
+    # Le worker qui n'a pas rechargé sert toujours v1 depuis son mapping
+    assert workers[1].current().model.top_n(1, N=3)
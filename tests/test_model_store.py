@@ -0,0 +1,153 @@
+"""
+Tests pour le format d'export des modèles de serving
+"""
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from surprise import Dataset, Reader, SVD
+from pipeline.scoring import FactorScorer
+from pipeline.model_store import (
+    ModelArtifact,
+    export_surprise_model,
+    load_current_artifact,
+    read_current
+)
+
+
+@pytest.fixture(scope="module")
+def svd_algo(make_ratings):
+    """Petit modèle SVD entraîné sur des notes synthétiques"""
+    ratings_df = make_ratings(n_users=59, n_movies=199, n_rows=2000, seed=1)
+    # Identifiants non contigus : conversion brut → interne par dichotomie
+    ratings_df["user_id"] *= 7
+    ratings_df["movie_id"] *= 3
+    trainset = Dataset.load_from_df(ratings_df, Reader(rating_scale=(0.5, 5))).build_full_trainset()
+    algo = SVD(random_state=0, n_epochs=5)
+    algo.fit(trainset)
+    return algo
+
+
+def test_export_and_load_roundtrip(svd_algo, tmp_path):
+    """Le modèle rechargé en mmap donne les mêmes recommandations que Surprise"""
+    export_dir = str(tmp_path / "serving")
+    version_dir = export_surprise_model(svd_algo, export_dir, metadata={"run_id": "test"})
+    assert read_current(export_dir) == os.path.basename(version_dir)
+
+    artifact = load_current_artifact(export_dir)
+    assert isinstance(artifact.scorer.pu, np.memmap)
+    assert artifact.manifest["metadata"]["algorithm"] == "SVD"
+    assert np.all(np.diff(artifact.user_ids) > 0)
+
+    trainset = svd_algo.trainset
+    scorer = FactorScorer.from_surprise(svd_algo)
+    for inner_uid in range(0, trainset.n_users, 5):
+        user_id = trainset.to_raw_uid(inner_uid)
+        seen = [trainset.to_raw_iid(i) for (i, _) in trainset.ur[inner_uid]]
+        expected_items, expected_scores = scorer.top_n(
+            inner_uid, N=5, seen_items=[i for (i, _) in trainset.ur[inner_uid]]
+        )
+        top_n = artifact.top_n(user_id, N=5, seen_movie_ids=seen)
+        assert np.allclose([s for _, s in top_n], expected_scores, atol=1e-4)
+        assert not set(seen) & {movie_id for movie_id, _ in top_n}
+
+    assert artifact.to_inner_uid(-1) is None
+    assert artifact.top_n(-1) == []
+
+
+def test_seen_index_covers_full_history(svd_algo, tmp_path):
+    """L'index CSR contient tout l'historique des utilisateurs du modèle"""
+    trainset = svd_algo.trainset
+    user_id = trainset.to_raw_uid(0)
+    movie_ids = [trainset.to_raw_iid(i) for i in trainset.all_items()]
+    # Historique complet : plus large que l'échantillon d'entraînement, avec des lignes hors modèle
+    history = pd.DataFrame({
+        "user_id": [user_id] * 20 + [-5],
+        "movie_id": movie_ids[:20] + [movie_ids[0]],
+    })
+    version_dir = export_surprise_model(
+        svd_algo, str(tmp_path / "serving"), seen_ratings=history
+    )
+    artifact = load_current_artifact(str(tmp_path / "serving"))
+    assert artifact.has_seen_index
+    inner_uid = artifact.to_inner_uid(user_id)
+    seen = artifact.seen_items(inner_uid)
+    assert sorted(artifact.item_ids[seen].tolist()) == sorted(movie_ids[:20])
+    assert np.all(np.diff(seen) > 0)
+
+    top_n = artifact.top_n(user_id, N=artifact.n_items)
+    assert len(top_n) == artifact.n_items - 20
+    assert not set(movie_ids[:20]) & {movie_id for movie_id, _ in top_n}
+    assert os.path.exists(os.path.join(version_dir, "seen_indptr.npy"))
+
+
+def test_ivf_search_mode(svd_algo, tmp_path):
+    """En mode ivf, sonder tous les clusters redonne le top N exact"""
+    export_dir = str(tmp_path / "serving")
+    export_surprise_model(
+        svd_algo, export_dir,
+        ann={"enabled": True, "search": "ivf", "nlist": 8, "nprobe": 8}
+    )
+    artifact = load_current_artifact(export_dir)
+    assert artifact.search == "ivf"
+    assert artifact.ann.nlist == 8
+
+    trainset = svd_algo.trainset
+    for inner_uid in range(0, trainset.n_users, 9):
+        user_id = trainset.to_raw_uid(inner_uid)
+        approx = artifact.top_n(user_id, N=5)
+        exact = artifact.scorer.top_n(artifact.to_inner_uid(user_id), N=5)
+        assert np.allclose([s for _, s in approx], exact[1])
+
+
+def test_topk_store_matches_live_scoring(svd_algo, tmp_path):
+    """Le top K précalculé est identique au scoring en direct"""
+    trainset = svd_algo.trainset
+    history = pd.DataFrame(
+        [(trainset.to_raw_uid(u), trainset.to_raw_iid(i)) for u, i, _ in trainset.all_ratings()],
+        columns=["user_id", "movie_id"]
+    )
+    export_dir = str(tmp_path / "serving")
+    export_surprise_model(svd_algo, export_dir, seen_ratings=history, topk=10)
+    artifact = load_current_artifact(export_dir)
+    assert artifact.topk is not None and artifact.topk.k == 10
+
+    for inner_uid in range(0, artifact.n_users, 4):
+        user_id = int(artifact.user_ids[inner_uid])
+        stored = artifact.top_n(user_id, N=5)
+        items, scores = artifact.scorer.top_n(inner_uid, N=5, seen_items=artifact.seen_items(inner_uid))
+        assert np.allclose([s for _, s in stored], scores, atol=1e-5)
+        assert not set(artifact.item_ids[artifact.seen_items(inner_uid)].tolist()) & {m for m, _ in stored}
+
+    # N > K : scoring en direct
+    assert len(artifact.top_n(int(artifact.user_ids[0]), N=20)) == 20
+
+    # Store d'un autre modèle (nombre d'utilisateurs différent) : ignoré
+    arrays = dict(artifact.arrays, topk_items=artifact.arrays["topk_items"][1:])
+    assert ModelArtifact(artifact.version_dir, artifact.manifest, arrays).topk is None
+
+
+def test_top_n_batch_matches_single_user(svd_algo, tmp_path):
+    """Le scoring par lot donne le même top N que le scoring utilisateur par utilisateur"""
+    trainset = svd_algo.trainset
+    history = pd.DataFrame(
+        [(trainset.to_raw_uid(u), trainset.to_raw_iid(i)) for u, i, _ in trainset.all_ratings()],
+        columns=["user_id", "movie_id"]
+    )
+    export_dir = str(tmp_path / "serving")
+    export_surprise_model(svd_algo, export_dir, seen_ratings=history, topk=5)
+    artifact = load_current_artifact(export_dir)
+
+    user_ids = [int(u) for u in artifact.user_ids[::3]] + [-1]
+    Ns = [3 if i % 2 else 12 for i in range(len(user_ids))]
+    batch = artifact.top_n_batch(user_ids, Ns)
+    for user_id, N, result in zip(user_ids, Ns, batch):
+        expected = artifact.top_n(user_id, N=N)
+        assert [m for m, _ in result] == [m for m, _ in expected]
+        assert np.allclose([s for _, s in result], [s for _, s in expected], atol=1e-5)
+    assert batch[-1] == []
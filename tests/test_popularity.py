@@ -0,0 +1,73 @@
+"""
+Tests des classements de popularité matérialisés
+"""
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.catalog import MovieCatalog
+from api.popularity import PopularityBoard
+
+
+def make_catalog():
+    movies = pd.DataFrame({"movie_id": [1, 2, 3, 4], "title": ["A", "B", "C", "D"]})
+    genres = pd.DataFrame({
+        "movie_id": [1, 2, 3, 4, 4],
+        "name": ["Comedy", "Drama", "Comedy", "Drama", "Comedy"],
+    })
+    return MovieCatalog.from_frames(movies, genres)
+
+
+def test_top_matches_damped_score_order():
+    board = PopularityBoard(min_ratings=10, damping=100)
+    assert board.top(5) is None
+
+    # movie 3 sous le seuil de notes
+    board.load(make_catalog(), [1, 2, 3, 4], [100, 400, 5, 200], [300.0, 1400.0, 25.0, 900.0])
+    top = board.top(5)
+    assert [movie_id for _, _, movie_id in top] == [4, 2, 1]
+    title, score, movie_id = top[0]
+    assert title == "D" and np.isclose(score, 900.0 / 300)
+    assert [movie_id for _, _, movie_id in board.top(5, genre="Comedy")] == [4, 1]
+    assert [movie_id for _, _, movie_id in board.top(5, genre="Drama")] == [4, 2]
+    assert board.top(5, genre="Horror") == []
+
+
+def test_add_ratings_updates_leaderboards():
+    board = PopularityBoard(min_ratings=10, damping=100)
+    board.load(make_catalog(), [1, 2, 3], [100, 400, 9], [300.0, 1400.0, 45.0])
+    assert 3 not in [movie_id for _, _, movie_id in board.top(5)]
+
+    board.add_ratings([3, 3, 99], [5.0, 5.0, 4.0])  # film 99 inconnu du catalogue : ignoré
+    top = board.top(5)
+    assert 3 in [movie_id for _, _, movie_id in top]
+    assert np.isclose(dict((m, s) for _, s, m in top)[3], 55.0 / 111)
+
+
+def test_top_for_ratings_blends_genre_affinity_and_popularity():
+    movies = pd.DataFrame({"movie_id": [1, 2, 3, 4, 5], "title": ["A", "B", "C", "D", "E"]})
+    genres = pd.DataFrame({
+        "movie_id": [1, 2, 3, 4, 5, 5],
+        "name": ["Comedy", "Drama", "Comedy", "Horror", "Drama", "Comedy"],
+    })
+    board = PopularityBoard(min_ratings=10, damping=100)
+    catalog = MovieCatalog.from_frames(movies, genres)
+    board.load(catalog, [1, 2, 3, 4, 5], [100, 100, 100, 400, 100], [400.0, 400.0, 300.0, 2000.0, 200.0])
+
+    # Utilisateur : aime les comédies (5), moins les drames (2)
+    top = board.top_for_ratings([1, 2], [5.0, 2.0], N=5, top_k_genres=3)
+    ids = [movie_id for _, _, movie_id in top]
+    # Films notés exclus, Horror (genre non noté) exclu malgré sa popularité
+    assert ids == [3, 5]
+    scores = dict((movie_id, score) for _, score, movie_id in top)
+    assert np.isclose(scores[3], 300.0 / 200 * 1.0)
+    assert np.isclose(scores[5], 200.0 / 200 * (1.0 + 0.4) / 2)
+
+    # Un seul genre préféré (Comedy) : le film 5 n'est plus porté que par ce genre
+    top = board.top_for_ratings([1, 2], [5.0, 2.0], N=5, top_k_genres=1)
+    assert np.isclose(dict((m, s) for _, s, m in top)[5], 200.0 / 200 * 1.0 / 2)
+    assert board.top_for_ratings([99], [4.0], N=5) == []
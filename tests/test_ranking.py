@@ -0,0 +1,65 @@
+"""
+Tests du classement paginé (tri partiel incrémental et curseurs)
+"""
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.model_store import load_model_artifact
+from api.ranking import RankedList, build_ranking, decode_cursor, encode_cursor, resume_offset
+
+
+def full_order(scores):
+    finite = np.flatnonzero(np.isfinite(scores))
+    return finite[np.lexsort((finite, -scores[finite]))]
+
+
+def test_pages_match_full_sort_with_ties():
+    rng = np.random.default_rng(0)
+    # Scores arrondis : nombreux ex aequo aux frontières des extensions
+    scores = np.round(rng.normal(3.5, 0.5, size=5000), 1).astype(np.float32)
+    scores[rng.choice(5000, size=300, replace=False)] = -np.inf
+    ranking = RankedList(scores, "v1", "collaborative_filtering")
+
+    pages = []
+    offset = 0
+    while offset < ranking.total:
+        items, _ = ranking.page(offset, 37)
+        pages.append(items)
+        offset += items.shape[0]
+
+    np.testing.assert_array_equal(np.concatenate(pages), full_order(scores))
+    assert ranking.total == 4700
+
+
+def test_keyset_resume_after_cache_loss(tmp_path, make_factor_model):
+    version_dir = make_factor_model(
+        tmp_path, n_users=5, n_items=400, factor_std=0.3, bias_std=0.2, first_item_id=100, seed=1,
+        seen_ratings=pd.DataFrame({"user_id": [2, 2, 2], "movie_id": [100, 101, 102]})
+    )
+    model = load_model_artifact(version_dir)
+    ranking = build_ranking(model, model.version, 2)
+    items, scores = ranking.page(0, 25)
+    assert ranking.total == 397
+    assert not np.isin(items, [0, 1, 2]).any()
+
+    cursor = decode_cursor(encode_cursor(model.version, 25, float(scores[-1]), int(model.item_ids[items[-1]])))
+    # Classement expiré : reconstruit puis reprise par (score, film)
+    fresh = build_ranking(model, model.version, 2)
+    offset = resume_offset(fresh, cursor, model)
+    assert offset == 25
+    next_items, _ = fresh.page(offset, 25)
+    np.testing.assert_array_equal(next_items, full_order(ranking.scores)[25:50])
+
+
+def test_invalid_cursor():
+    try:
+        decode_cursor("pas-un-curseur")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ValueError attendu")
@@ -0,0 +1,81 @@
+"""
+Tests du snapshot colonnaire des ratings (partitions, watermark, filtres)
+"""
+import pytest
+import sys
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline.ratings_snapshot import RatingsSnapshot, filter_active_ratings
+
+
+@pytest.fixture
+def make_columns(make_ratings):
+    """Notes synthétiques au format des colonnes du snapshot (timestamps croissants)"""
+    def build(n_rows, start_timestamp=0, seed=0):
+        df = make_ratings(n_users=59, n_movies=39, n_rows=n_rows, unique=False, seed=seed)
+        return {
+            "user_id": df["user_id"].to_numpy(dtype=np.int32),
+            "movie_id": df["movie_id"].to_numpy(dtype=np.int32),
+            "rating": df["rating"].to_numpy(dtype=np.float32),
+            "timestamp": start_timestamp + np.arange(n_rows, dtype=np.int64),
+        }
+    return build
+
+
+def test_filter_matches_sql_semantics(make_columns):
+    columns = make_columns(3000)
+    filtered = filter_active_ratings(columns, min_ratings_user=50, min_ratings_movie=80)
+
+    df = pd.DataFrame(columns)
+    user_counts = df.groupby("user_id")["rating"].transform("size")
+    movie_counts = df.groupby("movie_id")["rating"].transform("size")
+    expected = df[(user_counts >= 50) & (movie_counts >= 80)]
+
+    assert 0 < filtered["user_id"].shape[0] < 3000
+    np.testing.assert_array_equal(filtered["timestamp"], expected["timestamp"].to_numpy())
+
+
+def test_append_compaction_and_load(tmp_path, make_columns):
+    snapshot = RatingsSnapshot(str(tmp_path), partition_rows=400, max_partitions=4)
+    base = make_columns(1000)
+    assert snapshot.apply((999, 1000), base, delta=False) == "rebuilt"
+    assert len(snapshot.read_manifest()["partitions"]) == 3
+    assert snapshot.watermark == (999, 1000)
+
+    # Deux deltas : la deuxième dépasse max_partitions et déclenche une compaction
+    deltas = [make_columns(50, start_timestamp=1000, seed=1), make_columns(30, start_timestamp=1050, seed=2)]
+    snapshot.apply((1049, 1050), deltas[0], delta=True)
+    assert len(snapshot.read_manifest()["partitions"]) == 4
+    snapshot.apply((1079, 1080), deltas[1], delta=True)
+
+    manifest = snapshot.read_manifest()
+    assert [p["rows"] for p in manifest["partitions"]] == [400, 400, 280]
+    assert sorted(f for f in os.listdir(tmp_path) if f.startswith("part-")) == \
+        sorted(p["file"] for p in manifest["partitions"])
+    assert snapshot.watermark == (1079, 1080)
+
+    loaded = snapshot.load()
+    for name in base:
+        np.testing.assert_array_equal(
+            loaded[name], np.concatenate([base[name], deltas[0][name], deltas[1][name]])
+        )
+    assert loaded["user_id"].dtype == np.int32
+    assert set(snapshot.load(("movie_id",))) == {"movie_id"}
+
+
+def test_writes_wait_for_the_snapshot_lock(tmp_path, make_columns):
+    snapshot = RatingsSnapshot(str(tmp_path))
+    # Verrou tenu par un autre rafraîchissement (autre descripteur : flock bloque aussi entre threads)
+    writer = threading.Thread(target=snapshot.apply, args=((999, 1000), make_columns(1000), False))
+    with snapshot._lock():
+        writer.start()
+        writer.join(0.3)
+        assert writer.is_alive() and snapshot.watermark is None
+    writer.join(5)
+    assert not writer.is_alive() and snapshot.watermark == (999, 1000)
@@ -0,0 +1,57 @@
+"""
+Tests pour le cache des recommandations
+"""
+import pytest
+import sys
+import os
+import time
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api.result_cache import RecommendationCache
+
+
+def test_cache_hit_and_model_version_in_key():
+    cache = RecommendationCache(max_entries=10, ttl_seconds=60)
+    cache.put(1, 5, "v1", "reco")
+    assert cache.get(1, 5, "v1") == "reco"
+    assert cache.get(1, 10, "v1") is None
+    assert cache.get(1, 5, "v2") is None
+
+
+def test_cache_lru_eviction_and_ttl():
+    """Au-delà de max_entries, l'entrée la moins récemment lue est évincée"""
+    cache = RecommendationCache(max_entries=2, ttl_seconds=60)
+    cache.put(1, 5, "v1", "a")
+    cache.put(2, 5, "v1", "b")
+    assert cache.get(1, 5, "v1") == "a"
+    cache.put(3, 5, "v1", "c")
+    assert cache.get(2, 5, "v1") is None
+    assert cache.get(1, 5, "v1") == "a"
+    assert len(cache) == 2
+
+    short = RecommendationCache(ttl_seconds=0.01)
+    short.put(1, 5, "v1", "a")
+    time.sleep(0.02)
+    assert short.get(1, 5, "v1") is None
+    assert len(short) == 0
+
+
+def test_cache_invalidation_by_user_and_on_swap():
+    cache = RecommendationCache()
+    cache.put(1, 5, "v1", "a")
+    cache.put(1, 10, "v1", "b")
+    cache.put(2, 5, "v1", "c")
+    assert cache.invalidate_users([1, 42]) == 2
+    assert cache.get(1, 5, "v1") is None and cache.get(1, 10, "v1") is None
+    assert cache.get(2, 5, "v1") == "c"
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = RecommendationCache(enabled=False)
+    cache.put(1, 5, "v1", "a")
+    assert cache.get(1, 5, "v1") is None
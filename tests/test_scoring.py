@@ -0,0 +1,68 @@
+"""
+Tests pour le moteur de scoring vectorisé
+"""
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from surprise import Dataset, Reader, SVD
+from pipeline.scoring import FactorScorer, top_n_from_scores
+from pipeline.catalog import MovieCatalog
+from pipeline.predict_model_pipeline import top_n_user
+
+
+@pytest.fixture(scope="module")
+def svd_model(make_ratings):
+    """Petit modèle SVD entraîné sur des notes synthétiques"""
+    ratings_df = make_ratings(n_users=79, n_movies=299, n_rows=3000)
+    reader = Reader(rating_scale=(0.5, 5))
+    trainset = Dataset.load_from_df(ratings_df, reader).build_full_trainset()
+    algo = SVD(random_state=0, n_epochs=10)
+    algo.fit(trainset)
+    catalog = MovieCatalog.from_frames(pd.DataFrame({
+        "movie_id": np.arange(1, 300),
+        "title": [f"Film {i}" for i in range(1, 300)],
+    }))
+    return algo, trainset, catalog
+
+
+def test_top_n_from_scores_masks_and_sorts():
+    """Test de la sélection top N avec masque"""
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    seen = np.array([False, True, False, False, False])
+    items, top = top_n_from_scores(scores, 2, seen)
+    assert items.tolist() == [3, 2]
+    assert np.allclose(top, [0.7, 0.5])
+
+
+def test_factor_scorer_matches_surprise(svd_model):
+    """Les scores vectorisés sont identiques à ceux de algo.test (anti-testset)"""
+    algo, trainset, _ = svd_model
+    scorer = FactorScorer.from_surprise(algo)
+    for inner_uid in range(0, trainset.n_users, 7):
+        uid = trainset.to_raw_uid(inner_uid)
+        rated = {i for (i, _) in trainset.ur[inner_uid]}
+        anti_testset = [
+            (uid, trainset.to_raw_iid(i), trainset.global_mean)
+            for i in trainset.all_items() if i not in rated
+        ]
+        expected = sorted((p.est for p in algo.test(anti_testset)), reverse=True)[:10]
+        _, scores = scorer.top_n(inner_uid, N=10, seen_items=list(rated))
+        assert np.allclose(scores, expected)
+
+
+def test_top_n_user_vectorized(svd_model):
+    """top_n_user renvoie N films non vus (titre, score, movie_id) triés par score"""
+    algo, trainset, catalog = svd_model
+    user_id = trainset.to_raw_uid(0)
+    top_n = top_n_user(algo, trainset, catalog, user_id=user_id, N=5)
+    assert len(top_n) == 5
+    scores = [score for _, score, _ in top_n]
+    assert scores == sorted(scores, reverse=True)
+    assert all(title == f"Film {movie_id}" for title, _, movie_id in top_n)
+    assert top_n_user(algo, trainset, catalog, user_id=-1, N=5) == []